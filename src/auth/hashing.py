@@ -0,0 +1,193 @@
+"""
+Password hashing configuration and cost calibration.
+
+The hash context is configured from the environment:
+
+- ``PASSWORD_SCHEMES``: comma separated ``bcrypt`` and ``argon2id`` (or
+  ``argon2``), first one hashes new passwords, the others are only verified
+  and upgraded on login (default ``bcrypt``).
+- ``BCRYPT_ROUNDS``: bcrypt cost (default 12).
+- ``ARGON2_MEMORY_COST`` (KiB), ``ARGON2_TIME_COST``, ``ARGON2_PARALLELISM``:
+  argon2id parameters (defaults 65536, 3, 4). argon2 needs ``argon2-cffi``.
+
+To pick costs for the current host, run from ``src``::
+
+    python -m auth.hashing --target-ms 250
+"""
+import argparse
+import os
+import statistics
+import time
+import passlib.context
+import passlib.hash
+
+SCHEMES = [scheme.strip() for scheme in os.environ.get('PASSWORD_SCHEMES', 'bcrypt').split(',') if scheme.strip()]
+BCRYPT_ROUNDS = int(os.environ.get('BCRYPT_ROUNDS', 12))
+ARGON2_MEMORY_COST = int(os.environ.get('ARGON2_MEMORY_COST', 65536))
+ARGON2_TIME_COST = int(os.environ.get('ARGON2_TIME_COST', 3))
+ARGON2_PARALLELISM = int(os.environ.get('ARGON2_PARALLELISM', 4))
+CALIBRATION_PASSWORD = "calibration-password"
+# passlib's argon2 handler always hashes with the type set below.
+SCHEME_NAMES = {"bcrypt": "bcrypt", "argon2": "argon2", "argon2id": "argon2"}
+
+
+def build_context(
+    schemes: list[str] = SCHEMES,
+    bcrypt_rounds: int = BCRYPT_ROUNDS,
+    argon2_memory_cost: int = ARGON2_MEMORY_COST,
+    argon2_time_cost: int = ARGON2_TIME_COST,
+    argon2_parallelism: int = ARGON2_PARALLELISM
+) -> passlib.context.CryptContext:
+    """
+    Builds the password hash context.
+
+    Hashes made with any scheme but the first, or with a lower cost than
+    configured, are reported by ``needs_update`` so they can be replaced
+    on the next successful login.
+
+    Args:
+        schemes (list[str]): Accepted schemes, preferred first, from
+            ``SCHEME_NAMES``.
+        bcrypt_rounds (int): bcrypt cost factor.
+        argon2_memory_cost (int): argon2id memory in KiB.
+        argon2_time_cost (int): argon2id iterations.
+        argon2_parallelism (int): argon2id lanes.
+
+    Returns:
+        CryptContext: The configured context.
+
+    Raises:
+        ValueError: If a scheme is unknown.
+        RuntimeError: If argon2 is requested but argon2-cffi is not installed.
+    """
+    unknown = [scheme for scheme in schemes if scheme not in SCHEME_NAMES]
+    if unknown:
+        raise ValueError(
+            f"Unknown password schemes {unknown}, PASSWORD_SCHEMES takes {', '.join(SCHEME_NAMES)}"
+        )
+    schemes = list(dict.fromkeys(SCHEME_NAMES[scheme] for scheme in schemes))
+
+    if "argon2" in schemes and not passlib.hash.argon2.has_backend():
+        raise RuntimeError("argon2 password hashing needs the argon2-cffi package")
+
+    return passlib.context.CryptContext(
+        schemes=schemes,
+        deprecated="auto",
+        bcrypt__rounds=bcrypt_rounds,
+        bcrypt__min_rounds=bcrypt_rounds,
+        argon2__type="ID",
+        argon2__memory_cost=argon2_memory_cost,
+        argon2__time_cost=argon2_time_cost,
+        argon2__parallelism=argon2_parallelism,
+    )
+
+
+def fast_context() -> passlib.context.CryptContext:
+    """
+    Builds a context with the cheapest bcrypt cost, for tests only.
+
+    Returns:
+        CryptContext: bcrypt with 4 rounds.
+    """
+    return build_context(["bcrypt"], bcrypt_rounds=4)
+
+
+def measure(context: passlib.context.CryptContext, samples: int = 5) -> float:
+    """
+    Measures how long hashing one password takes.
+
+    Args:
+        context (CryptContext): The context to measure.
+        samples (int): Number of hashes to time.
+
+    Returns:
+        float: Median seconds per hash.
+    """
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        context.hash(CALIBRATION_PASSWORD)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def calibrate_bcrypt(target_ms: float, min_rounds: int = 10, max_rounds: int = 16) -> tuple[int, float]:
+    """
+    Finds the highest bcrypt cost that hashes within the target time.
+
+    Args:
+        target_ms (float): Time budget for one hash in milliseconds.
+        min_rounds (int): Lowest cost considered acceptable.
+        max_rounds (int): Highest cost tried.
+
+    Returns:
+        tuple[int, float]: The rounds and their measured milliseconds.
+    """
+    best = (min_rounds, measure(build_context(["bcrypt"], bcrypt_rounds=min_rounds)) * 1000)
+    for rounds in range(min_rounds + 1, max_rounds + 1):
+        elapsed = measure(build_context(["bcrypt"], bcrypt_rounds=rounds)) * 1000
+        if elapsed > target_ms:
+            break
+        best = (rounds, elapsed)
+    return best
+
+
+def calibrate_argon2(
+    target_ms: float,
+    time_cost: int = ARGON2_TIME_COST,
+    parallelism: int = ARGON2_PARALLELISM,
+    min_memory_cost: int = 19456,
+    max_memory_cost: int = 1048576
+) -> tuple[int, float]:
+    """
+    Finds the largest argon2id memory cost that hashes within the target time.
+
+    Memory doubles from ``min_memory_cost`` (19 MiB, the OWASP minimum) until
+    the target is exceeded.
+
+    Args:
+        target_ms (float): Time budget for one hash in milliseconds.
+        time_cost (int): argon2id iterations.
+        parallelism (int): argon2id lanes.
+        min_memory_cost (int): Lowest memory in KiB considered acceptable.
+        max_memory_cost (int): Highest memory in KiB tried.
+
+    Returns:
+        tuple[int, float]: The memory cost in KiB and its measured milliseconds.
+    """
+    def timed(memory_cost):
+        context = build_context(
+            ["argon2"], argon2_memory_cost=memory_cost,
+            argon2_time_cost=time_cost, argon2_parallelism=parallelism
+        )
+        return measure(context) * 1000
+
+    best = (min_memory_cost, timed(min_memory_cost))
+    memory_cost = min_memory_cost * 2
+    while memory_cost <= max_memory_cost:
+        elapsed = timed(memory_cost)
+        if elapsed > target_ms:
+            break
+        best = (memory_cost, elapsed)
+        memory_cost *= 2
+    return best
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pick password hash costs for this host")
+    parser.add_argument("--target-ms", type=float, default=250, help="time budget for one hash")
+    parser.add_argument("--scheme", choices=["bcrypt", "argon2", "all"], default="all")
+    args = parser.parse_args()
+
+    if args.scheme in ("bcrypt", "all"):
+        rounds, elapsed = calibrate_bcrypt(args.target_ms)
+        print(f"BCRYPT_ROUNDS={rounds}  # {elapsed:.0f} ms per hash")
+
+    if args.scheme in ("argon2", "all"):
+        if passlib.hash.argon2.has_backend():
+            memory_cost, elapsed = calibrate_argon2(args.target_ms)
+            print(f"ARGON2_MEMORY_COST={memory_cost}  # {elapsed:.0f} ms per hash")
+            print(f"ARGON2_TIME_COST={ARGON2_TIME_COST}")
+            print(f"ARGON2_PARALLELISM={ARGON2_PARALLELISM}")
+        else:
+            print("# argon2: install argon2-cffi to calibrate")
@@ -1,3 +1,4 @@
+import datetime
 import sqlalchemy
 import sqlalchemy.orm as orm
 import database
@@ -12,6 +13,7 @@ class User(database.Base):
     is_verified: orm.Mapped[bool] = orm.mapped_column(sqlalchemy.Boolean, default=False)
     verification_token: orm.Mapped[str | None] = orm.mapped_column(sqlalchemy.String(255), unique=True)
     contacts: orm.Mapped[list["Contacts"]] = orm.relationship(
-        "Contacts", back_populates="user", cascade="all, delete-orphan"
+        "Contacts", back_populates="user", cascade="all, delete-orphan", passive_deletes=True
     )
-    avatar_url: orm.Mapped[str | None] = orm.mapped_column(sqlalchemy.String(255), nullable=True)
\ No newline at end of file
+    avatar_url: orm.Mapped[str | None] = orm.mapped_column(sqlalchemy.String(255), nullable=True)
+    deleted_at: orm.Mapped[datetime.datetime | None] = orm.mapped_column(nullable=True)
\ No newline at end of file
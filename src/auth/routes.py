@@ -1,16 +1,20 @@
+import asyncio
 import fastapi
 from fastapi import APIRouter, Depends, File, UploadFile, HTTPException
 import fastapi.security
 import database
 import auth.exceptions
 import auth.service
+import auth.throttle
 import auth.models
 import auth.schemas
 #import services.email_service as email_service
-import uuid
 from services.user_service import update_user_avatar
+import services.account_service as account_service
+import jobs.service
 
 auth_service = auth.service.Auth()
+login_throttle = auth.throttle.LoginThrottle()
 router = fastapi.APIRouter(prefix='/auth', tags=["auth"])
 
 @router.post(
@@ -19,13 +23,20 @@ router = fastapi.APIRouter(prefix='/auth', tags=["auth"])
 )
 async def signup(
     body: auth.schemas.User,
+    background_tasks: fastapi.BackgroundTasks,
     db = fastapi.Depends(database.get_database)
 ) -> auth.schemas.UserDb:
     """
     Register a new user in the system.
 
+    The password is hashed in a worker thread and the user is inserted
+    without a prior lookup; a taken username, including one taken by a
+    concurrent signup, inserts nothing. The verification token and email
+    are produced after the response.
+
     Args:
         body (auth.schemas.User): User registration data (username, password).
+        background_tasks (BackgroundTasks): Runs the email verification step.
         db (Session): Database session dependency.
 
     Returns:
@@ -34,12 +45,6 @@ async def signup(
     Raises:
         HTTPException: If a user with the same username already exists (409 Conflict).
     """
-    user = db.query(auth.models.User).filter(auth.models.User.username==body.username).first()
-    if user is not None:
-        raise fastapi.HTTPException(
-            fastapi.status.HTTP_409_CONFLICT,
-            detail="Account already exists"
-        )
     if body.password == "":
         raise fastapi.HTTPException(
             fastapi.status.HTTP_409_CONFLICT,
@@ -51,31 +56,34 @@ async def signup(
             detail="Invalid password"
         )
 
-    hashed_password = auth_service.hash_password(body.password)
-
-    verification_token = str(uuid.uuid4())
+    hashed_password = await asyncio.to_thread(auth_service.hash_password, body.password)
 
-    new_user = auth.models.User(
-        username=body.username,
-        hash_password=hashed_password,
-        verification_token=verification_token
-    )
-
-    db.add(new_user)
-    db.commit()
+    db.info["sticky_key"] = body.username
+    user_id = await asyncio.to_thread(account_service.create_user, db, body.username, hashed_password)
+    if user_id is None:
+        raise fastapi.HTTPException(
+            fastapi.status.HTTP_409_CONFLICT,
+            detail="Account already exists"
+        )
 
-    return new_user
+    background_tasks.add_task(account_service.start_verification, user_id, body.username)
+    return {"id": user_id, "username": body.username, "hash_password": hashed_password}
 
 
 @router.post("/login")
 async def login(
+    request: fastapi.Request,
     body: fastapi.security.OAuth2PasswordRequestForm = fastapi.Depends(),
     db = fastapi.Depends(database.get_database)
 ) -> auth.schemas.Token:
     """
     Log in an existing user and generate access and refresh tokens.
 
+    Repeated failures lock the username and the client address for a while;
+    locked attempts are refused before touching the database or hashing.
+
     Args:
+        request (Request): The current request.
         body (OAuth2PasswordRequestForm): User's login credentials (username, password).
         db (Session): Database session dependency.
 
@@ -84,15 +92,32 @@ async def login(
 
     Raises:
         AuthException: If user is not found or credentials are incorrect.
-        HTTPException: If the user email is not verified (403 Forbidden).
+        HTTPException: If too many attempts failed (429 Too Many Requests) or
+            the user email is not verified (403 Forbidden).
     """
-    user = db.query(auth.models.User).filter(auth.models.User.username==body.username).first()
+    client_ip = request.client.host if request.client else None
+    retry_after = login_throttle.retry_after(body.username, client_ip)
+    if retry_after:
+        raise fastapi.HTTPException(
+            status_code=fastapi.status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many failed login attempts",
+            headers={"Retry-After": str(int(retry_after) + 1)}
+        )
+
+    user = db.scalars(auth.service.USER_BY_USERNAME, {"username": body.username}).first()
     if user is None:
-        raise auth.exceptions.AuthException("no such user")
+        auth_service.dummy_verify(body.password)
+        login_throttle.record_failure(body.username, client_ip)
+        raise auth.exceptions.AuthException("incorrect credentials")
 
-    verification = auth_service.verify_password(body.password, user.hash_password)
+    verification, new_hash = auth_service.verify_and_update(body.password, user.hash_password)
     if not verification:
+        login_throttle.record_failure(body.username, client_ip)
         raise auth.exceptions.AuthException("incorrect credentials")
+
+    login_throttle.reset(body.username)
+    if new_hash is not None:
+        user.hash_password = new_hash
     
     if not user.is_verified:
         raise fastapi.HTTPException(
@@ -104,6 +129,7 @@ async def login(
     access_token = await auth_service.create_access_token(payload={"sub": body.username})
 
     user.refresh_token = refresh_token
+    db.info["sticky_key"] = body.username
     db.commit()
 
     return {
@@ -133,6 +159,34 @@ async def logout(
 
     return {"result": "Success"}
 
+@router.delete("/account")
+async def delete_account(
+    response: fastapi.Response,
+    user = fastapi.Depends(auth_service.get_user),
+    db = fastapi.Depends(database.get_database)
+) -> auth.schemas.DeleteAccountResponse:
+    """
+    Delete the currently authenticated user together with all their contacts.
+
+    Large accounts are disabled immediately and purged by a ``purge`` job.
+
+    Args:
+        response (Response): The outgoing response, set to 202 when purging.
+        user: The currently authenticated user (depends on authentication).
+        db (Session): Database session dependency.
+
+    Returns:
+        auth.schemas.DeleteAccountResponse: "Deleted", or "Scheduled" when the
+        contacts are still being removed.
+    """
+    user_id = user.id
+    if account_service.delete_account(db, user):
+        jobs.service.enqueue(db, user_id, "purge", limited=False)
+        response.status_code = fastapi.status.HTTP_202_ACCEPTED
+        return {"result": "Scheduled"}
+
+    return {"result": "Deleted"}
+
 @router.get("/verify/{token}")
 async def verify_email(token: str, db = fastapi.Depends(database.get_database)):
     """
@@ -154,6 +208,7 @@ async def verify_email(token: str, db = fastapi.Depends(database.get_database)):
     
     user.is_verified = True
     user.verification_token = None
+    db.info["sticky_key"] = user.username
     db.commit()
     
     return {"message": "Email verified successfully"}
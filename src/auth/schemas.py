@@ -20,3 +20,6 @@ class Token(pydantic.BaseModel):
 
 class LogoutResponse(pydantic.BaseModel):
     result: str
+
+class DeleteAccountResponse(pydantic.BaseModel):
+    result: str
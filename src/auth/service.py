@@ -3,23 +3,33 @@ import typing
 import fastapi
 import fastapi.security
 import datetime
-import passlib.context
 import os
+import sqlalchemy
 from dotenv import load_dotenv
 load_dotenv()
 import auth.models
 import auth.exceptions
+import auth.hashing
 import database
 
+# Built once: executing a prebuilt statement skips expression construction
+# and reuses its memoized cache key.
+USER_BY_USERNAME = (
+    sqlalchemy.select(auth.models.User)
+    .where(auth.models.User.username == sqlalchemy.bindparam("username"))
+    .limit(1)
+)
+
 class Auth:
     """
     The Auth class manages authentication, including password hashing,
     JWT token generation, and validation.
     """
-    HASH_CONTEXT = passlib.context.CryptContext(schemes=["bcrypt"])
+    HASH_CONTEXT = auth.hashing.build_context()
     ALGORITHM = os.environ.get('ALGORITHM')
     SECRET = os.environ.get('SECRET_KEY')
     oauth2_schema = fastapi.security.OAuth2PasswordBearer("/auth/login")
+    _dummy_hash = None
 
     def verify_password(
         self,
@@ -38,6 +48,45 @@ class Auth:
         """
         return self.HASH_CONTEXT.verify(plain_password, hashed_password)
 
+    def dummy_verify(self, plain_password: str) -> bool:
+        """
+        Spends the same time as ``verify_password`` without a real hash.
+
+        Used for unknown usernames so that response time does not reveal
+        which accounts exist.
+
+        Args:
+            plain_password (str): The plain password provided by the client.
+
+        Returns:
+            bool: Always False.
+        """
+        if Auth._dummy_hash is None:
+            Auth._dummy_hash = self.HASH_CONTEXT.hash("dummy-password")
+        self.HASH_CONTEXT.verify(plain_password, Auth._dummy_hash)
+        return False
+
+    def verify_and_update(
+        self,
+        plain_password: str,
+        hashed_password: str
+    ) -> tuple[bool, str | None]:
+        """
+        Verifies a password and rehashes it if the stored hash is outdated.
+
+        A hash is outdated when it uses a deprecated scheme or a lower cost
+        than the current configuration.
+
+        Args:
+            plain_password (str): The plain password provided by the user.
+            hashed_password (str): The hashed password stored in the database.
+
+        Returns:
+            tuple[bool, str | None]: Whether the password matches, and the
+            replacement hash or None if the stored one is current.
+        """
+        return self.HASH_CONTEXT.verify_and_update(plain_password, hashed_password)
+
     def hash_password(self, plain_password: str) -> str:
         """
         Hashes the given plain password.
@@ -124,6 +173,42 @@ class Auth:
             AuthException: If the token is invalid, the user is not found, 
                            or the refresh token is not available.
         """
+        return self._authenticate(token, db)
+
+    def get_read_user(
+        self,
+        token = fastapi.Depends(oauth2_schema),
+        db = fastapi.Depends(database.get_read_database)
+    ) -> auth.models.User:
+        """
+        Retrieves the user for read-only routes using the read session.
+
+        When the replica has not caught up yet (the user was just created or
+        logged in), the lookup is retried on the primary.
+
+        Args:
+            token (str): The JWT token provided by the user.
+            db (Session): The read-only database session.
+
+        Returns:
+            auth.models.User: The user retrieved from the database.
+
+        Raises:
+            AuthException: If the token is invalid or the user cannot log in.
+        """
+        try:
+            return self._authenticate(token, db)
+        except auth.exceptions.AuthException:
+            if not database.routes_to_replica(db):
+                raise
+            db.expunge_all()
+            database.use_primary(db)
+            return self._authenticate(token, db)
+
+    def _authenticate(self, token: str, db) -> auth.models.User:
+        """
+        Decodes the access token and loads its user with the given session.
+        """
         try:
             payload = jose.jwt.decode(
                 token, self.SECRET, algorithms=[self.ALGORITHM]
@@ -135,13 +220,16 @@ class Auth:
                 if username is None:
                     raise auth.exceptions.AuthException("Invalid user")
 
-                user = db.query(auth.models.User).filter(auth.models.User.username==username).first()
+                db.info["sticky_key"] = username
+
+                user = db.scalars(USER_BY_USERNAME, {"username": username}).first()
                 if user is None:
                     raise auth.exceptions.AuthException("No such user")
                 
                 if user.refresh_token is None:
                     raise auth.exceptions.AuthException("No way")
 
+                db.info["user_id"] = user.id
                 return user
 
             elif payload['scope'] == "refresh_token":
@@ -0,0 +1,83 @@
+import collections
+import os
+import time
+
+LOGIN_MAX_FAILURES_PER_USER = int(os.environ.get('LOGIN_MAX_FAILURES_PER_USER', 5))
+LOGIN_MAX_FAILURES_PER_IP = int(os.environ.get('LOGIN_MAX_FAILURES_PER_IP', 50))
+LOGIN_WINDOW_SECONDS = float(os.environ.get('LOGIN_WINDOW_SECONDS', 900))
+LOGIN_TRACKED_KEYS = int(os.environ.get('LOGIN_TRACKED_KEYS', 100_000))
+
+
+class LoginThrottle:
+    """
+    In-memory tracker of failed logins per username and per client IP.
+
+    A key is locked once it has ``max_failures`` failures within the sliding
+    ``window``. Only the last ``max_failures`` timestamps of a key are kept
+    and at most ``max_keys`` keys are tracked, evicting the least recently
+    used one, so memory stays bounded under credential stuffing. State is
+    per process.
+    """
+
+    def __init__(
+        self,
+        max_failures_per_user: int = LOGIN_MAX_FAILURES_PER_USER,
+        max_failures_per_ip: int = LOGIN_MAX_FAILURES_PER_IP,
+        window: float = LOGIN_WINDOW_SECONDS,
+        max_keys: int = LOGIN_TRACKED_KEYS,
+        clock=time.monotonic
+    ):
+        self.limits = {"user": max_failures_per_user, "ip": max_failures_per_ip}
+        self.window = window
+        self.max_keys = max_keys
+        self._clock = clock
+        self._failures: collections.OrderedDict[tuple[str, str], collections.deque] = collections.OrderedDict()
+
+    def _retry_after(self, kind: str, value: str, now: float) -> float:
+        failures = self._failures.get((kind, value))
+        if failures is None or len(failures) < self.limits[kind]:
+            return 0.0
+        return max(0.0, failures[0] + self.window - now)
+
+    def retry_after(self, username: str, ip: str | None) -> float:
+        """
+        Tells how long a login attempt must wait.
+
+        Args:
+            username (str): The username being logged into.
+            ip (str | None): The client address.
+
+        Returns:
+            float: Seconds until the lockout ends, 0 if the attempt may proceed.
+        """
+        now = self._clock()
+        return max(self._retry_after("user", username, now), self._retry_after("ip", ip, now))
+
+    def record_failure(self, username: str, ip: str | None) -> None:
+        """
+        Counts a failed login against the username and the client address.
+
+        Args:
+            username (str): The username that failed.
+            ip (str | None): The client address.
+        """
+        now = self._clock()
+        for kind, value in (("user", username), ("ip", ip)):
+            key = (kind, value)
+            failures = self._failures.get(key)
+            if failures is None:
+                failures = self._failures[key] = collections.deque(maxlen=self.limits[kind])
+                if len(self._failures) > self.max_keys:
+                    self._failures.popitem(last=False)
+            else:
+                self._failures.move_to_end(key)
+            failures.append(now)
+
+    def reset(self, username: str) -> None:
+        """
+        Forgets failures of a username after a successful login.
+
+        Args:
+            username (str): The username that logged in.
+        """
+        self._failures.pop(("user", username), None)
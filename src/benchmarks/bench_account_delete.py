@@ -0,0 +1,118 @@
+"""
+Deleting an account with a very large address book.
+
+Seeds one user with N contacts (default 500k) in a SQLite file, then times
+three ways of removing them, each on a fresh copy of the file:
+
+- ``orm``: ``session.delete(user)`` with the relationship loading and
+  deleting every contact one by one (what a plain ``cascade="all"`` does).
+- ``cascade``: one ``DELETE FROM users``, contacts removed by
+  ``ON DELETE CASCADE`` (``account_service.delete_account`` for small accounts).
+- ``chunked``: ``account_service.purge_account`` in chunks of
+  ``ACCOUNT_PURGE_CHUNK_SIZE``; also reports the longest write transaction,
+  which is how long other writers can be blocked.
+
+Run from ``src``::
+
+    python -m benchmarks.bench_account_delete [N]
+"""
+import datetime
+import os
+import shutil
+import sys
+import tempfile
+import time
+import sqlalchemy
+import sqlalchemy.orm as orm
+import database
+import auth.models
+import contacts.schema as schema
+from services import account_service
+
+BATCH_SIZE = 50_000
+
+
+def rows(start, count):
+    return [
+        {
+            "user_id": 1, "name": f"Name{i}", "surename": f"Surname{i % 1000}",
+            "email": f"contact{i}@example.com", "phone_number": f"{i:012d}",
+            "date_of_birth": datetime.date(1990, 1, 1), "description": "",
+        }
+        for i in range(start, start + count)
+    ]
+
+
+def seed(engine, count):
+    with engine.begin() as connection:
+        connection.execute(sqlalchemy.insert(auth.models.User).values(id=1, username="bench", hash_password="x"))
+        for start in range(0, count, BATCH_SIZE):
+            connection.execute(sqlalchemy.insert(schema.Contacts), rows(start, min(BATCH_SIZE, count - start)))
+
+
+def fresh_engine(template, directory, name):
+    path = os.path.join(directory, name)
+    shutil.copy(template, path)
+    engine = sqlalchemy.create_engine(f"sqlite:///{path}")
+    database.enable_foreign_keys(engine)
+    return engine
+
+
+def delete_orm(engine):
+    with orm.Session(engine) as db:
+        user = db.get(auth.models.User, 1)
+        for contact in db.scalars(sqlalchemy.select(schema.Contacts).where(schema.Contacts.user_id == 1)):
+            db.delete(contact)
+        db.delete(user)
+        db.commit()
+
+
+def delete_cascade(engine):
+    with engine.begin() as connection:
+        connection.execute(sqlalchemy.delete(auth.models.User).where(auth.models.User.id == 1))
+
+
+def delete_chunked(engine):
+    longest = 0.0
+
+    @sqlalchemy.event.listens_for(engine, "begin")
+    def begin(connection):
+        connection.info["began"] = time.perf_counter()
+
+    @sqlalchemy.event.listens_for(engine, "commit")
+    def commit(connection):
+        nonlocal longest
+        longest = max(longest, time.perf_counter() - connection.info.pop("began"))
+
+    database.engine = engine
+    account_service.purge_account(1)
+    return longest
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    with tempfile.TemporaryDirectory() as directory:
+        template = os.path.join(directory, "template.sqlite")
+        engine = sqlalchemy.create_engine(f"sqlite:///{template}")
+        database.Base.metadata.create_all(engine)
+        start = time.perf_counter()
+        seed(engine, count)
+        engine.dispose()
+        print(f"seeded {count} contacts in {time.perf_counter() - start:.1f} s")
+
+        for name, delete in [("orm", delete_orm), ("cascade", delete_cascade), ("chunked", delete_chunked)]:
+            engine = fresh_engine(template, directory, f"{name}.sqlite")
+            start = time.perf_counter()
+            longest = delete(engine)
+            elapsed = time.perf_counter() - start
+            with engine.connect() as connection:
+                left = connection.execute(sqlalchemy.select(sqlalchemy.func.count()).select_from(schema.Contacts)).scalar()
+            line = f"{name:8} {elapsed:7.2f} s  ({left} contacts left)"
+            if longest is not None:
+                line += f"  longest transaction {longest * 1000:.0f} ms"
+            print(line)
+            engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
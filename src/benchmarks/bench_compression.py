@@ -0,0 +1,86 @@
+"""
+CPU time against bytes saved for compressing contact list responses.
+
+Builds a realistic ``GET /api/contacts/`` body (N contacts, default 10k,
+with varied names, emails, phones and descriptions) and the same contacts
+as an NDJSON export in ``EXPORT_CHUNK_SIZE`` chunks, then compresses them
+with every available encoder at several levels. Streams are flushed after
+every chunk like the middleware does.
+
+Run from ``src``::
+
+    python -m benchmarks.bench_compression [N]
+"""
+import datetime
+import json
+import random
+import sys
+import time
+import compression
+from contacts.routes import EXPORT_CHUNK_SIZE
+
+LEVELS = {
+    "gzip": (1, 4, 6, 9),
+    "br": (1, 4, 6, 9, 11),
+    "zstd": (1, 3, 6, 12, 19),
+}
+FIRST_NAMES = ["Taras", "Lesya", "Ivan", "Olena", "Mykola", "Iryna", "Petro", "Sofia", "Andriy", "Oksana"]
+DOMAINS = ["gmail.com", "ukr.net", "i.ua", "example.com", "outlook.com", "company.com.ua"]
+WORDS = ["friend", "work", "school", "neighbour", "gym", "client", "family", "met at conference", "call back"]
+
+
+def contacts(count):
+    rng = random.Random(7)
+    rows = []
+    for i in range(count):
+        name = rng.choice(FIRST_NAMES)
+        surename = f"{rng.choice(['Shevchenko', 'Franko', 'Kostenko', 'Bondar', 'Melnyk', 'Tkachenko'])}{rng.randrange(300)}"
+        rows.append({
+            "id": i + 1, "name": name, "surename": surename,
+            "email": f"{name.lower()}.{surename.lower()}{rng.randrange(100)}@{rng.choice(DOMAINS)}",
+            "phone_number": f"+380{rng.randrange(10**9):09d}",
+            "date_of_birth": str(datetime.date(1950, 1, 1) + datetime.timedelta(days=rng.randrange(25000))),
+            "description": " ".join(rng.sample(WORDS, rng.randrange(4))),
+        })
+    return rows
+
+
+def measure(encoder_class, level, chunks):
+    best = None
+    for _ in range(3):
+        start = time.perf_counter()
+        encoder = encoder_class(level)
+        if len(chunks) == 1:
+            output = encoder.compress(chunks[0]) + encoder.finish()
+        else:
+            output = b"".join(encoder.compress(chunk) + encoder.flush() for chunk in chunks) + encoder.finish()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return len(output), best
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    rows = contacts(count)
+    body = json.dumps(rows).encode()
+    lines = [json.dumps(row) + "\n" for row in rows]
+    stream = [
+        "".join(lines[start:start + EXPORT_CHUNK_SIZE]).encode()
+        for start in range(0, len(lines), EXPORT_CHUNK_SIZE)
+    ]
+
+    for title, chunks in (("JSON list", [body]), (f"NDJSON export, {EXPORT_CHUNK_SIZE} per chunk", stream)):
+        size = sum(len(chunk) for chunk in chunks)
+        print(f"\n{title}: {count} contacts, {size / 1024:.0f} KiB")
+        print(f"{'encoding':10} {'level':>5} {'KiB':>8} {'ratio':>6} {'ms':>8} {'MiB/s':>7}")
+        for name, encoder_class in compression.available_encoders().items():
+            for level in LEVELS[name]:
+                compressed, elapsed = measure(encoder_class, level, chunks)
+                print(
+                    f"{name:10} {level:5d} {compressed / 1024:8.0f} {size / compressed:6.1f} "
+                    f"{elapsed * 1000:8.1f} {size / elapsed / 2**20:7.0f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
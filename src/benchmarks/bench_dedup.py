@@ -0,0 +1,88 @@
+"""
+Duplicate detection on a large address book.
+
+Seeds one user with N contacts (default 1M) in a SQLite file, about 5% of
+them re-imported copies with different email/phone formatting or a typo in
+the first name, then times ``dedup.find_duplicates``.
+
+Run from ``src``::
+
+    python -m benchmarks.bench_dedup [N]
+"""
+import datetime
+import os
+import random
+import sys
+import tempfile
+import time
+import sqlalchemy
+import sqlalchemy.orm as orm
+import database
+import auth.models
+import contacts.schema as schema
+import contacts.normalize as normalize
+import contacts.dedup as dedup
+
+FIRST_NAMES = ["John", "Mary", "Olena", "Taras", "Anna", "Petro", "Iryna", "Max", "Sofia", "Ivan"]
+DUPLICATE_RATE = 0.05
+BATCH_SIZE = 50_000
+
+
+def row(i, name, surename, email, phone):
+    return {
+        "user_id": 1, "name": name, "surename": surename, "email": email,
+        "phone_number": phone, "date_of_birth": datetime.date(1990, 1, 1) + datetime.timedelta(days=i % 9000),
+        "description": "", "email_normalized": normalize.normalize_email(email),
+        "phone_normalized": normalize.normalize_phone(phone), "name_key": normalize.normalize_name(surename),
+    }
+
+
+def seed(engine, count):
+    rng = random.Random(42)
+    contacts = schema.Contacts.__table__
+    batch = []
+    with engine.begin() as connection:
+        connection.execute(sqlalchemy.insert(auth.models.User).values(id=1, username="bench", hash_password="x"))
+        for i in range(count):
+            name = rng.choice(FIRST_NAMES)
+            surename = f"Surname{rng.randrange(count // 4)}"
+            if i and rng.random() < DUPLICATE_RATE:
+                kind = rng.randrange(3)
+                if kind == 0:
+                    batch.append(row(i, name, surename, f"Person{i - 1}+import@Example.com", f"{i:012d}"))
+                elif kind == 1:
+                    batch.append(row(i, name, surename, f"other{i}@example.com", f"+{i - 1:012d}"[:-2] + "-" + f"{i - 1:012d}"[-2:]))
+                else:
+                    batch.append(row(i, name + "a", surename, f"typo{i}@example.com", f"9{i:011d}"))
+            else:
+                batch.append(row(i, name, surename, f"person{i}@example.com", f"{i:012d}"))
+            if len(batch) == BATCH_SIZE:
+                connection.execute(sqlalchemy.insert(contacts), batch)
+                batch = []
+        if batch:
+            connection.execute(sqlalchemy.insert(contacts), batch)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    with tempfile.TemporaryDirectory() as directory:
+        engine = sqlalchemy.create_engine(f"sqlite:///{os.path.join(directory, 'bench.sqlite')}")
+        database.Base.metadata.create_all(engine)
+
+        start = time.perf_counter()
+        seed(engine, count)
+        print(f"seeded {count} contacts in {time.perf_counter() - start:.1f} s")
+
+        with orm.Session(engine) as db:
+            start = time.perf_counter()
+            groups = dedup.find_duplicates(db, 1)
+            elapsed = time.perf_counter() - start
+
+        print(f"duplicate groups:   {len(groups)}")
+        print(f"find_duplicates:    {elapsed:.2f} s")
+        print(f"per contact:        {elapsed / count * 1e6:.2f} us")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
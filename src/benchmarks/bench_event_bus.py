@@ -0,0 +1,54 @@
+"""
+Memory footprint of idle change-notification connections.
+
+Opens 10k subscriptions on an ``EventBus``, each with a task parked in
+``Subscription.get`` like an idle SSE/WebSocket handler, and reports the
+traced memory per connection plus the cost of one fan-out.
+
+Run from ``src``::
+
+    python -m benchmarks.bench_event_bus
+"""
+import asyncio
+import time
+import tracemalloc
+import services.event_bus as event_bus
+
+CONNECTIONS = 10_000
+USERS = 1_000
+
+
+async def main():
+    bus = event_bus.EventBus()
+
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+
+    subscriptions = [bus.subscribe(i % USERS) for i in range(CONNECTIONS)]
+    waiters = [asyncio.ensure_future(s.get()) for s in subscriptions]
+    await asyncio.sleep(0)
+
+    after, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    used = after - before
+    print(f"connections:            {CONNECTIONS}")
+    print(f"traced memory:          {used / 1024 / 1024:.2f} MiB")
+    print(f"per connection:         {used / CONNECTIONS:.0f} B")
+    print(f"peak while subscribing: {(peak - before) / 1024 / 1024:.2f} MiB")
+
+    start = time.perf_counter()
+    for user_id in range(USERS):
+        bus.publish(user_id, "updated", 1)
+    elapsed = time.perf_counter() - start
+    print(f"fan-out to all users:   {elapsed * 1000:.2f} ms")
+
+    for waiter in waiters:
+        waiter.cancel()
+    await asyncio.gather(*waiters, return_exceptions=True)
+    for subscription in subscriptions:
+        bus.unsubscribe(subscription)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
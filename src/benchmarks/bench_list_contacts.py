@@ -0,0 +1,113 @@
+"""
+Listing a 100k-contact address book: ORM instances vs Core records.
+
+Seeds one user with N contacts (default 100k) in a SQLite file and builds
+the ``GET /api/contacts/`` response body both ways:
+
+- ``orm``: ``db.query(Contacts).all()``, as the list routes used to.
+- ``records``: ``records.fetch_contacts``, Core rows as named tuples.
+
+Both are validated into ``ContactResponse`` and serialized to JSON like
+FastAPI does. Each variant runs in its own process so the reported peak
+RSS (``ru_maxrss``) is not shared; the Python heap peak comes from
+``tracemalloc`` in a separate, untimed run.
+
+Run from ``src``::
+
+    python -m benchmarks.bench_list_contacts [N]
+"""
+import datetime
+import multiprocessing
+import os
+import resource
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+import pydantic
+import sqlalchemy
+import sqlalchemy.orm as orm
+import database
+import auth.models
+import contacts.model as model
+import contacts.records as records
+import contacts.schema as schema
+
+BATCH_SIZE = 50_000
+REPEATS = 5
+RESPONSE = pydantic.TypeAdapter(list[model.ContactResponse])
+
+
+def seed(engine, count):
+    with engine.begin() as connection:
+        connection.execute(sqlalchemy.insert(auth.models.User).values(id=1, username="bench", hash_password="x"))
+        for start in range(0, count, BATCH_SIZE):
+            connection.execute(sqlalchemy.insert(schema.Contacts), [
+                {
+                    "user_id": 1, "name": f"Name{i}", "surename": f"Surname{i % 1000}",
+                    "email": f"contact{i}@example.com", "phone_number": f"{i:012d}",
+                    "date_of_birth": datetime.date(1970, 1, 1) + datetime.timedelta(days=i % 18000),
+                    "description": "",
+                }
+                for i in range(start, min(start + BATCH_SIZE, count))
+            ])
+
+
+def load_orm(db):
+    return db.query(schema.Contacts).filter(schema.Contacts.user_id == 1).all()
+
+
+def load_records(db):
+    return records.fetch_contacts(db, 1)
+
+
+def respond(session_factory, load):
+    with session_factory() as db:
+        rows = load(db)
+        return RESPONSE.dump_json(RESPONSE.validate_python(rows, from_attributes=True))
+
+
+def run(path, name, queue):
+    engine = sqlalchemy.create_engine(f"sqlite:///{path}")
+    session_factory = orm.sessionmaker(engine)
+    load = {"orm": load_orm, "records": load_records}[name]
+
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    timings = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        body = respond(session_factory, load)
+        timings.append(time.perf_counter() - start)
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline
+
+    tracemalloc.start()
+    respond(session_factory, load)
+    heap = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    queue.put((statistics.median(timings), rss / 1024, heap / 2**20, len(body)))
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "bench.sqlite")
+        engine = sqlalchemy.create_engine(f"sqlite:///{path}")
+        database.Base.metadata.create_all(engine)
+        seed(engine, count)
+        engine.dispose()
+        print(f"seeded {count} contacts")
+
+        context = multiprocessing.get_context("spawn")
+        for name in ("orm", "records"):
+            queue = context.Queue()
+            process = context.Process(target=run, args=(path, name, queue))
+            process.start()
+            latency, rss, heap, size = queue.get()
+            process.join()
+            print(f"{name:8} {latency * 1000:7.0f} ms  peak RSS +{rss:6.1f} MiB  peak heap {heap:6.1f} MiB  ({size / 2**20:.1f} MiB JSON)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""
+Login capacity per core for each password hashing scheme.
+
+Times ``CryptContext.verify`` (the CPU cost of one login) in a single
+process for bcrypt at several costs and, when argon2-cffi is installed,
+for argon2id, and reports logins per second per core.
+
+Run from ``src``::
+
+    python -m benchmarks.bench_password_hash
+"""
+import time
+import passlib.hash
+import auth.hashing as hashing
+
+SAMPLES = 10
+
+
+def logins_per_second(context) -> tuple[float, float]:
+    hashed = context.hash(hashing.CALIBRATION_PASSWORD)
+    start = time.perf_counter()
+    for _ in range(SAMPLES):
+        context.verify(hashing.CALIBRATION_PASSWORD, hashed)
+    per_login = (time.perf_counter() - start) / SAMPLES
+    return per_login * 1000, 1 / per_login
+
+
+def main():
+    configurations = [
+        (f"bcrypt rounds={rounds}", hashing.build_context(["bcrypt"], bcrypt_rounds=rounds))
+        for rounds in (10, 11, 12, 13)
+    ]
+    if passlib.hash.argon2.has_backend():
+        configurations += [
+            (f"argon2id m={memory // 1024}MiB t={time_cost} p=1",
+             hashing.build_context(["argon2"], argon2_memory_cost=memory, argon2_time_cost=time_cost, argon2_parallelism=1))
+            for memory, time_cost in ((19456, 2), (65536, 3), (131072, 3))
+        ]
+
+    print(f"{'scheme':32} {'ms/login':>10} {'logins/s/core':>14}")
+    for name, context in configurations:
+        elapsed, rate = logins_per_second(context)
+        print(f"{name:32} {elapsed:10.1f} {rate:14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+A burst of concurrent signups.
+
+Starts the app on a fresh SQLite file and fires N signups at once (default
+1000) through an in-process ASGI client; every tenth request reuses an
+earlier username, so duplicates race their originals. Reports the status
+codes, latency percentiles and signups per second.
+
+With all requests arriving at once, the last ones cannot finish before
+every password has been hashed, so latency is compared with that floor:
+the time one hash takes times N, divided by the cores. The run fails if any
+request gets a 5xx, a duplicate is not refused with 409, or p99 latency is
+more than ``--max-factor`` times the floor.
+
+bcrypt runs at ``BCRYPT_ROUNDS`` unless ``--rounds`` is given.
+
+Run from ``src``::
+
+    python -m benchmarks.bench_signup_burst [--requests N] [--rounds R]
+"""
+import argparse
+import asyncio
+import collections
+import os
+import statistics
+import sys
+import tempfile
+import time
+import httpx
+import database
+import auth.hashing as hashing
+import auth.service
+from main import app
+
+
+async def signup(http, username, latencies):
+    start = time.perf_counter()
+    response = await http.post("/auth/signup", json={"username": username, "password": "burst-password"})
+    latencies.append(time.perf_counter() - start)
+    return response.status_code
+
+
+async def burst(count):
+    usernames = [f"user{i - 5 if i % 10 == 9 else i}@example.com" for i in range(count)]
+    latencies = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as http:
+        start = time.perf_counter()
+        statuses = await asyncio.gather(*(signup(http, username, latencies) for username in usernames))
+        elapsed = time.perf_counter() - start
+    return usernames, statuses, latencies, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent signup burst")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=hashing.BCRYPT_ROUNDS)
+    parser.add_argument("--max-factor", type=float, default=3.0)
+    args = parser.parse_args()
+
+    auth.service.Auth.HASH_CONTEXT = hashing.build_context(["bcrypt"], bcrypt_rounds=args.rounds)
+    floor = hashing.measure(auth.service.Auth.HASH_CONTEXT) * args.requests / (os.cpu_count() or 1)
+    with tempfile.TemporaryDirectory() as directory:
+        database.connect(f"sqlite:///{os.path.join(directory, 'burst.sqlite')}")
+        usernames, statuses, latencies, elapsed = asyncio.run(burst(args.requests))
+        database.engine.dispose()
+
+    counts = collections.Counter(statuses)
+    expected_conflicts = len(usernames) - len(set(usernames))
+    latencies.sort()
+    p50 = statistics.median(latencies)
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    print(f"{args.requests} signups, bcrypt rounds={args.rounds}, {elapsed:.2f} s, {counts[201] / elapsed:.0f} signups/s")
+    print("statuses: " + ", ".join(f"{status}={n}" for status, n in sorted(counts.items())))
+    print(f"latency p50 {p50 * 1000:.0f} ms  p99 {p99 * 1000:.0f} ms  max {latencies[-1] * 1000:.0f} ms")
+    print(f"hashing floor {floor * 1000:.0f} ms on {os.cpu_count()} cores, p99 is {p99 / floor:.1f}x")
+
+    if any(status >= 500 for status in statuses) or counts[409] != expected_conflicts:
+        print(f"FAILED: expected {expected_conflicts} conflicts and no 5xx")
+        sys.exit(1)
+    if p99 > floor * args.max_factor:
+        print(f"FAILED: p99 latency above {args.max_factor}x the hashing floor")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Per-request ORM overhead of the hot statements, before and after prebuilding.
+
+Times, on an in-memory SQLite database with a session per call like a
+request, the three statements every authenticated route runs:
+
+- user lookup by username (``Auth.get_user``),
+- contact by id (``get_by_id``),
+- contacts of a user (``root``, 10 contacts so row handling stays small).
+
+``before`` builds the statement per call the way the routes used to
+(``db.query(...).filter(...)``); ``after`` executes the prebuilt statements
+from ``auth.service`` and ``contacts.records``. ``lambda`` is the
+``lambda_stmt`` alternative. Best of several rounds, in microseconds per call.
+
+Run from ``src``::
+
+    python -m benchmarks.bench_statement_cache [calls]
+"""
+import datetime
+import sys
+import timeit
+import sqlalchemy
+import sqlalchemy.orm as orm
+import database
+import auth.models
+import auth.service
+import contacts.records as records
+import contacts.schema as schema
+
+ROUNDS = 5
+User = auth.models.User
+Contacts = schema.Contacts
+
+
+def variants(sessions):
+    def user_before():
+        with sessions() as db:
+            db.query(User).filter(User.username == "bench").first()
+
+    def user_lambda():
+        username = "bench"
+        with sessions() as db:
+            db.scalars(sqlalchemy.lambda_stmt(
+                lambda: sqlalchemy.select(User).where(User.username == username).limit(1)
+            )).first()
+
+    def user_after():
+        with sessions() as db:
+            db.scalars(auth.service.USER_BY_USERNAME, {"username": "bench"}).first()
+
+    def contact_before():
+        with sessions() as db:
+            db.query(Contacts).filter(Contacts.id == 3, Contacts.user_id == 1).first()
+
+    def contact_lambda():
+        contact_id, user_id = 3, 1
+        with sessions() as db:
+            db.execute(sqlalchemy.lambda_stmt(
+                lambda: sqlalchemy.select(*records.COLUMNS).where(Contacts.id == contact_id, Contacts.user_id == user_id)
+            )).first()
+
+    def contact_after():
+        with sessions() as db:
+            records.fetch_contact(db, 1, 3)
+
+    def list_before():
+        with sessions() as db:
+            db.query(Contacts).filter(Contacts.user_id == 1).all()
+
+    def list_lambda():
+        user_id = 1
+        with sessions() as db:
+            [records.ContactRecord._make(row) for row in db.execute(sqlalchemy.lambda_stmt(
+                lambda: sqlalchemy.select(*records.COLUMNS).where(Contacts.user_id == user_id)
+            ))]
+
+    def list_after():
+        with sessions() as db:
+            records.fetch_contacts(db, 1)
+
+    return {
+        "user by username": (user_before, user_lambda, user_after),
+        "contact by id": (contact_before, contact_lambda, contact_after),
+        "contacts of user": (list_before, list_lambda, list_after),
+    }
+
+
+def best(function, calls):
+    function()
+    return min(timeit.repeat(function, number=calls, repeat=ROUNDS)) / calls * 1e6
+
+
+def main():
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    engine = database.create_engine("sqlite://")
+    database.Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(sqlalchemy.insert(User).values(id=1, username="bench", hash_password="x", refresh_token="x"))
+        connection.execute(sqlalchemy.insert(Contacts), [
+            {
+                "user_id": 1, "name": f"Name{i}", "surename": "Surname", "email": f"c{i}@example.com",
+                "phone_number": "+380501234567", "date_of_birth": datetime.date(1990, 1, 1), "description": "",
+            }
+            for i in range(10)
+        ])
+    sessions = orm.sessionmaker(engine)
+
+    print(f"{'statement':18} {'before':>8} {'lambda':>8} {'after':>8}  (us per call)")
+    for name, (before, with_lambda, after) in variants(sessions).items():
+        print(f"{name:18} {best(before, calls):8.0f} {best(with_lambda, calls):8.0f} {best(after, calls):8.0f}")
+    print(database.statement_cache_stats())
+
+
+if __name__ == "__main__":
+    main()
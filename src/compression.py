@@ -0,0 +1,220 @@
+"""
+Response compression negotiated with ``Accept-Encoding``.
+
+Supports gzip always, and brotli (``br``) and zstd when the ``brotli`` and
+``zstandard`` packages are installed. Configured from the environment:
+
+- ``COMPRESSION_ENCODINGS``: server preference, used to break ties between
+  encodings the client accepts with equal weight (default ``zstd,br,gzip``).
+- ``COMPRESSION_MIN_SIZE``: smaller complete bodies are sent as they are
+  (default 1024 bytes).
+- ``COMPRESSION_GZIP_LEVEL``, ``COMPRESSION_BROTLI_QUALITY``,
+  ``COMPRESSION_ZSTD_LEVEL``: defaults 6, 4 and 3, picked with
+  ``python -m benchmarks.bench_compression``.
+
+Streamed responses (NDJSON exports, Server-Sent Events) are compressed
+chunk by chunk, and every chunk is flushed so clients get each event as
+soon as it is produced.
+"""
+import os
+import zlib
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+ENCODINGS = [name.strip() for name in os.environ.get('COMPRESSION_ENCODINGS', 'zstd,br,gzip').split(',')]
+MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', 1024))
+GZIP_LEVEL = int(os.environ.get('COMPRESSION_GZIP_LEVEL', 6))
+BROTLI_QUALITY = int(os.environ.get('COMPRESSION_BROTLI_QUALITY', 4))
+ZSTD_LEVEL = int(os.environ.get('COMPRESSION_ZSTD_LEVEL', 3))
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/x-ndjson", "application/javascript", "+json")
+
+
+class GzipEncoder:
+    def __init__(self, level: int = GZIP_LEVEL):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+class BrotliEncoder:
+    def __init__(self, quality: int = BROTLI_QUALITY):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+class ZstdEncoder:
+    def __init__(self, level: int = ZSTD_LEVEL):
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_FINISH)
+
+
+def available_encoders() -> dict[str, type]:
+    """
+    Returns the encoders usable in this process, by ``Content-Encoding`` name.
+    """
+    encoders = {"gzip": GzipEncoder}
+    if brotli is not None:
+        encoders["br"] = BrotliEncoder
+    if zstandard is not None:
+        encoders["zstd"] = ZstdEncoder
+    return encoders
+
+
+def negotiate(accept_encoding: str, available: list[str]) -> str | None:
+    """
+    Picks the response encoding for an ``Accept-Encoding`` header.
+
+    Args:
+        accept_encoding (str): The request header.
+        available (list[str]): Usable encodings, preferred first.
+
+    Returns:
+        str | None: The encoding with the highest client weight, ties going
+        to the earlier one in ``available``, or None to send the body as is.
+    """
+    weights = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        weight = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                continue
+        weights[name.strip().lower()] = weight
+
+    best, best_weight = None, 0.0
+    for name in available:
+        weight = weights.get(name, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = name, weight
+    return best
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing response bodies.
+
+    Complete bodies of at least ``minimum_size`` bytes are compressed in one
+    go and keep a ``Content-Length``. Streamed bodies are compressed as they
+    are produced. Responses that are already encoded, or whose type is not
+    text or JSON, are passed through.
+    """
+
+    def __init__(self, app, minimum_size: int = MIN_SIZE, encoders: dict[str, type] | None = None):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.encoders = encoders or available_encoders()
+        self.preference = [name for name in ENCODINGS if name in self.encoders]
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept = next((value.decode("latin-1") for key, value in scope["headers"] if key == b"accept-encoding"), "")
+        encoding = negotiate(accept, self.preference)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        await self.app(scope, receive, _Responder(send, encoding, self.encoders[encoding], self.minimum_size))
+
+
+class _Responder:
+    def __init__(self, send, encoding: str, encoder: type, minimum_size: int):
+        self.send = send
+        self.encoding = encoding
+        self.encoder_class = encoder
+        self.minimum_size = minimum_size
+        self.start = None
+        self.encoder = None
+        self.passthrough = False
+
+    def _headers(self, drop: tuple[bytes, ...]) -> list:
+        headers = [(key, value) for key, value in self.start["headers"] if key.lower() not in drop]
+        vary = [value for key, value in self.start["headers"] if key.lower() == b"vary"]
+        if not vary:
+            headers.append((b"vary", b"Accept-Encoding"))
+        elif b"accept-encoding" not in vary[0].lower():
+            headers = [(key, value) for key, value in headers if key.lower() != b"vary"]
+            headers.append((b"vary", vary[0] + b", Accept-Encoding"))
+        headers.append((b"content-encoding", self.encoding.encode()))
+        return headers
+
+    async def __call__(self, message):
+        if message["type"] == "http.response.start":
+            headers = {key.lower(): value for key, value in message["headers"]}
+            content_type = headers.get(b"content-type", b"").decode("latin-1").split(";")[0]
+            self.passthrough = (
+                b"content-encoding" in headers
+                or not any(kind in content_type for kind in COMPRESSIBLE_TYPES)
+            )
+            if self.passthrough:
+                await self.send(message)
+            else:
+                self.start = message
+            return
+
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.encoder is None and not more_body:
+            # The whole body in one message.
+            if len(body) < self.minimum_size:
+                await self.send(self.start)
+                await self.send(message)
+                return
+            encoder = self.encoder_class()
+            compressed = encoder.compress(body) + encoder.finish()
+            headers = self._headers((b"content-length",))
+            headers.append((b"content-length", str(len(compressed)).encode()))
+            await self.send({**self.start, "headers": headers})
+            await self.send({"type": "http.response.body", "body": compressed})
+            return
+
+        if self.encoder is None:
+            self.encoder = self.encoder_class()
+            await self.send({**self.start, "headers": self._headers((b"content-length",))})
+
+        if more_body:
+            chunk = self.encoder.compress(body) + self.encoder.flush()
+        else:
+            chunk = self.encoder.compress(body) + self.encoder.finish()
+        await self.send({"type": "http.response.body", "body": chunk, "more_body": more_body})
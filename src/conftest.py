@@ -0,0 +1,238 @@
+"""
+Shared test fixtures.
+
+The schema is created once per test session in an in-memory SQLite
+template, and every test that needs a database gets its own in-memory copy
+made with the SQLite backup API, so tests never share state and can run in
+parallel (``pytest -n auto`` with pytest-xdist). ``seeded_engine`` copies a
+second template that already holds ``SEEDED_CONTACTS`` contacts.
+
+Password hashing uses bcrypt with the minimum cost for the whole session.
+"""
+import asyncio
+import collections
+import contextlib
+import datetime
+import sqlite3
+import pytest
+import sqlalchemy
+import sqlalchemy.orm as orm
+import sqlalchemy.pool
+from fastapi.testclient import TestClient
+import database
+import auth.hashing
+import auth.models
+import auth.routes
+import auth.service
+import auth.throttle
+import contacts.normalize as normalize
+import contacts.routes
+import contacts.schema as schema
+from main import app
+
+SEEDED_USERNAME = "seeded@example.com"
+SEEDED_PASSWORD = "seeded-password"
+SEEDED_CONTACTS = 10_000
+SEED_BATCH_SIZE = 5_000
+
+
+def contact_rows(user_id: int, count: int, start: int = 0) -> list[dict]:
+    """
+    Builds contact rows for Core inserts, normalized like the ORM does.
+    """
+    rows = []
+    for i in range(start, start + count):
+        email = f"contact{i}@example.com"
+        phone = f"+380{i:09d}"
+        surename = f"Surname{i % 1000}"
+        born = datetime.date(1970, 1, 1) + datetime.timedelta(days=i % 18000)
+        rows.append({
+            "user_id": user_id, "name": f"Name{i}", "surename": surename,
+            "email": email, "phone_number": phone, "date_of_birth": born,
+            "description": "", "email_normalized": normalize.normalize_email(email),
+            "phone_normalized": normalize.normalize_phone(phone),
+            "phone_key": normalize.phone_key(phone),
+            "name_key": normalize.normalize_name(surename),
+            "birthday_key": born.strftime("%m-%d"),
+        })
+    return rows
+
+
+def seed_contacts(engine: sqlalchemy.Engine, user_id: int, count: int) -> None:
+    """
+    Inserts ``count`` contacts for a user with batched Core inserts.
+    """
+    with engine.begin() as connection:
+        for start in range(0, count, SEED_BATCH_SIZE):
+            connection.execute(
+                sqlalchemy.insert(schema.Contacts),
+                contact_rows(user_id, min(SEED_BATCH_SIZE, count - start), start)
+            )
+
+
+def _engine_for(connection: sqlite3.Connection) -> sqlalchemy.Engine:
+    return sqlalchemy.create_engine(
+        "sqlite://", creator=lambda: connection, poolclass=sqlalchemy.pool.StaticPool
+    )
+
+
+def _template() -> sqlite3.Connection:
+    connection = sqlite3.connect(":memory:", check_same_thread=False)
+    database.Base.metadata.create_all(_engine_for(connection))
+    return connection
+
+
+def _clone(template: sqlite3.Connection) -> sqlite3.Connection:
+    connection = sqlite3.connect(":memory:", check_same_thread=False)
+    template.backup(connection)
+    return connection
+
+
+@pytest.fixture(scope="session", autouse=True)
+def fast_auth():
+    """
+    Uses the cheapest bcrypt cost and a fixed JWT secret for the session.
+    """
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(auth.service.Auth, "HASH_CONTEXT", auth.hashing.fast_context())
+        patch.setattr(auth.service.Auth, "_dummy_hash", None)
+        patch.setattr(auth.service.Auth, "SECRET", "test-secret")
+        patch.setattr(auth.service.Auth, "ALGORITHM", "HS256")
+        yield
+
+
+@pytest.fixture(scope="session")
+def template_database():
+    connection = _template()
+    yield connection
+    connection.close()
+
+
+@pytest.fixture(scope="session")
+def seeded_template_database():
+    connection = _template()
+    engine = _engine_for(connection)
+    with engine.begin() as db:
+        db.execute(sqlalchemy.insert(auth.models.User).values(
+            id=1,
+            username=SEEDED_USERNAME,
+            hash_password=auth.service.Auth.HASH_CONTEXT.hash(SEEDED_PASSWORD),
+            refresh_token="seeded",
+            is_verified=True,
+        ))
+    seed_contacts(engine, 1, SEEDED_CONTACTS)
+    yield connection
+    connection.close()
+
+
+@pytest.fixture
+def database_state(monkeypatch):
+    """
+    Gives the test pristine ``database`` module state and process-wide
+    request state (rate limits, login throttle).
+    """
+    monkeypatch.setattr(database, "DBSession", None)
+    monkeypatch.setattr(database, "engine", None)
+    monkeypatch.setattr(database, "read_engine", None)
+    monkeypatch.setattr(database, "shard_map", None)
+    monkeypatch.setattr(database, "_recent_writes", collections.OrderedDict())
+    monkeypatch.setattr(auth.routes, "login_throttle", auth.throttle.LoginThrottle())
+    contacts.routes.limiter.reset()
+    yield
+    app.dependency_overrides.clear()
+
+
+def _install(connection: sqlite3.Connection) -> sqlalchemy.Engine:
+    engine = _engine_for(connection)
+    database.enable_foreign_keys(engine)
+    database.engine = engine
+    database.DBSession = orm.sessionmaker(bind=engine, class_=database.RoutingSession)
+    return engine
+
+
+@pytest.fixture
+def db_engine(template_database, database_state):
+    """
+    An empty database private to the test, used by the app's sessions.
+    """
+    connection = _clone(template_database)
+    engine = _install(connection)
+    yield engine
+    engine.dispose()
+    connection.close()
+
+
+@pytest.fixture
+def seeded_engine(seeded_template_database, database_state):
+    """
+    A private copy of the database seeded with ``SEEDED_CONTACTS`` contacts.
+    """
+    connection = _clone(seeded_template_database)
+    engine = _install(connection)
+    yield engine
+    engine.dispose()
+    connection.close()
+
+
+@pytest.fixture
+def db_session(db_engine):
+    session = database.DBSession()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def client(db_engine):
+    return TestClient(app)
+
+
+@pytest.fixture
+def seeded_client(seeded_engine):
+    return TestClient(app)
+
+
+@pytest.fixture
+def make_user(db_engine):
+    """
+    Creates users directly in the database.
+    """
+    def make(username="user@example.com", password="password", verified=True, logged_in=True):
+        session = database.DBSession()
+        user = auth.models.User(
+            username=username,
+            hash_password=auth.service.Auth.HASH_CONTEXT.hash(password),
+            is_verified=verified,
+            refresh_token="test" if logged_in else None,
+        )
+        session.add(user)
+        session.commit()
+        session.refresh(user)
+        session.close()
+        return user
+    return make
+
+
+@pytest.fixture
+def auth_headers():
+    """
+    Builds an Authorization header with an access token for a username.
+    """
+    def headers(username):
+        token = asyncio.run(auth.service.Auth().create_access_token(payload={"sub": username}))
+        return {"Authorization": f"Bearer {token}"}
+    return headers
+
+
+@pytest.fixture
+def assert_num_queries():
+    """
+    Asserts the exact number of SQL statements run inside a ``with`` block.
+    """
+    @contextlib.contextmanager
+    def check(expected):
+        with database.QueryCounter() as counter:
+            yield counter
+        assert counter.count == expected, (
+            f"expected {expected} statements, got {counter.count}:\n" + "\n".join(counter.statements)
+        )
+    return check
@@ -0,0 +1,174 @@
+import collections
+import difflib
+import sqlalchemy
+import contacts.schema as schema
+import contacts.normalize as normalize
+
+EMAIL_SCORE = 1.0
+PHONE_SCORE = 0.9
+NAME_WEIGHT = 0.7
+NAME_SIMILARITY = 0.85
+NAME_WINDOW = 5
+MERGED_FIELDS = ("name", "surename", "email", "phone_number")
+
+
+class _DisjointSet:
+    def __init__(self):
+        self.parent = {}
+
+    def find(self, item):
+        parent = self.parent.setdefault(item, item)
+        while parent != item:
+            grandparent = self.parent[parent]
+            self.parent[item] = grandparent
+            item, parent = parent, grandparent
+        return item
+
+    def union(self, first, second):
+        first, second = self.find(first), self.find(second)
+        if first != second:
+            self.parent[max(first, second)] = min(first, second)
+
+
+def _duplicated(user_id: int, column, *extra):
+    """
+    Selects the contacts whose ``column`` value occurs more than once.
+
+    Both the grouping subquery and the lookup are served by the
+    ``(user_id, column)`` index, so only duplicated keys are read.
+    """
+    keys = (
+        sqlalchemy.select(column)
+        .where(schema.Contacts.user_id == user_id, column.is_not(None))
+        .group_by(column)
+        .having(sqlalchemy.func.count() > 1)
+    )
+    return (
+        sqlalchemy.select(schema.Contacts.id, column, *extra)
+        .where(schema.Contacts.user_id == user_id, column.in_(keys))
+        .order_by(column, schema.Contacts.id)
+    )
+
+
+def find_duplicates(db, user_id: int) -> list[dict]:
+    """
+    Finds groups of contacts that probably describe the same person.
+
+    Candidates come from blocking instead of comparing every pair: contacts
+    sharing a normalized email or phone are linked directly, and contacts
+    sharing a normalized surname are sorted by first name and compared only
+    with their ``NAME_WINDOW`` nearest neighbours. Work stays close to
+    linear in the number of contacts.
+
+    Args:
+        db (Session): The database session.
+        user_id (int): Owner of the contacts.
+
+    Returns:
+        list[dict]: Groups with ``contact_ids``, ``score`` (0..1) and
+        ``reasons``, best matches first.
+    """
+    links = []
+
+    for reason, score, column in (
+        ("email", EMAIL_SCORE, schema.Contacts.email_normalized),
+        ("phone", PHONE_SCORE, schema.Contacts.phone_normalized),
+    ):
+        previous_id, previous_key = None, None
+        for contact_id, key in db.execute(_duplicated(user_id, column)):
+            if key == previous_key:
+                links.append((previous_id, contact_id, reason, score))
+            previous_id, previous_key = contact_id, key
+
+    blocks = collections.defaultdict(list)
+    for contact_id, key, name in db.execute(
+        _duplicated(user_id, schema.Contacts.name_key, schema.Contacts.name)
+    ):
+        blocks[key].append((normalize.normalize_name(name) or "", contact_id))
+
+    matcher = difflib.SequenceMatcher(autojunk=False)
+    for block in blocks.values():
+        block.sort()
+        for index, (name, contact_id) in enumerate(block):
+            # SequenceMatcher caches its analysis of the second sequence.
+            matcher.set_seq2(name)
+            for other_name, other_id in block[index + 1:index + 1 + NAME_WINDOW]:
+                if other_name == name:
+                    ratio = 1.0
+                else:
+                    total = len(name) + len(other_name)
+                    if not total or 2 * min(len(name), len(other_name)) / total < NAME_SIMILARITY:
+                        continue
+                    matcher.set_seq1(other_name)
+                    if matcher.quick_ratio() < NAME_SIMILARITY:
+                        continue
+                    ratio = matcher.ratio()
+                if ratio >= NAME_SIMILARITY:
+                    links.append((contact_id, other_id, "name", NAME_WEIGHT * ratio))
+
+    groups = _DisjointSet()
+    for first, second, _, _ in links:
+        groups.union(first, second)
+
+    members = collections.defaultdict(set)
+    reasons = collections.defaultdict(set)
+    scores = collections.defaultdict(float)
+    for first, second, reason, score in links:
+        root = groups.find(first)
+        members[root].update((first, second))
+        reasons[root].add(reason)
+        scores[root] = max(scores[root], score)
+
+    result = [
+        {
+            "contact_ids": sorted(members[root]),
+            "score": round(scores[root], 3),
+            "reasons": sorted(reasons[root]),
+        }
+        for root in members
+    ]
+    result.sort(key=lambda group: (-group["score"], group["contact_ids"][0]))
+    return result
+
+
+def merge_contacts(db, user_id: int, keep_id: int, merge_ids: list[int]) -> schema.Contacts | None:
+    """
+    Merges contacts into one and deletes the merged ones.
+
+    Empty fields of the kept contact are filled from the merged contacts in
+    id order, and distinct descriptions are concatenated. The caller commits.
+
+    Args:
+        db (Session): The database session.
+        user_id (int): Owner of the contacts.
+        keep_id (int): The contact that survives.
+        merge_ids (list[int]): The contacts merged into it.
+
+    Returns:
+        Contacts | None: The kept contact, or None if any contact was not found.
+    """
+    wanted = {keep_id, *merge_ids}
+    found = {
+        contact.id: contact
+        for contact in db.query(schema.Contacts).filter(
+            schema.Contacts.user_id == user_id,
+            schema.Contacts.id.in_(wanted)
+        )
+    }
+    if len(found) != len(wanted):
+        return None
+
+    keep = found.pop(keep_id)
+    descriptions = [keep.description] if keep.description else []
+
+    for contact_id in sorted(found):
+        other = found[contact_id]
+        for field in MERGED_FIELDS:
+            if not getattr(keep, field):
+                setattr(keep, field, getattr(other, field))
+        if other.description and other.description not in descriptions:
+            descriptions.append(other.description)
+        db.delete(other)
+
+    keep.description = "\n".join(descriptions)
+    return keep
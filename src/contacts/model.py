@@ -26,4 +26,21 @@ class ContactUpdate(pydantic.BaseModel):
     email: Optional[str] = None
     phone_number: Optional[str] = None
     date_of_birth: Optional[datetime.date] = None
-    description: Optional[str] = None
\ No newline at end of file
+    description: Optional[str] = None
+
+class DuplicateGroup(pydantic.BaseModel):
+    contact_ids: list[int]
+    score: float
+    reasons: list[str]
+
+class MergeRequest(pydantic.BaseModel):
+    keep_id: int
+    merge_ids: list[int]
+
+class BulkResult(pydantic.BaseModel):
+    created: int
+
+class ContactStats(pydantic.BaseModel):
+    count: int
+    birthdays_per_month: dict[int, int]
+    email_domains: dict[str, int]
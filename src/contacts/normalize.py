@@ -0,0 +1,134 @@
+import os
+import unicodedata
+
+GMAIL_DOMAINS = {"gmail.com", "googlemail.com"}
+PHONE_COUNTRY_CODE = os.environ.get('PHONE_COUNTRY_CODE', '380')
+PHONE_TRUNK_PREFIX = os.environ.get('PHONE_TRUNK_PREFIX', '0')
+PHONE_NATIONAL_DIGITS = int(os.environ.get('PHONE_NATIONAL_DIGITS', 9))
+E164_MIN_DIGITS = 8
+E164_MAX_DIGITS = 15
+
+
+def normalize_email(email: str | None) -> str | None:
+    """
+    Reduces an email address to the form used for duplicate matching.
+
+    Lowercases it, drops ``+tag`` suffixes and, for Gmail, dots in the
+    local part.
+
+    Args:
+        email (str | None): The email as entered.
+
+    Returns:
+        str | None: The normalized email, or None if nothing is left.
+    """
+    if email is None:
+        return None
+
+    email = email.strip().lower()
+    local, at, domain = email.rpartition("@")
+    if not at:
+        return email or None
+
+    local = local.split("+", 1)[0]
+    if domain in GMAIL_DOMAINS:
+        local = local.replace(".", "")
+        domain = "gmail.com"
+    return f"{local}@{domain}"
+
+
+def normalize_phone(phone: str | None) -> str | None:
+    """
+    Keeps only the digits of a phone number.
+
+    Args:
+        phone (str | None): The phone number as entered.
+
+    Returns:
+        str | None: The digits, or None if there are none.
+    """
+    if phone is None:
+        return None
+
+    digits = "".join(ch for ch in phone if ch.isdigit())
+    return digits or None
+
+
+def to_e164(
+    phone: str | None,
+    country_code: str = PHONE_COUNTRY_CODE,
+    trunk_prefix: str = PHONE_TRUNK_PREFIX,
+    national_digits: int = PHONE_NATIONAL_DIGITS
+) -> str | None:
+    """
+    Converts a phone number to E.164 (``+`` and up to 15 digits).
+
+    Numbers starting with ``+`` or ``00`` are international. Numbers
+    starting with the trunk prefix, or with at most ``national_digits``
+    digits, are national and get the default country code; longer ones are
+    taken as international without the ``+``.
+
+    Args:
+        phone (str | None): The phone number as entered.
+        country_code (str): Country code of national numbers.
+        trunk_prefix (str): Prefix dialled before national numbers.
+        national_digits (int): Length of a national number without prefix.
+
+    Returns:
+        str | None: The E.164 number, or None if it cannot be one.
+    """
+    if phone is None:
+        return None
+
+    phone = phone.strip()
+    digits = "".join(ch for ch in phone if ch.isascii() and ch.isdigit())
+    if phone.startswith("+"):
+        pass
+    elif digits.startswith("00"):
+        digits = digits[2:]
+    elif trunk_prefix and digits.startswith(trunk_prefix):
+        digits = country_code + digits[len(trunk_prefix):]
+    elif len(digits) <= national_digits:
+        digits = country_code + digits
+
+    if digits.startswith("0") or not E164_MIN_DIGITS <= len(digits) <= E164_MAX_DIGITS:
+        return None
+    return f"+{digits}"
+
+
+def phone_key(phone: str | None) -> str | None:
+    """
+    Builds the indexed lookup key of a phone number: its E.164 digits reversed.
+
+    Equal keys mean equal numbers, and the last N digits of a number are a
+    prefix of its key, so both lookups are index range scans.
+
+    Args:
+        phone (str | None): The phone number as entered.
+
+    Returns:
+        str | None: The key, or None if the number is not valid E.164.
+    """
+    e164 = to_e164(phone)
+    return e164[:0:-1] if e164 is not None else None
+
+
+def normalize_name(name: str | None) -> str | None:
+    """
+    Case-folds a name and strips accents, spaces and punctuation.
+
+    Args:
+        name (str | None): The name as entered.
+
+    Returns:
+        str | None: The normalized name, or None if nothing is left.
+    """
+    if name is None:
+        return None
+
+    decomposed = unicodedata.normalize("NFKD", name)
+    normalized = "".join(
+        ch for ch in decomposed.casefold()
+        if ch.isalnum() and not unicodedata.combining(ch)
+    )
+    return normalized or None
@@ -0,0 +1,81 @@
+"""
+Lightweight read path for list routes.
+
+Rows are selected with Core and kept as ``ContactRecord`` named tuples, so
+no ORM instances, instance state or identity map entries are created for
+responses with many contacts.
+"""
+import typing
+import datetime
+import sqlalchemy
+import contacts.schema as schema
+
+
+class ContactRecord(typing.NamedTuple):
+    id: int
+    name: str
+    surename: str
+    email: str
+    phone_number: str
+    date_of_birth: datetime.date
+    description: str | None
+
+
+COLUMNS = [schema.Contacts.__table__.c[field] for field in ContactRecord._fields]
+_contacts = schema.Contacts.__table__
+
+# Hot statements are built once with bound parameters, so executing them
+# skips expression construction and reuses their memoized cache key.
+CONTACTS_BY_USER = sqlalchemy.select(*COLUMNS).where(_contacts.c.user_id == sqlalchemy.bindparam("user_id"))
+CONTACT_BY_ID = CONTACTS_BY_USER.where(_contacts.c.id == sqlalchemy.bindparam("contact_id"))
+
+
+def select_contacts(user_id: int, *criteria) -> sqlalchemy.Select:
+    """
+    Builds a Core select of the response columns of a user's contacts.
+
+    Args:
+        user_id (int): The owner of the contacts.
+        *criteria: Additional WHERE clauses.
+
+    Returns:
+        Select: The statement.
+    """
+    return sqlalchemy.select(*COLUMNS).where(_contacts.c.user_id == user_id, *criteria)
+
+
+def fetch_contacts(db, user_id: int, *criteria, limit: int | None = None) -> list[ContactRecord]:
+    """
+    Loads a user's contacts as plain records.
+
+    Args:
+        db (Session): The database session, used only for routing and the
+            connection.
+        user_id (int): The owner of the contacts.
+        *criteria: Additional WHERE clauses.
+        limit (int | None): Maximum number of contacts.
+
+    Returns:
+        list[ContactRecord]: The matching contacts.
+    """
+    if criteria or limit is not None:
+        rows = db.execute(select_contacts(user_id, *criteria).limit(limit))
+    else:
+        rows = db.execute(CONTACTS_BY_USER, {"user_id": user_id})
+    return [ContactRecord._make(row) for row in rows]
+
+
+def fetch_contact(db, user_id: int, contact_id: int) -> ContactRecord | None:
+    """
+    Loads one of a user's contacts as a plain record.
+
+    Args:
+        db (Session): The database session.
+        user_id (int): The owner of the contact.
+        contact_id (int): The contact.
+
+    Returns:
+        ContactRecord | None: The contact, or None if the user has no such contact.
+    """
+    row = db.execute(CONTACT_BY_ID, {"user_id": user_id, "contact_id": contact_id}).first()
+    return ContactRecord._make(row) if row is not None else None
@@ -1,11 +1,24 @@
+import asyncio
+import json
+import typing
 import fastapi
+import pydantic
+import fastapi.responses
+import sqlalchemy
 from fastapi import Request
 from fastapi import HTTPException
 import database
 import contacts.schema as schema
 import contacts.model as model
+import contacts.dedup as dedup
+import contacts.records as records
+import contacts.normalize as normalize
+import contacts.stats as stats
 from datetime import datetime, timedelta
 import auth.service
+import auth.exceptions
+import services.event_bus as event_bus
+import services.archive_service as archive_service
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 
@@ -13,13 +26,33 @@ from slowapi.util import get_remote_address
 router = fastapi.APIRouter(prefix="/contacts", tags=["Contacts"])
 auth_service = auth.service.Auth()
 limiter = Limiter(key_func=get_remote_address)
+EVENTS_KEEPALIVE_SECONDS = 15
+PHONE_SUFFIX_MIN_DIGITS = 4
+PHONE_LOOKUP_LIMIT = 50
+EXPORT_CHUNK_SIZE = 1000
+BULK_MAX_CONTACTS = 1000
+
+_CONTACT_BY_ID = sqlalchemy.select(schema.Contacts).where(
+    schema.Contacts.id == sqlalchemy.bindparam("contact_id"),
+    schema.Contacts.user_id == sqlalchemy.bindparam("user_id")
+)
+
+def _find_contact(db, user_id: int, contact_id: int) -> schema.Contacts | None:
+    """
+    Loads a contact for writing, restoring it from the archive if needed.
+    """
+    params = {"contact_id": contact_id, "user_id": user_id}
+    contact = db.scalars(_CONTACT_BY_ID, params).first()
+    if contact is None and archive_service.restore(db, user_id, contact_id) is not None:
+        contact = db.scalars(_CONTACT_BY_ID, params).first()
+    return contact
 
 @router.get("/")
 @limiter.limit("10/minute")
 async def root(
     request: Request,
-    db=fastapi.Depends(database.get_database),
-    user = fastapi.Depends(auth_service.get_user)
+    db=fastapi.Depends(database.get_read_database),
+    user = fastapi.Depends(auth_service.get_read_user)
 )-> list[model.ContactResponse]:
     """
     Fetches all contacts for the authenticated user.
@@ -32,20 +65,23 @@ async def root(
     Returns:
         list[model.ContactResponse]: A list of contacts belonging to the user.
     """
-    
-    return [contact for contact in db.query(schema.Contacts).filter(schema.Contacts.user_id == user.id).all()]
+    return records.fetch_contacts(db, user.id)
 
 @router.get("/find/{contact_id}")
 @limiter.limit("10/minute")
 async def get_by_id(
     contact_id: int,
     request: Request,
-    db=fastapi.Depends(database.get_database),
-    user=fastapi.Depends(auth_service.get_user)
+    db=fastapi.Depends(database.get_read_database),
+    user=fastapi.Depends(auth_service.get_read_user)
 ) -> model.ContactResponse:
     """
     Fetches a specific contact by ID for the authenticated user.
 
+    A contact that was archived is restored to the contacts table first,
+    so this read route can write to the primary and pin the user's next
+    reads to it.
+
     Args:
         contact_id (int): The ID of the contact.
         request (Request): The current request.
@@ -58,11 +94,9 @@ async def get_by_id(
     Raises:
         HTTPException: If the contact is not found.
     """
-    contact = db.query(schema.Contacts).filter(
-        schema.Contacts.id == contact_id,
-        schema.Contacts.user_id == user.id
-    ).first()
-    
+    contact = records.fetch_contact(db, user.id, contact_id)
+    if contact is None:
+        contact = archive_service.restore(db, user.id, contact_id)
     if contact is None:
         raise HTTPException(status_code=404, detail="Contact not found")
     
@@ -92,6 +126,7 @@ async def post_root(
     db.add(new_contact)
     db.commit()
     db.refresh(new_contact)
+    event_bus.bus.publish(new_contact.user_id, "created", new_contact.id)
 
     return new_contact
 
@@ -117,11 +152,12 @@ async def del_by_id(contact_id : int,
     Raises:
         HTTPException: If the contact is not found.
     """
-    contact = db.query(schema.Contacts).filter(schema.Contacts.id == contact_id,schema.Contacts.user_id == user.id).first()
+    contact = _find_contact(db, user.id, contact_id)
     if contact is None:
         raise HTTPException(status_code=404, detail="Contact not found")
     db.delete(contact)
     db.commit()
+    event_bus.bus.publish(contact.user_id, "deleted", contact_id)
 
     return {"message": "Contact deleted"}
 
@@ -149,7 +185,7 @@ async def patch_contact(contact_id:int,
     Raises:
         HTTPException: If the contact is not found.
     """
-    contact = db.query(schema.Contacts).filter(schema.Contacts.id == contact_id, schema.Contacts.user_id == user.id).first()
+    contact = _find_contact(db, user.id, contact_id)
     if contact is None:
         raise HTTPException(status_code=404, detail="Contact not found")
     
@@ -158,6 +194,7 @@ async def patch_contact(contact_id:int,
 
     db.commit()
     db.refresh(contact)
+    event_bus.bus.publish(contact.user_id, "updated", contact.id)
     return contact
 
 @router.get("/search")
@@ -167,41 +204,93 @@ async def search_contacts(
     name: str = None,
     surename: str = None,
     email: str = None,
-    db=fastapi.Depends(database.get_database),
-    user=fastapi.Depends(auth_service.get_user)
+    phone: str = None,
+    db=fastapi.Depends(database.get_read_database),
+    user=fastapi.Depends(auth_service.get_read_user)
 ) -> list[model.ContactResponse]:
     """
-    Searches contacts based on name, surname, or email for the authenticated user.
+    Searches contacts based on name, surname, email or phone for the authenticated user.
 
     Args:
         request (Request): The current request.
         name (str, optional): The contact's first name to search by.
         surename (str, optional): The contact's surname to search by.
         email (str, optional): The contact's email to search by.
+        phone (str, optional): The contact's phone number in any format.
         db: The database session.
         user: The authenticated user.
 
     Returns:
         list[model.ContactResponse]: A list of contacts that match the search criteria.
+
+    Raises:
+        HTTPException: If the phone is not a valid phone number (422).
     """
-    query = db.query(schema.Contacts).filter(schema.Contacts.id == user.id)
-    
+    criteria = []
     if name:
-        query = query.filter(schema.Contacts.name == name)
+        criteria.append(schema.Contacts.name == name)
     if surename:
-        query = query.filter(schema.Contacts.surename == surename)
+        criteria.append(schema.Contacts.surename == surename)
     if email:
-        query = query.filter(schema.Contacts.email == email)
-    
-    results = query.all()
-    return results
+        criteria.append(schema.Contacts.email == email)
+    if phone:
+        key = normalize.phone_key(phone)
+        if key is None:
+            raise HTTPException(status_code=422, detail="Not a valid phone number")
+        criteria.append(schema.Contacts.phone_key == key)
+
+    return records.fetch_contacts(db, user.id, *criteria)
+
+@router.get("/by-phone")
+@limiter.limit("10/minute")
+async def get_by_phone(
+    request: Request,
+    number: str = None,
+    last: str = fastapi.Query(None, pattern=r"^\d+$"),
+    db=fastapi.Depends(database.get_read_database),
+    user=fastapi.Depends(auth_service.get_read_user)
+) -> list[model.ContactResponse]:
+    """
+    Finds contacts by phone number, for caller ID style lookups.
+
+    Both lookups are range scans of the ``(user_id, phone_key)`` index.
+
+    Args:
+        request (Request): The current request.
+        number (str, optional): A full phone number in any format.
+        last (str, optional): The last digits of the number.
+        db: The database session.
+        user: The authenticated user.
+
+    Returns:
+        list[model.ContactResponse]: At most ``PHONE_LOOKUP_LIMIT`` matching contacts.
+
+    Raises:
+        HTTPException: If neither a valid number nor at least
+            ``PHONE_SUFFIX_MIN_DIGITS`` last digits are given (422).
+    """
+    if number is not None:
+        key = normalize.phone_key(number)
+        if key is None:
+            raise HTTPException(status_code=422, detail="Not a valid phone number")
+        criterion = schema.Contacts.phone_key == key
+    elif last is not None and len(last) >= PHONE_SUFFIX_MIN_DIGITS:
+        prefix = last[::-1]
+        # ":" sorts right after "9", so this is every key starting with prefix.
+        criterion = schema.Contacts.phone_key.between(prefix, prefix + ":")
+    else:
+        raise HTTPException(
+            status_code=422, detail=f"Give a number or at least {PHONE_SUFFIX_MIN_DIGITS} last digits"
+        )
+
+    return records.fetch_contacts(db, user.id, criterion, limit=PHONE_LOOKUP_LIMIT)
 
 @router.get("/upcoming-birthdays")
 @limiter.limit("10/minute")
 async def get_upcoming_birthdays(
     request: Request,
-    db=fastapi.Depends(database.get_database),
-    user=fastapi.Depends(auth_service.get_user)
+    db=fastapi.Depends(database.get_read_database),
+    user=fastapi.Depends(auth_service.get_read_user)
 )-> list[model.ContactResponse]:
     """
     Fetches contacts with upcoming birthdays in the next 7 days for the authenticated user.
@@ -217,9 +306,263 @@ async def get_upcoming_birthdays(
     today = datetime.today().date()
     upcoming_date = datetime.today().date() + timedelta(days=7)
 
-    contacts_with_upcoming_birthdays = db.query(schema.Contacts).filter(
-        schema.Contacts.user_id == user.id,
-        schema.Contacts.date_of_birth.between(today, upcoming_date)
-    ).all()
+    return records.fetch_contacts(db, user.id, schema.Contacts.date_of_birth.between(today, upcoming_date))
+
+@router.get("/stats")
+@limiter.limit("10/minute")
+async def get_stats(
+    request: Request,
+    db=fastapi.Depends(database.get_read_database),
+    user=fastapi.Depends(auth_service.get_read_user)
+) -> model.ContactStats:
+    """
+    Fetches dashboard statistics of the authenticated user's contacts.
+
+    Args:
+        request (Request): The current request.
+        db: The database session.
+        user: The authenticated user.
+
+    Returns:
+        model.ContactStats: Contact count, birthdays per month and the most
+        common email domains.
+    """
+    return stats.read_stats(db, user.id)
+
+@router.post("/bulk", status_code=fastapi.status.HTTP_201_CREATED)
+@limiter.limit("10/minute")
+async def bulk_create(
+    request: Request,
+    contacts: typing.Annotated[list[model.ContactModel], pydantic.Field(max_length=BULK_MAX_CONTACTS)],
+    db=fastapi.Depends(database.get_database),
+    user=fastapi.Depends(auth_service.get_user)
+) -> model.BulkResult:
+    """
+    Imports many contacts at once for the authenticated user.
+
+    Larger imports go through ``POST /api/jobs/import``, which runs them
+    in the background in batches.
+
+    Args:
+        request (Request): The current request.
+        contacts (list[model.ContactModel]): At most ``BULK_MAX_CONTACTS``
+            contacts to import; more are refused with 422.
+        db: The database session.
+        user: The authenticated user.
+
+    Returns:
+        model.BulkResult: The number of contacts created.
+    """
+    user_id = user.id
+    new_contacts = [schema.Contacts(user_id=user_id, **contact.__dict__) for contact in contacts]
+    db.add_all(new_contacts)
+    db.flush()
+    # Read ids before commit expires the new objects.
+    created_ids = [new_contact.id for new_contact in new_contacts]
+    db.commit()
+
+    for contact_id in created_ids:
+        event_bus.bus.publish(user_id, "created", contact_id)
+
+    return {"created": len(new_contacts)}
+
+@router.get("/duplicates")
+@limiter.limit("10/minute")
+def get_duplicates(
+    request: Request,
+    db=fastapi.Depends(database.get_read_database),
+    user=fastapi.Depends(auth_service.get_read_user)
+) -> list[model.DuplicateGroup]:
+    """
+    Lists groups of contacts that look like duplicates of each other.
+
+    Comparing names is CPU-bound, so this is a plain function that FastAPI
+    runs in its threadpool, off the event loop. It stays for interactive use
+    on ordinary address books and keeps existing clients working; large
+    accounts should queue ``POST /api/jobs/dedup``, which runs the same
+    search in a worker process and survives restarts.
+
+    Args:
+        request (Request): The current request.
+        db: The database session.
+        user: The authenticated user.
+
+    Returns:
+        list[model.DuplicateGroup]: Duplicate groups, most certain first.
+    """
+    return dedup.find_duplicates(db, user.id)
+
+@router.post("/merge")
+@limiter.limit("10/minute")
+async def merge_contacts(
+    request: Request,
+    body: model.MergeRequest,
+    db=fastapi.Depends(database.get_database),
+    user=fastapi.Depends(auth_service.get_user)
+) -> model.ContactResponse:
+    """
+    Merges duplicate contacts into the one with ``keep_id``.
+
+    Args:
+        request (Request): The current request.
+        body (model.MergeRequest): The contact to keep and the ones to merge into it.
+        db: The database session.
+        user: The authenticated user.
+
+    Returns:
+        model.ContactResponse: The merged contact.
+
+    Raises:
+        HTTPException: If the kept contact is also merged (400) or a contact
+            is not found (404).
+    """
+    if body.keep_id in body.merge_ids:
+        raise HTTPException(status_code=400, detail="Cannot merge a contact into itself")
+
+    contact = dedup.merge_contacts(db, user.id, body.keep_id, body.merge_ids)
+    if contact is None:
+        raise HTTPException(status_code=404, detail="Contact not found")
+
+    db.commit()
+    db.refresh(contact)
+
+    event_bus.bus.publish(contact.user_id, "updated", contact.id)
+    for contact_id in body.merge_ids:
+        event_bus.bus.publish(contact.user_id, "deleted", contact_id)
+
+    return contact
+
+@router.get("/export")
+@limiter.limit("10/minute")
+async def export_contacts(
+    request: Request,
+    db=fastapi.Depends(database.get_read_database),
+    user=fastapi.Depends(auth_service.get_read_user)
+):
+    """
+    Streams all contacts of the authenticated user as NDJSON.
+
+    Rows are read ``EXPORT_CHUNK_SIZE`` at a time by a generator that
+    Starlette iterates in its threadpool, so memory does not grow with the
+    size of the address book and the event loop is not blocked. It stays
+    for clients that want the file in one request; ``POST /api/jobs/export``
+    produces the same file as a job that can be fetched later.
+
+    Args:
+        request (Request): The current request.
+        db: The database session.
+        user: The authenticated user.
+
+    Returns:
+        StreamingResponse: ``application/x-ndjson``, one contact per line.
+    """
+    user_id = user.id
+    info = dict(db.info)
+    db.close()
+
+    def stream():
+        with database.DBSession(info=info) as session:
+            rows = session.execute(
+                records.CONTACTS_BY_USER, {"user_id": user_id},
+                execution_options={"yield_per": EXPORT_CHUNK_SIZE}
+            )
+            for chunk in rows.partitions():
+                yield "".join(
+                    json.dumps(records.ContactRecord._make(row)._asdict(), default=str) + "\n"
+                    for row in chunk
+                )
+
+    return fastapi.responses.StreamingResponse(stream(), media_type="application/x-ndjson")
+
+@router.get("/events")
+async def contact_events(
+    request: Request,
+    db=fastapi.Depends(database.get_read_database),
+    user=fastapi.Depends(auth_service.get_read_user)
+):
+    """
+    Streams the authenticated user's contact changes as Server-Sent Events.
+
+    Args:
+        request (Request): The current request.
+        db: The database session.
+        user: The authenticated user.
+
+    Returns:
+        StreamingResponse: A ``text/event-stream`` of ``created``, ``updated``,
+        ``deleted`` and ``resync`` events with periodic keepalive comments.
+    """
+    user_id = user.id
+    # The stream may stay open for hours; do not hold a pooled connection.
+    db.close()
+    subscription = event_bus.bus.subscribe(user_id)
+
+    async def stream():
+        try:
+            yield ": connected\n\n"
+            while True:
+                events = await subscription.get(timeout=EVENTS_KEEPALIVE_SECONDS)
+                if not events:
+                    yield ": keepalive\n\n"
+                for event in events:
+                    yield event_bus.format_sse(event)
+        finally:
+            event_bus.bus.unsubscribe(subscription)
+
+    return fastapi.responses.StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.websocket("/ws")
+async def contact_events_ws(
+    websocket: fastapi.WebSocket,
+    token: str,
+    db=fastapi.Depends(database.get_database)
+):
+    """
+    Pushes the authenticated user's contact changes over a WebSocket.
+
+    Browsers cannot set headers on WebSocket handshakes, so the access token
+    is passed as the ``token`` query parameter.
+
+    Args:
+        websocket (WebSocket): The client connection.
+        token (str): JWT access token.
+        db: The database session.
+    """
+    try:
+        user = auth_service.get_user(token=token, db=db)
+    except auth.exceptions.AuthException:
+        await websocket.close(code=fastapi.status.WS_1008_POLICY_VIOLATION)
+        return
+
+    user_id = user.id
+    db.close()
+    await websocket.accept()
+    subscription = event_bus.bus.subscribe(user_id)
+
+    async def wait_for_disconnect():
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                return
 
-    return contacts_with_upcoming_birthdays
\ No newline at end of file
+    receiver = asyncio.ensure_future(wait_for_disconnect())
+    try:
+        while True:
+            getter = asyncio.ensure_future(subscription.get())
+            done, _ = await asyncio.wait(
+                {receiver, getter}, return_when=asyncio.FIRST_COMPLETED
+            )
+            if getter not in done:
+                getter.cancel()
+                break
+            for event in getter.result():
+                await websocket.send_json(event)
+    except fastapi.WebSocketDisconnect:
+        pass
+    finally:
+        receiver.cancel()
+        event_bus.bus.unsubscribe(subscription)
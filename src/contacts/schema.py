@@ -3,6 +3,11 @@ import database
 import datetime
 import auth.models
 import sqlalchemy
+import contacts.normalize as normalize
+
+def utcnow() -> datetime.datetime:
+    return datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+
 
 class Contacts(database.Base):
     __tablename__ = "contacts"
@@ -10,9 +15,9 @@ class Contacts(database.Base):
     id: orm.Mapped[int] = orm.mapped_column(primary_key=True)
     name: orm.Mapped[str] = orm.mapped_column(nullable=False)
     surename: orm.Mapped[str] = orm.mapped_column(nullable=False)
-    email: orm.Mapped[str] = orm.mapped_column(nullable=False)
+    email: orm.Mapped[str] = orm.mapped_column(nullable=False, active_history=True)
     phone_number: orm.Mapped[str] = orm.mapped_column(nullable=False)
-    date_of_birth: orm.Mapped[datetime.date] = orm.mapped_column(nullable=False)
+    date_of_birth: orm.Mapped[datetime.date] = orm.mapped_column(nullable=False, active_history=True)
     description: orm.Mapped[str] = orm.mapped_column(nullable=True)
     user_id: orm.Mapped[int] = orm.mapped_column(
         sqlalchemy.ForeignKey("users.id", ondelete="CASCADE"), 
@@ -21,3 +26,41 @@ class Contacts(database.Base):
     user: orm.Mapped[auth.models.User] = orm.relationship(
         "User", back_populates="contacts"  
     )
+    email_normalized: orm.Mapped[str | None] = orm.mapped_column(nullable=True)
+    phone_normalized: orm.Mapped[str | None] = orm.mapped_column(nullable=True)
+    name_key: orm.Mapped[str | None] = orm.mapped_column(nullable=True)
+    birthday_key: orm.Mapped[str | None] = orm.mapped_column(sqlalchemy.String(5), nullable=True, index=True)
+    phone_key: orm.Mapped[str | None] = orm.mapped_column(sqlalchemy.String(15), nullable=True)
+    updated_at: orm.Mapped[datetime.datetime | None] = orm.mapped_column(
+        nullable=True, default=utcnow, onupdate=utcnow
+    )
+
+    __table_args__ = (
+        sqlalchemy.Index("ix_contacts_user_email_normalized", "user_id", "email_normalized"),
+        sqlalchemy.Index("ix_contacts_user_phone_normalized", "user_id", "phone_normalized"),
+        sqlalchemy.Index("ix_contacts_user_name_key", "user_id", "name_key"),
+        sqlalchemy.Index("ix_contacts_user_phone_key", "user_id", "phone_key"),
+        # Archived contacts keep their ids, so SQLite must never reuse one.
+        {"sqlite_autoincrement": True},
+    )
+
+    @orm.validates("email")
+    def _normalize_email(self, key, value):
+        self.email_normalized = normalize.normalize_email(value)
+        return value
+
+    @orm.validates("phone_number")
+    def _normalize_phone(self, key, value):
+        self.phone_normalized = normalize.normalize_phone(value)
+        self.phone_key = normalize.phone_key(value)
+        return value
+
+    @orm.validates("date_of_birth")
+    def _birthday_key(self, key, value):
+        self.birthday_key = value.strftime("%m-%d") if value is not None else None
+        return value
+
+    @orm.validates("surename")
+    def _normalize_surename(self, key, value):
+        self.name_key = normalize.normalize_name(value)
+        return value
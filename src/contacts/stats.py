@@ -0,0 +1,224 @@
+"""
+Per-user contact statistics kept in the ``contact_stats`` summary table.
+
+Each row counts the contacts of a user in one bucket: ``total`` (key
+``""``), ``month`` of birth (key ``"01"`` to ``"12"``) or email ``domain``.
+Contacts added, changed or deleted through a ``RoutingSession`` update the
+counts in the same flush, so reading the stats never scans ``contacts``.
+Contacts removed with Core statements (account purges, shard moves) are
+not counted; their user's rows go away with the user. Archived contacts
+(``services.archive_service``) keep counting.
+
+To recompute everything from the contacts tables and the archive, run
+from ``src``::
+
+    python -m contacts.stats rebuild          # all users
+    python -m contacts.stats rebuild 42       # one user
+"""
+import argparse
+import collections
+import os
+import sqlalchemy
+import sqlalchemy.dialects.sqlite
+import sqlalchemy.orm as orm
+import database
+import sharding
+import contacts.schema as schema
+import services.archive_service as archive_service
+
+STATS_TOP_DOMAINS = int(os.environ.get('STATS_TOP_DOMAINS', 10))
+TOTAL, MONTH, DOMAIN = "total", "month", "domain"
+
+
+class ContactStat(database.Base):
+    __tablename__ = "contact_stats"
+
+    user_id: orm.Mapped[int] = orm.mapped_column(
+        sqlalchemy.ForeignKey("users.id", ondelete="CASCADE"), primary_key=True
+    )
+    kind: orm.Mapped[str] = orm.mapped_column(sqlalchemy.String(8), primary_key=True)
+    key: orm.Mapped[str] = orm.mapped_column(primary_key=True)
+    count: orm.Mapped[int] = orm.mapped_column(nullable=False, default=0)
+
+
+def email_domain(email: str) -> str:
+    """
+    Returns the lower-cased part of an email after the first ``@``.
+    """
+    return email.partition("@")[2].lower()
+
+
+def _buckets(user_id: int, email: str, date_of_birth) -> list[tuple[int, str, str]]:
+    return [
+        (user_id, TOTAL, ""),
+        (user_id, MONTH, f"{date_of_birth.month:02d}"),
+        (user_id, DOMAIN, email_domain(email)),
+    ]
+
+
+def _old(contact: schema.Contacts, field: str):
+    history = sqlalchemy.inspect(contact).attrs[field].history
+    return history.deleted[0] if history.deleted else getattr(contact, field)
+
+
+@sqlalchemy.event.listens_for(database.RoutingSession, "before_flush")
+def _collect(session, flush_context, instances):
+    deltas = session.info.setdefault("stats_deltas", collections.Counter())
+
+    for contact in session.new:
+        if isinstance(contact, schema.Contacts):
+            for bucket in _buckets(contact.user_id, contact.email, contact.date_of_birth):
+                deltas[bucket] += 1
+
+    for contact in session.deleted:
+        if isinstance(contact, schema.Contacts):
+            for bucket in _buckets(contact.user_id, _old(contact, "email"), _old(contact, "date_of_birth")):
+                deltas[bucket] -= 1
+
+    for contact in session.dirty:
+        if isinstance(contact, schema.Contacts) and session.is_modified(contact):
+            for bucket in _buckets(contact.user_id, _old(contact, "email"), _old(contact, "date_of_birth")):
+                deltas[bucket] -= 1
+            for bucket in _buckets(contact.user_id, contact.email, contact.date_of_birth):
+                deltas[bucket] += 1
+
+
+@sqlalchemy.event.listens_for(database.RoutingSession, "after_flush")
+def _apply(session, flush_context):
+    deltas = session.info.pop("stats_deltas", None)
+    rows = [
+        {"user_id": user_id, "kind": kind, "key": key, "count": delta}
+        for (user_id, kind, key), delta in (deltas or {}).items()
+        if delta
+    ]
+    if not rows:
+        return
+
+    table = ContactStat.__table__
+    insert = sqlalchemy.dialects.sqlite.insert(table)
+    session.execute(
+        insert.on_conflict_do_update(
+            index_elements=[table.c.user_id, table.c.kind, table.c.key],
+            set_={"count": table.c.count + insert.excluded.count},
+        ),
+        rows
+    )
+
+
+@sqlalchemy.event.listens_for(database.RoutingSession, "after_rollback")
+def _discard(session):
+    session.info.pop("stats_deltas", None)
+
+
+def read_stats(db, user_id: int, top_domains: int = STATS_TOP_DOMAINS) -> dict:
+    """
+    Reads the stats of a user from the summary table.
+
+    Args:
+        db (Session): The database session.
+        user_id (int): The user.
+        top_domains (int): Number of email domains returned, most common first.
+
+    Returns:
+        dict: ``count``, ``birthdays_per_month`` (all twelve months) and
+        ``email_domains``.
+    """
+    table = ContactStat.__table__
+    mine = (table.c.user_id == user_id, table.c.count > 0)
+
+    stats = {"count": 0, "birthdays_per_month": {month: 0 for month in range(1, 13)}}
+    for kind, key, count in db.execute(
+        sqlalchemy.select(table.c.kind, table.c.key, table.c.count)
+        .where(*mine, table.c.kind.in_([TOTAL, MONTH]))
+    ):
+        if kind == TOTAL:
+            stats["count"] = count
+        else:
+            stats["birthdays_per_month"][int(key)] = count
+
+    stats["email_domains"] = dict(db.execute(
+        sqlalchemy.select(table.c.key, table.c.count)
+        .where(*mine, table.c.kind == DOMAIN)
+        .order_by(table.c.count.desc(), table.c.key)
+        .limit(top_domains)
+    ).all())
+    return stats
+
+
+def _contact_engines() -> list[sqlalchemy.Engine]:
+    if database.shard_map is not None:
+        return list(dict.fromkeys(database.shard_map.engines))
+    return [database.engine]
+
+
+def rebuild(user_id: int | None = None) -> int:
+    """
+    Recomputes the summary table from the contacts tables.
+
+    Archived contacts are counted too: their blocks are decompressed one at
+    a time, so this is slow for users with a large archive.
+
+    Args:
+        user_id (int | None): Only rebuild this user, defaults to everyone.
+
+    Returns:
+        int: Number of stats rows written.
+    """
+    contacts = schema.Contacts.__table__
+    at = sqlalchemy.func.instr(contacts.c.email, "@")
+    buckets = {
+        TOTAL: sqlalchemy.literal(""),
+        MONTH: sqlalchemy.func.substr(contacts.c.birthday_key, 1, 2),
+        DOMAIN: sqlalchemy.case(
+            (at > 0, sqlalchemy.func.lower(sqlalchemy.func.substr(contacts.c.email, at + 1))),
+            else_=""
+        ),
+    }
+
+    counts = collections.Counter()
+    for engine in _contact_engines():
+        with engine.connect() as connection:
+            for kind, key in buckets.items():
+                query = (
+                    sqlalchemy.select(contacts.c.user_id, key.label("key"), sqlalchemy.func.count())
+                    .group_by(contacts.c.user_id, key)
+                )
+                if user_id is not None:
+                    query = query.where(contacts.c.user_id == user_id)
+                for row_user, row_key, count in connection.execute(query):
+                    counts[row_user, kind, row_key] += count
+
+    archive = archive_service.ContactArchive.__table__
+    query = sqlalchemy.select(archive.c.user_id, archive.c.codec, archive.c.data)
+    if user_id is not None:
+        query = query.where(archive.c.user_id == user_id)
+    with database.engine.connect() as connection:
+        for block in connection.execution_options(yield_per=100).execute(query):
+            for contact in archive_service.decompress(block.codec, block.data):
+                counts.update(_buckets(block.user_id, contact["email"], contact["date_of_birth"]))
+
+    rows = [
+        {"user_id": row_user, "kind": kind, "key": key, "count": count}
+        for (row_user, kind, key), count in counts.items()
+    ]
+    with database.engine.begin() as connection:
+        delete = sqlalchemy.delete(ContactStat)
+        if user_id is not None:
+            delete = delete.where(ContactStat.user_id == user_id)
+        connection.execute(delete)
+        if rows:
+            connection.execute(sqlalchemy.insert(ContactStat), rows)
+    return len(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Contact stats maintenance")
+    commands = parser.add_subparsers(dest="command", required=True)
+    rebuild_command = commands.add_parser("rebuild", help="recompute the stats from the contacts")
+    rebuild_command.add_argument("user_id", type=int, nargs="?")
+    args = parser.parse_args()
+
+    database.connect()
+    if sharding.CONTACTS_SHARD_URLS:
+        sharding.connect()
+    print(f"wrote {rebuild(args.user_id)} stats rows")
@@ -1,20 +1,272 @@
+import collections
+import os
+import threading
+import time
 import sqlalchemy
+import sqlalchemy.engine.default
 import sqlalchemy.orm as orm
 
 class Base(orm.DeclarativeBase):
     pass
 
+DATABASE_URL = os.environ.get("DATABASE_URL", "sqlite:///contacts.sqlite")
+DATABASE_REPLICA_URL = os.environ.get("DATABASE_REPLICA_URL")
+READ_YOUR_WRITES_SECONDS = float(os.environ.get("READ_YOUR_WRITES_SECONDS", 5))
+QUERY_CACHE_SIZE = int(os.environ.get("DATABASE_QUERY_CACHE_SIZE", 1200))
+
 DBSession = None
+engine = None
+read_engine = None
+shard_map = None
+
+# Per process: see ``mark_write``.
+_recent_writes: collections.OrderedDict[str, float] = collections.OrderedDict()
+_recent_writes_lock = threading.Lock()
+_RECENT_WRITES_LIMIT = 10_000
+_statement_cache = collections.Counter()
+# Listeners run on every thread that executes SQL: request threadpool, jobs.
+_statement_cache_lock = threading.Lock()
+
+
+class RoutingSession(orm.Session):
+    """
+    Session that sends reads of a read-only session to the replica and
+    everything else to the primary.
+
+    A read-only session stays on the primary when it flushes, executes DML,
+    has been switched with ``use_primary`` or belongs to a user who wrote
+    within the last ``READ_YOUR_WRITES_SECONDS`` in this process. When ``sharding`` is
+    enabled, statements on sharded tables go to the user's shard instead.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        write = getattr(clause, "is_dml", False) or self._flushing
+        if shard_map is not None:
+            bind = shard_map.get_bind(self, mapper, clause, write)
+            if bind is not None:
+                return bind
+        if write:
+            return engine
+        if routes_to_replica(self):
+            return read_engine
+        return engine
+
+
+@sqlalchemy.event.listens_for(RoutingSession, "after_flush")
+def _remember_flush(session, flush_context):
+    session.info["wrote"] = True
+
+
+@sqlalchemy.event.listens_for(RoutingSession, "after_commit")
+def _remember_write(session):
+    if session.info.pop("wrote", False):
+        mark_write(session.info.get("sticky_key"))
+
+
+def mark_write(key: str | None) -> None:
+    """
+    Pins reads for ``key`` (a username) to the primary for a short while.
+
+    Writes are remembered in this process only: with several uvicorn
+    workers, a read served by another worker than the write can still see
+    the replica's stale data. Run a single worker per replica-backed
+    deployment when read-your-writes matters. At most
+    ``_RECENT_WRITES_LIMIT`` users are remembered, least recent dropped first.
+
+    Args:
+        key (str | None): The user who just wrote; ``None`` is ignored.
+    """
+    if key is None:
+        return
+
+    with _recent_writes_lock:
+        _recent_writes[key] = time.monotonic()
+        _recent_writes.move_to_end(key)
+        while len(_recent_writes) > _RECENT_WRITES_LIMIT:
+            _recent_writes.popitem(last=False)
+
+
+def is_sticky(key: str | None) -> bool:
+    """
+    Tells whether ``key`` wrote recently enough to read from the primary.
+
+    Args:
+        key (str | None): The username set as the session's ``sticky_key``.
+
+    Returns:
+        bool: True while the read-your-writes window is open.
+    """
+    written_at = _recent_writes.get(key)
+    return written_at is not None and time.monotonic() - written_at < READ_YOUR_WRITES_SECONDS
+
+
+def routes_to_replica(session: orm.Session) -> bool:
+    """
+    Tells whether the session's next read goes to the replica.
+
+    Args:
+        session (Session): The session to check.
+
+    Returns:
+        bool: True for read-only sessions that are not pinned to the primary.
+    """
+    return (
+        read_engine is not None
+        and session.info.get("read_only", False)
+        and not session.info.get("use_primary", False)
+        and not is_sticky(session.info.get("sticky_key"))
+    )
+
+
+def use_primary(session: orm.Session) -> None:
+    """
+    Sends every following statement of the session to the primary.
+
+    Args:
+        session (Session): The session to switch.
+    """
+    session.info["use_primary"] = True
+
+
+class QueryCounter:
+    """
+    Counts the SQL statements sent to the database while active.
+
+    Used as a context manager; listens on the primary, the replica and all
+    shard engines unless engines are given.
+    """
+
+    def __init__(self, *engines: sqlalchemy.Engine):
+        self.engines = engines
+        self.statements: list[str] = []
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def _record(self, connection, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def _targets(self) -> list[sqlalchemy.Engine]:
+        if self.engines:
+            return list(dict.fromkeys(self.engines))
+        targets = [engine, read_engine]
+        if shard_map is not None:
+            targets += shard_map.engines
+        return [target for target in dict.fromkeys(targets) if target is not None]
+
+    def __enter__(self):
+        self._listening = self._targets()
+        for target in self._listening:
+            sqlalchemy.event.listen(target, "before_cursor_execute", self._record)
+        return self
 
-def connect():
-    global DBSession
+    def __exit__(self, *exc_info):
+        for target in self._listening:
+            sqlalchemy.event.remove(target, "before_cursor_execute", self._record)
 
-    engine = sqlalchemy.create_engine("sqlite:///contacts.sqlite")
+
+# ``ExecutionContext.cache_hit`` and its ``CacheStats`` values are not public
+# API; checked against SQLAlchemy 2.0.x and 2.1.4.
+_CACHE_OUTCOMES = {
+    sqlalchemy.engine.default.CacheStats.CACHE_HIT: "hits",
+    sqlalchemy.engine.default.CacheStats.CACHE_MISS: "misses",
+}
+
+
+@sqlalchemy.event.listens_for(sqlalchemy.Engine, "after_cursor_execute")
+def _count_cache_use(connection, cursor, statement, parameters, context, executemany):
+    if context is None or context.compiled is None:
+        return
+    outcome = _CACHE_OUTCOMES.get(getattr(context, "cache_hit", None), "uncached")
+    with _statement_cache_lock:
+        _statement_cache[outcome] += 1
+
+
+def statement_cache_stats() -> dict:
+    """
+    Reports how often statements were found in the compiled SQL cache.
+
+    A miss means the statement was compiled to SQL again; misses that keep
+    growing after warm-up mean ``DATABASE_QUERY_CACHE_SIZE`` is too small.
+    ``uncached`` statements cannot be cached at all.
+
+    Returns:
+        dict: ``hits``, ``misses``, ``uncached``, ``hit_ratio`` and the
+        per-engine ``capacity``, counted over all engines of the process.
+    """
+    with _statement_cache_lock:
+        counts = dict(_statement_cache)
+    hits, misses = counts.get("hits", 0), counts.get("misses", 0)
+    return {
+        "hits": hits,
+        "misses": misses,
+        "uncached": counts.get("uncached", 0),
+        "hit_ratio": hits / (hits + misses) if hits + misses else None,
+        "capacity": QUERY_CACHE_SIZE,
+    }
+
+
+def create_engine(url: str) -> sqlalchemy.Engine:
+    """
+    Creates an engine with the configured compiled statement cache size.
+
+    Args:
+        url (str): The database URL.
+
+    Returns:
+        Engine: The engine.
+    """
+    return sqlalchemy.create_engine(url, query_cache_size=QUERY_CACHE_SIZE)
+
+
+def enable_foreign_keys(target: sqlalchemy.Engine) -> None:
+    """
+    Turns on SQLite foreign key enforcement, and with it ``ON DELETE
+    CASCADE``, for every connection the engine opens.
+
+    Args:
+        target (Engine): The engine to configure.
+    """
+    if target.dialect.name != "sqlite":
+        return
+
+    @sqlalchemy.event.listens_for(target, "connect")
+    def _foreign_keys_on(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+
+
+def connect(url: str | None = None, replica_url: str | None = None):
+    global DBSession, engine, read_engine
+
+    engine = create_engine(url or DATABASE_URL)
+    enable_foreign_keys(engine)
 
     Base.metadata.create_all(engine)
     Base.metadata.bind = engine
 
-    DBSession = orm.sessionmaker(bind=engine)
+    replica_url = replica_url or DATABASE_REPLICA_URL
+    read_engine = create_engine(replica_url) if replica_url else None
+
+    DBSession = orm.sessionmaker(bind=engine, class_=RoutingSession)
+
+
+def refresh_replica():
+    """
+    Copies the primary into the replica with the SQLite online backup API.
+
+    Used to keep a local two-file setup in sync; a real replica is kept up
+    to date by the database server.
+    """
+    source = engine.raw_connection()
+    target = read_engine.raw_connection()
+    try:
+        source.driver_connection.backup(target.driver_connection)
+    finally:
+        target.close()
+        source.close()
 
 
 def get_database():
@@ -26,4 +278,20 @@ def get_database():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+def get_read_database():
+    """
+    Yields a session for read-only routes, served by the replica when one
+    is configured.
+    """
+    if DBSession is None:
+        connect()
+
+    db = DBSession(info={"read_only": True})
+
+    try:
+        yield db
+    finally:
+        db.close()
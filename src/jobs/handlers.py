@@ -0,0 +1,133 @@
+"""
+What each kind of job does.
+
+A handler gets a ``jobs.service.JobContext``, reports progress through it
+and writes its result to ``context.artifact_path(...)``. CPU-bound handlers
+run in spawned worker processes, so they only use their context and the
+database.
+
+Contacts created or deleted by jobs are not announced on the event bus;
+clients reload once the job is done.
+"""
+import itertools
+import json
+import typing
+import sqlalchemy
+import database
+import contacts.dedup as dedup
+import contacts.model as model
+import contacts.records as records
+import contacts.schema as schema
+import services.account_service as account_service
+
+EXPORT_CHUNK_SIZE = 1000
+IMPORT_CHUNK_SIZE = 500
+IMPORT_MAX_ERRORS = 100
+
+
+class Handler(typing.NamedTuple):
+    run: typing.Callable
+    cpu_bound: bool
+
+
+def _session(context, read_only: bool = False):
+    info = {"user_id": context.user_id}
+    if read_only:
+        info["read_only"] = True
+    return database.DBSession(info=info)
+
+
+def _count_contacts(session, user_id: int) -> int:
+    return session.execute(
+        sqlalchemy.select(sqlalchemy.func.count())
+        .select_from(schema.Contacts)
+        .where(schema.Contacts.user_id == user_id)
+    ).scalar()
+
+
+def export_contacts(context) -> None:
+    """
+    Writes all contacts of the user as NDJSON, one contact per line.
+    """
+    with _session(context, read_only=True) as session, open(context.artifact_path("ndjson"), "w") as output:
+        context.progress(0, _count_contacts(session, context.user_id))
+        rows = session.execute(
+            records.CONTACTS_BY_USER, {"user_id": context.user_id},
+            execution_options={"yield_per": EXPORT_CHUNK_SIZE}
+        )
+        done = 0
+        for chunk in rows.partitions():
+            output.write("".join(
+                json.dumps(records.ContactRecord._make(row)._asdict(), default=str) + "\n"
+                for row in chunk
+            ))
+            done += len(chunk)
+            context.progress(done)
+
+
+def find_duplicates(context) -> None:
+    """
+    Writes the user's duplicate groups as a JSON list.
+    """
+    with _session(context, read_only=True) as session:
+        context.progress(0, 1)
+        groups = dedup.find_duplicates(session, context.user_id)
+    with open(context.artifact_path("json"), "w") as output:
+        json.dump(groups, output)
+    context.progress(1)
+
+
+def import_contacts(context) -> None:
+    """
+    Creates contacts from the uploaded NDJSON file in ``params["input"]``.
+
+    Invalid lines are skipped; the result lists how many contacts were
+    created and the first ``IMPORT_MAX_ERRORS`` errors by line number.
+    Every batch is committed with a checkpoint of the last line it covers,
+    so a retried job goes on from there instead of importing twice.
+    """
+    state = context.checkpoint or {"line": 0, "created": 0, "errors": []}
+    batch = []
+
+    def commit(session, number):
+        session.add_all(batch)
+        state["line"], state["created"] = number, state["created"] + len(batch)
+        context.save_checkpoint(session, state)
+        session.commit()
+        batch.clear()
+
+    with open(context.path(context.params["input"])) as source, _session(context) as session:
+        context.progress(state["line"], sum(1 for _ in source))
+        source.seek(0)
+        for number, line in enumerate(itertools.islice(source, state["line"], None), state["line"] + 1):
+            if line.strip():
+                try:
+                    contact = model.ContactModel(**json.loads(line))
+                    batch.append(schema.Contacts(user_id=context.user_id, **contact.__dict__))
+                except (ValueError, TypeError) as error:
+                    if len(state["errors"]) < IMPORT_MAX_ERRORS:
+                        state["errors"].append({"line": number, "error": str(error)})
+            if len(batch) == IMPORT_CHUNK_SIZE:
+                commit(session, number)
+            context.progress(number)
+        if batch:
+            commit(session, number)
+
+    with open(context.artifact_path("json"), "w") as output:
+        json.dump({"created": state["created"], "errors": state["errors"]}, output)
+
+
+def purge_account(context) -> None:
+    """
+    Removes a deleted account's contacts in chunks, then the user.
+    """
+    deleted = account_service.purge_account(context.user_id)
+    context.progress(deleted, deleted)
+
+
+HANDLERS = {
+    "export": Handler(export_contacts, cpu_bound=False),
+    "dedup": Handler(find_duplicates, cpu_bound=True),
+    "import": Handler(import_contacts, cpu_bound=False),
+    "purge": Handler(purge_account, cpu_bound=False),
+}
@@ -0,0 +1,33 @@
+import datetime
+import sqlalchemy
+import sqlalchemy.orm as orm
+import database
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+
+class Job(database.Base):
+    __tablename__ = "jobs"
+
+    id: orm.Mapped[int] = orm.mapped_column(primary_key=True)
+    # No foreign key: an account purge job outlives its user.
+    user_id: orm.Mapped[int] = orm.mapped_column(nullable=False)
+    kind: orm.Mapped[str] = orm.mapped_column(sqlalchemy.String(16), nullable=False)
+    status: orm.Mapped[str] = orm.mapped_column(sqlalchemy.String(8), nullable=False, default=QUEUED)
+    params: orm.Mapped[str | None] = orm.mapped_column(sqlalchemy.Text, nullable=True)
+    progress: orm.Mapped[int] = orm.mapped_column(nullable=False, default=0)
+    total: orm.Mapped[int | None] = orm.mapped_column(nullable=True)
+    attempts: orm.Mapped[int] = orm.mapped_column(nullable=False, default=0)
+    artifact: orm.Mapped[str | None] = orm.mapped_column(sqlalchemy.String(255), nullable=True)
+    error: orm.Mapped[str | None] = orm.mapped_column(sqlalchemy.Text, nullable=True)
+    # JSON state of a handler that commits as it goes, for retries.
+    checkpoint: orm.Mapped[str | None] = orm.mapped_column(sqlalchemy.Text, nullable=True)
+    created_at: orm.Mapped[datetime.datetime] = orm.mapped_column(nullable=False)
+    started_at: orm.Mapped[datetime.datetime | None] = orm.mapped_column(nullable=True)
+    heartbeat_at: orm.Mapped[datetime.datetime | None] = orm.mapped_column(nullable=True)
+    finished_at: orm.Mapped[datetime.datetime | None] = orm.mapped_column(nullable=True)
+
+    __table_args__ = (
+        sqlalchemy.Index("ix_jobs_status_user", "status", "user_id"),
+        sqlalchemy.Index("ix_jobs_user_started", "user_id", "started_at"),
+    )
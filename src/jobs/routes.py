@@ -0,0 +1,232 @@
+import asyncio
+import os
+import uuid
+import fastapi
+import fastapi.responses
+import sqlalchemy
+import starlette.datastructures
+import database
+import auth.service
+import jobs.models as models
+import jobs.schemas as schemas
+import jobs.service as service
+
+router = fastapi.APIRouter(prefix="/jobs", tags=["Jobs"])
+auth_service = auth.service.Auth()
+JOB_LIST_LIMIT = 50
+UPLOAD_CHUNK_SIZE = 1 << 20
+IMPORT_MAX_BYTES = int(os.environ.get('JOB_IMPORT_MAX_BYTES', 50 << 20))
+MULTIPART_OVERHEAD_BYTES = 16 << 10
+ARTIFACT_TYPES = {".ndjson": "application/x-ndjson", ".json": "application/json"}
+
+
+def _enqueue(db, user_id: int, kind: str, params: dict | None = None) -> models.Job:
+    try:
+        return service.enqueue(db, user_id, kind, params)
+    except service.QueueFull as error:
+        raise fastapi.HTTPException(fastapi.status.HTTP_429_TOO_MANY_REQUESTS, detail=str(error))
+
+
+def _own_job(db, user_id: int, job_id: int) -> models.Job:
+    job = db.get(models.Job, job_id)
+    if job is None or job.user_id != user_id:
+        raise fastapi.HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.post("/export", status_code=fastapi.status.HTTP_202_ACCEPTED)
+async def export_contacts(
+    db=fastapi.Depends(database.get_database),
+    user=fastapi.Depends(auth_service.get_user)
+) -> schemas.JobResponse:
+    """
+    Queues an NDJSON export of all contacts of the authenticated user.
+
+    Args:
+        db: The database session.
+        user: The authenticated user.
+
+    Returns:
+        schemas.JobResponse: The queued job; its result is the export file.
+
+    Raises:
+        HTTPException: If the user has too many unfinished jobs (429).
+    """
+    return _enqueue(db, user.id, "export")
+
+
+@router.post("/dedup", status_code=fastapi.status.HTTP_202_ACCEPTED)
+async def find_duplicates(
+    db=fastapi.Depends(database.get_database),
+    user=fastapi.Depends(auth_service.get_user)
+) -> schemas.JobResponse:
+    """
+    Queues a duplicate search over the authenticated user's contacts.
+
+    Args:
+        db: The database session.
+        user: The authenticated user.
+
+    Returns:
+        schemas.JobResponse: The queued job; its result lists the duplicate groups.
+
+    Raises:
+        HTTPException: If the user has too many unfinished jobs (429).
+    """
+    return _enqueue(db, user.id, "dedup")
+
+
+def _too_large() -> fastapi.HTTPException:
+    return fastapi.HTTPException(
+        fastapi.status.HTTP_413_CONTENT_TOO_LARGE,
+        detail=f"Imports are limited to {IMPORT_MAX_BYTES} bytes"
+    )
+
+
+def _save_upload(source, name: str) -> bool:
+    """Copies an upload to the artifact ``name``; False if it was too large."""
+    size = 0
+    with open(service.artifact_path(name), "wb") as upload:
+        while chunk := source.read(UPLOAD_CHUNK_SIZE):
+            size += len(chunk)
+            if size > IMPORT_MAX_BYTES:
+                break
+            upload.write(chunk)
+    if size > IMPORT_MAX_BYTES:
+        os.remove(service.artifact_path(name))
+        return False
+    return True
+
+
+@router.post(
+    "/import",
+    status_code=fastapi.status.HTTP_202_ACCEPTED,
+    openapi_extra={"requestBody": {"required": True, "content": {"multipart/form-data": {"schema": {
+        "type": "object",
+        "properties": {"file": {"type": "string", "format": "binary"}},
+        "required": ["file"]
+    }}}}}
+)
+async def import_contacts(
+    request: fastapi.Request,
+    db=fastapi.Depends(database.get_database),
+    user=fastapi.Depends(auth_service.get_user)
+) -> schemas.JobResponse:
+    """
+    Queues an import of contacts from an NDJSON file, one contact per line.
+
+    The file is sent as the multipart field ``file``. The body is parsed by
+    hand rather than through an ``UploadFile`` parameter, so an oversized
+    request is refused on its ``Content-Length`` before any of it is read.
+
+    Args:
+        request (Request): The current request.
+        db: The database session.
+        user: The authenticated user.
+
+    Returns:
+        schemas.JobResponse: The queued job; its result counts the created
+        contacts and lists invalid lines.
+
+    Raises:
+        HTTPException: If the request has no length (411), the file is
+            missing (422), the file is larger than ``IMPORT_MAX_BYTES`` (413)
+            or the user has too many unfinished jobs (429).
+    """
+    length = request.headers.get("content-length")
+    if length is None or not length.isdigit():
+        raise fastapi.HTTPException(fastapi.status.HTTP_411_LENGTH_REQUIRED, detail="Content-Length is required")
+    if int(length) > IMPORT_MAX_BYTES + MULTIPART_OVERHEAD_BYTES:
+        raise _too_large()
+
+    name = f"import-{uuid.uuid4().hex}.ndjson"
+    async with request.form(max_files=1) as form:
+        file = form.get("file")
+        if not isinstance(file, starlette.datastructures.UploadFile):
+            raise fastapi.HTTPException(fastapi.status.HTTP_422_UNPROCESSABLE_CONTENT, detail="A file is required")
+        if not await asyncio.to_thread(_save_upload, file.file, name):
+            raise _too_large()
+
+    try:
+        return service.enqueue(db, user.id, "import", {"input": name})
+    except service.QueueFull as error:
+        os.remove(service.artifact_path(name))
+        raise fastapi.HTTPException(fastapi.status.HTTP_429_TOO_MANY_REQUESTS, detail=str(error))
+
+
+@router.get("/")
+async def list_jobs(
+    db=fastapi.Depends(database.get_database),
+    user=fastapi.Depends(auth_service.get_user)
+) -> list[schemas.JobResponse]:
+    """
+    Lists the authenticated user's most recent jobs, newest first.
+
+    Args:
+        db: The database session.
+        user: The authenticated user.
+
+    Returns:
+        list[schemas.JobResponse]: Up to ``JOB_LIST_LIMIT`` jobs.
+    """
+    return db.scalars(
+        sqlalchemy.select(models.Job)
+        .where(models.Job.user_id == user.id)
+        .order_by(models.Job.id.desc())
+        .limit(JOB_LIST_LIMIT)
+    ).all()
+
+
+@router.get("/{job_id}")
+async def get_job(
+    job_id: int,
+    db=fastapi.Depends(database.get_database),
+    user=fastapi.Depends(auth_service.get_user)
+) -> schemas.JobResponse:
+    """
+    Reports the status and progress of one of the user's jobs.
+
+    Args:
+        job_id (int): The job.
+        db: The database session.
+        user: The authenticated user.
+
+    Returns:
+        schemas.JobResponse: The job.
+
+    Raises:
+        HTTPException: If the user has no such job (404).
+    """
+    return _own_job(db, user.id, job_id)
+
+
+@router.get("/{job_id}/result")
+async def get_job_result(
+    job_id: int,
+    db=fastapi.Depends(database.get_database),
+    user=fastapi.Depends(auth_service.get_user)
+):
+    """
+    Downloads the result file of a finished job.
+
+    Args:
+        job_id (int): The job.
+        db: The database session.
+        user: The authenticated user.
+
+    Returns:
+        FileResponse: The result file.
+
+    Raises:
+        HTTPException: If the user has no such job (404) or the job has no
+            result yet (409).
+    """
+    job = _own_job(db, user.id, job_id)
+    if job.status != models.DONE or job.artifact is None:
+        raise fastapi.HTTPException(fastapi.status.HTTP_409_CONFLICT, detail=f"Job is {job.status}")
+
+    return fastapi.responses.FileResponse(
+        service.artifact_path(job.artifact),
+        media_type=ARTIFACT_TYPES.get(os.path.splitext(job.artifact)[1], "application/octet-stream"),
+        filename=job.artifact
+    )
@@ -0,0 +1,17 @@
+import datetime
+import pydantic
+
+
+class JobResponse(pydantic.BaseModel):
+    id: int
+    kind: str
+    status: str
+    progress: int
+    total: int | None
+    error: str | None
+    created_at: datetime.datetime
+    started_at: datetime.datetime | None
+    finished_at: datetime.datetime | None
+
+    class Config:
+        orm_mode = True
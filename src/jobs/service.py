@@ -0,0 +1,486 @@
+"""
+Background jobs for heavy per-user operations.
+
+Jobs are rows of the ``jobs`` table on the primary database. Requests only
+enqueue them; a scheduler claims queued jobs and runs them in a thread pool,
+or in a pool of worker processes for CPU-bound kinds, and each job reports
+its progress to its row. Results are files in ``JOB_ARTIFACT_DIR``.
+
+Scheduling is fair between users: a user never has more than
+``JOBS_PER_USER`` jobs running, and the next job goes to the user with the
+fewest running jobs, then to the one served least recently, so one user
+queueing many jobs does not hold everybody else back.
+
+Only the worker holding the ``job-scheduler`` lease claims jobs. Running
+jobs are heartbeaten by their scheduler; a job whose heartbeat stops (its
+worker died) is queued again, up to ``JOB_MAX_ATTEMPTS`` attempts. Handlers
+that commit as they go save a checkpoint with each commit and resume from
+it when retried.
+
+Configured from the environment:
+
+- ``JOB_WORKERS``: jobs run at once by the app's scheduler (default 2);
+  0 leaves jobs to a separate worker started from ``src`` with
+  ``python -m jobs.service``.
+- ``JOB_PROCESSES``: processes for CPU-bound jobs (default 2); 0 runs them
+  in threads too.
+- ``JOBS_PER_USER``: running jobs per user (default 1).
+- ``JOB_QUEUE_LIMIT``: unfinished jobs a user may have (default 20).
+- ``JOB_ARTIFACT_DIR``: where results are written (default ``job_artifacts``).
+- ``JOB_KEEP_DAYS``: finished jobs and their files are removed after this
+  many days (default 7).
+- ``JOB_IMPORT_MAX_BYTES``: largest import upload accepted (default 50 MiB).
+"""
+import asyncio
+import concurrent.futures
+import concurrent.futures.process
+import datetime
+import json
+import logging
+import multiprocessing
+import os
+import time
+import sqlalchemy
+import database
+import sharding
+import jobs.handlers as handlers
+import jobs.models as models
+import services.lease_service as lease_service
+
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 2))
+JOB_PROCESSES = int(os.environ.get('JOB_PROCESSES', 2))
+JOBS_PER_USER = int(os.environ.get('JOBS_PER_USER', 1))
+JOB_QUEUE_LIMIT = int(os.environ.get('JOB_QUEUE_LIMIT', 20))
+JOB_ARTIFACT_DIR = os.environ.get('JOB_ARTIFACT_DIR', 'job_artifacts')
+JOB_KEEP_DAYS = int(os.environ.get('JOB_KEEP_DAYS', 7))
+JOB_POLL_SECONDS = float(os.environ.get('JOB_POLL_SECONDS', 1))
+JOB_STALE_SECONDS = 300
+JOB_MAX_ATTEMPTS = 3
+PROGRESS_INTERVAL_SECONDS = 1.0
+PRUNE_INTERVAL_SECONDS = 3600
+LEASE_NAME = "job-scheduler"
+LEASE_SECONDS = 60
+
+logger = logging.getLogger(__name__)
+_jobs = models.Job.__table__
+
+
+class QueueFull(Exception):
+    pass
+
+
+class JobContext:
+    """
+    What a handler knows about the job it runs.
+
+    Attributes:
+        job_id (int): The job.
+        user_id (int): The user who queued it.
+        params (dict): Parameters given at enqueue time.
+        checkpoint (dict | None): State saved by an earlier attempt with
+            ``save_checkpoint``.
+        artifact (str | None): File name of the result, set by ``artifact_path``.
+    """
+
+    def __init__(self, job_id: int, user_id: int, params: dict, checkpoint: dict | None = None):
+        self.job_id = job_id
+        self.user_id = user_id
+        self.params = params
+        self.checkpoint = checkpoint
+        self.artifact = None
+        self.done = 0
+        self.total = None
+        self._reported_at = 0.0
+
+    def progress(self, done: int, total: int | None = None) -> None:
+        """
+        Records how far the job got; written at most once per
+        ``PROGRESS_INTERVAL_SECONDS``, and always when the total changes.
+        """
+        changed = total is not None and total != self.total
+        self.done = done
+        if total is not None:
+            self.total = total
+        now = time.monotonic()
+        if changed or now - self._reported_at >= PROGRESS_INTERVAL_SECONDS:
+            self._reported_at = now
+            with database.engine.begin() as connection:
+                connection.execute(
+                    sqlalchemy.update(_jobs).where(_jobs.c.id == self.job_id)
+                    .values(progress=self.done, total=self.total)
+                )
+
+    def save_checkpoint(self, db, state: dict) -> None:
+        """
+        Stores the handler's state on the job row within ``db``'s transaction,
+        so it is committed together with the work it describes.
+        """
+        self.checkpoint = state
+        db.execute(
+            sqlalchemy.update(_jobs).where(_jobs.c.id == self.job_id)
+            .values(checkpoint=json.dumps(state))
+        )
+
+    def path(self, name: str) -> str:
+        """
+        Returns the path of a file in ``JOB_ARTIFACT_DIR``.
+        """
+        return artifact_path(name)
+
+    def artifact_path(self, extension: str) -> str:
+        """
+        Names the job's result file and returns its path.
+        """
+        self.artifact = f"job-{self.job_id}.{extension}"
+        return artifact_path(self.artifact)
+
+
+def artifact_path(name: str) -> str:
+    """
+    Returns the path of a file in ``JOB_ARTIFACT_DIR``, creating the directory.
+    """
+    os.makedirs(JOB_ARTIFACT_DIR, exist_ok=True)
+    return os.path.join(JOB_ARTIFACT_DIR, name)
+
+
+def enqueue(db, user_id: int, kind: str, params: dict | None = None, limited: bool = True) -> models.Job:
+    """
+    Queues a job for a user and commits.
+
+    Args:
+        db (Session): The database session.
+        user_id (int): The user the job works for.
+        kind (str): A key of ``handlers.HANDLERS``.
+        params (dict | None): JSON-serializable parameters for the handler.
+        limited (bool): Whether ``JOB_QUEUE_LIMIT`` applies; system jobs
+            such as account purges are always queued.
+
+    Returns:
+        models.Job: The queued job.
+
+    Raises:
+        QueueFull: If the user already has ``JOB_QUEUE_LIMIT`` unfinished jobs.
+    """
+    if limited:
+        unfinished = db.execute(
+            sqlalchemy.select(sqlalchemy.func.count())
+            .where(_jobs.c.user_id == user_id, _jobs.c.status.in_([models.QUEUED, models.RUNNING]))
+        ).scalar()
+        if unfinished >= JOB_QUEUE_LIMIT:
+            raise QueueFull(f"{unfinished} jobs are already queued")
+
+    job = models.Job(
+        user_id=user_id, kind=kind, params=json.dumps(params) if params else None,
+        created_at=lease_service.utcnow()
+    )
+    db.add(job)
+    db.commit()
+    return job
+
+
+def claim_next(now: datetime.datetime | None = None) -> models.Job | None:
+    """
+    Marks the next job to run as running.
+
+    Users at ``JOBS_PER_USER`` running jobs are skipped. Among the others,
+    the user with the fewest running jobs goes first, then the one whose
+    last job started longest ago; a user's jobs run in the order they were
+    queued.
+
+    Args:
+        now (datetime | None): Defaults to the current UTC time.
+
+    Returns:
+        Job | None: The claimed job (detached), or None if nothing can start.
+    """
+    now = now or lease_service.utcnow()
+    with database.engine.begin() as connection:
+        heads = dict(connection.execute(
+            sqlalchemy.select(_jobs.c.user_id, sqlalchemy.func.min(_jobs.c.id))
+            .where(_jobs.c.status == models.QUEUED)
+            .group_by(_jobs.c.user_id)
+        ).all())
+        if not heads:
+            return None
+
+        running = dict(connection.execute(
+            sqlalchemy.select(_jobs.c.user_id, sqlalchemy.func.count())
+            .where(_jobs.c.status == models.RUNNING, _jobs.c.user_id.in_(heads))
+            .group_by(_jobs.c.user_id)
+        ).all())
+        served = dict(connection.execute(
+            sqlalchemy.select(_jobs.c.user_id, sqlalchemy.func.max(_jobs.c.started_at))
+            .where(_jobs.c.user_id.in_(heads), _jobs.c.started_at.is_not(None))
+            .group_by(_jobs.c.user_id)
+        ).all())
+
+        candidates = [
+            (running.get(user_id, 0), served.get(user_id) or datetime.datetime.min, job_id)
+            for user_id, job_id in heads.items()
+            if running.get(user_id, 0) < JOBS_PER_USER
+        ]
+        if not candidates:
+            return None
+        job_id = min(candidates)[2]
+
+        claimed = connection.execute(
+            sqlalchemy.update(_jobs)
+            .where(_jobs.c.id == job_id, _jobs.c.status == models.QUEUED)
+            .values(status=models.RUNNING, started_at=now, heartbeat_at=now, attempts=_jobs.c.attempts + 1)
+            .returning(*_jobs.c)
+        ).first()
+    if claimed is None:
+        return claim_next(now)
+    return models.Job(**claimed._mapping)
+
+
+def _finish(job_id: int, status: str, **values) -> None:
+    with database.engine.begin() as connection:
+        connection.execute(
+            sqlalchemy.update(_jobs).where(_jobs.c.id == job_id)
+            .values(status=status, finished_at=lease_service.utcnow(), **values)
+        )
+
+
+def execute(job_id: int, kind: str, user_id: int, params: str | None, checkpoint: str | None = None) -> str:
+    """
+    Runs a claimed job and records its outcome.
+
+    Runs in a worker thread or process; handler errors mark the job failed.
+    ``checkpoint`` is the job row's, left by an earlier attempt.
+
+    Returns:
+        str: The final status.
+    """
+    context = JobContext(
+        job_id, user_id, json.loads(params) if params else {},
+        json.loads(checkpoint) if checkpoint else None
+    )
+    try:
+        handlers.HANDLERS[kind].run(context)
+    except Exception as error:
+        logger.exception("job %d (%s) failed", job_id, kind)
+        _finish(job_id, models.FAILED, error=f"{type(error).__name__}: {error}")
+        return models.FAILED
+
+    _finish(job_id, models.DONE, artifact=context.artifact, progress=context.done, total=context.total)
+    return models.DONE
+
+
+def heartbeat(job_ids: list[int], now: datetime.datetime | None = None) -> None:
+    """
+    Tells other workers that these running jobs are still alive.
+    """
+    if job_ids:
+        with database.engine.begin() as connection:
+            connection.execute(
+                sqlalchemy.update(_jobs).where(_jobs.c.id.in_(job_ids))
+                .values(heartbeat_at=now or lease_service.utcnow())
+            )
+
+
+def recover_stale(now: datetime.datetime | None = None) -> int:
+    """
+    Queues again the running jobs whose worker stopped heartbeating.
+
+    Jobs that already had ``JOB_MAX_ATTEMPTS`` attempts are failed instead.
+
+    Returns:
+        int: Number of jobs recovered or failed.
+    """
+    now = now or lease_service.utcnow()
+    stale = (
+        _jobs.c.status == models.RUNNING,
+        _jobs.c.heartbeat_at < now - datetime.timedelta(seconds=JOB_STALE_SECONDS),
+    )
+    with database.engine.begin() as connection:
+        failed = connection.execute(
+            sqlalchemy.update(_jobs).where(*stale, _jobs.c.attempts >= JOB_MAX_ATTEMPTS)
+            .values(status=models.FAILED, finished_at=now, error="worker lost")
+        ).rowcount
+        requeued = connection.execute(
+            sqlalchemy.update(_jobs).where(*stale).values(status=models.QUEUED)
+        ).rowcount
+    return failed + requeued
+
+
+def release(job_id: int, error: str) -> None:
+    """
+    Puts a running job that could not run back in the queue at once.
+
+    A job that already had ``JOB_MAX_ATTEMPTS`` attempts is failed with
+    ``error`` instead.
+    """
+    now = lease_service.utcnow()
+    job = (_jobs.c.id == job_id, _jobs.c.status == models.RUNNING)
+    with database.engine.begin() as connection:
+        connection.execute(
+            sqlalchemy.update(_jobs).where(*job, _jobs.c.attempts >= JOB_MAX_ATTEMPTS)
+            .values(status=models.FAILED, finished_at=now, error=error)
+        )
+        connection.execute(sqlalchemy.update(_jobs).where(*job).values(status=models.QUEUED))
+
+
+def prune(now: datetime.datetime | None = None, days: int = JOB_KEEP_DAYS) -> int:
+    """
+    Deletes jobs finished more than ``days`` days ago and their files.
+
+    Returns:
+        int: Number of jobs deleted.
+    """
+    now = now or lease_service.utcnow()
+    with database.engine.begin() as connection:
+        old = connection.execute(
+            sqlalchemy.select(_jobs.c.id, _jobs.c.artifact, _jobs.c.params)
+            .where(
+                _jobs.c.status.in_([models.DONE, models.FAILED]),
+                _jobs.c.finished_at < now - datetime.timedelta(days=days),
+            )
+        ).all()
+        if old:
+            connection.execute(sqlalchemy.delete(_jobs).where(_jobs.c.id.in_([row.id for row in old])))
+
+    for row in old:
+        names = [row.artifact, json.loads(row.params).get("input") if row.params else None]
+        for name in filter(None, names):
+            try:
+                os.remove(artifact_path(name))
+            except FileNotFoundError:
+                pass
+    return len(old)
+
+
+def run_pending() -> int:
+    """
+    Runs queued jobs one after the other in this thread until none can start.
+
+    Returns:
+        int: Number of jobs run.
+    """
+    count = 0
+    while (job := claim_next()) is not None:
+        execute(job.id, job.kind, job.user_id, job.params, job.checkpoint)
+        count += 1
+    return count
+
+
+def _init_process(url: str, artifact_dir: str) -> None:
+    global JOB_ARTIFACT_DIR
+    JOB_ARTIFACT_DIR = artifact_dir
+    database.connect(url)
+    if sharding.CONTACTS_SHARD_URLS:
+        sharding.connect()
+
+
+class Scheduler:
+    """
+    Claims and runs jobs while this worker holds the scheduler lease.
+
+    Jobs run in a thread pool of ``workers`` threads; CPU-bound kinds go to
+    a pool of ``processes`` spawned processes, started on first use. When a
+    worker process dies the pool is replaced, and its jobs are queued again
+    at once.
+    """
+
+    def __init__(self, workers: int = JOB_WORKERS, processes: int = JOB_PROCESSES):
+        self.workers = workers
+        self.process_count = processes
+        self.threads = concurrent.futures.ThreadPoolExecutor(workers, thread_name_prefix="job")
+        self.processes = None
+        self.running = {}
+        self._executors = {}
+        self._pruned_at = 0.0
+
+    def _executor(self, kind: str) -> concurrent.futures.Executor:
+        if not handlers.HANDLERS[kind].cpu_bound or self.process_count == 0:
+            return self.threads
+        if self.processes is None:
+            self.processes = concurrent.futures.ProcessPoolExecutor(
+                self.process_count,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_process,
+                initargs=(database.engine.url.render_as_string(hide_password=False), JOB_ARTIFACT_DIR),
+            )
+        return self.processes
+
+    def _reset_processes(self, broken: concurrent.futures.Executor) -> None:
+        # A pool whose worker died refuses all work; the next job builds a new one.
+        if broken is self.processes:
+            self.processes.shutdown(wait=False, cancel_futures=True)
+            self.processes = None
+
+    async def _submit(self, job: models.Job) -> None:
+        executor = None
+        try:
+            executor = self._executor(job.kind)
+            future = asyncio.get_running_loop().run_in_executor(
+                executor, execute, job.id, job.kind, job.user_id, job.params, job.checkpoint
+            )
+        except Exception as error:
+            logger.exception("job %d could not be started", job.id)
+            if isinstance(error, concurrent.futures.process.BrokenProcessPool):
+                self._reset_processes(executor)
+            await asyncio.to_thread(release, job.id, f"{type(error).__name__}: {error}")
+            return
+        self.running[future] = job.id
+        self._executors[future] = executor
+
+    def _tick(self) -> list[models.Job]:
+        heartbeat(list(self.running.values()))
+        if not lease_service.acquire(database.engine, LEASE_NAME, LEASE_SECONDS):
+            return []
+
+        recover_stale()
+        if time.monotonic() - self._pruned_at > PRUNE_INTERVAL_SECONDS:
+            self._pruned_at = time.monotonic()
+            prune()
+
+        claimed = []
+        while len(self.running) + len(claimed) < self.workers:
+            job = claim_next()
+            if job is None:
+                break
+            claimed.append(job)
+        return claimed
+
+    async def run_forever(self, interval: float = JOB_POLL_SECONDS) -> None:
+        """
+        Polls for jobs every ``interval`` seconds, or as soon as one finishes.
+        """
+        try:
+            while True:
+                try:
+                    for job in await asyncio.to_thread(self._tick):
+                        await self._submit(job)
+                except Exception:
+                    logger.exception("job scheduler run failed")
+
+                if not self.running:
+                    await asyncio.sleep(interval)
+                    continue
+                finished, _ = await asyncio.wait(
+                    self.running, timeout=interval, return_when=asyncio.FIRST_COMPLETED
+                )
+                for future in finished:
+                    job_id = self.running.pop(future)
+                    executor = self._executors.pop(future)
+                    error = future.exception()
+                    if error is not None:
+                        # execute() records handler errors itself, so its worker process died.
+                        logger.error("job %d crashed its worker", job_id, exc_info=error)
+                        if isinstance(error, concurrent.futures.process.BrokenProcessPool):
+                            self._reset_processes(executor)
+                        await asyncio.to_thread(release, job_id, "worker lost")
+        finally:
+            self.threads.shutdown(wait=False, cancel_futures=True)
+            if self.processes is not None:
+                self.processes.shutdown(wait=False, cancel_futures=True)
+            lease_service.release(database.engine, LEASE_NAME)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    database.connect()
+    if sharding.CONTACTS_SHARD_URLS:
+        sharding.connect()
+    asyncio.run(Scheduler(workers=max(JOB_WORKERS, 1)).run_forever())
@@ -21,6 +21,11 @@ if config.config_file_name is not None:
 import auth.models
 import database
 import contacts.schema
+import contacts.stats
+import jobs.models
+import sharding
+import services.birthday_service
+import services.archive_service
 target_metadata = database.Base.metadata
 
 # other values from the config, defined by the needs of env.py,
@@ -0,0 +1,42 @@
+"""shard assignments and contact id sequence
+
+Revision ID: 3f1c9a7d2b40
+Revises: 74dbdc021a27
+Create Date: 2026-10-18 10:12:31.402117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f1c9a7d2b40'
+down_revision: Union[str, None] = '74dbdc021a27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('shard_assignments',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('shard', sa.Integer(), nullable=False),
+    sa.Column('moving', sa.Boolean(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+    op.create_table('contact_id_sequence',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    # Continue after the existing contacts so moved ids never collide.
+    op.execute(
+        "INSERT INTO contact_id_sequence (id) "
+        "SELECT MAX(id) FROM contacts WHERE EXISTS (SELECT 1 FROM contacts)"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('contact_id_sequence')
+    op.drop_table('shard_assignments')
@@ -0,0 +1,83 @@
+"""normalized contact columns for duplicate detection
+
+Revision ID: 8a2e4c6b1d93
+Revises: 3f1c9a7d2b40
+Create Date: 2026-10-18 11:04:52.718560
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import contacts.normalize as normalize
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8a2e4c6b1d93'
+down_revision: Union[str, None] = '3f1c9a7d2b40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 5000
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('contacts') as batch_op:
+        batch_op.add_column(sa.Column('email_normalized', sa.String(), nullable=True))
+        batch_op.add_column(sa.Column('phone_normalized', sa.String(), nullable=True))
+        batch_op.add_column(sa.Column('name_key', sa.String(), nullable=True))
+
+    contacts = sa.table(
+        'contacts',
+        sa.column('id', sa.Integer()),
+        sa.column('email', sa.String()),
+        sa.column('phone_number', sa.String()),
+        sa.column('surename', sa.String()),
+        sa.column('email_normalized', sa.String()),
+        sa.column('phone_normalized', sa.String()),
+        sa.column('name_key', sa.String()),
+    )
+    connection = op.get_bind()
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            sa.select(contacts.c.id, contacts.c.email, contacts.c.phone_number, contacts.c.surename)
+            .where(contacts.c.id > last_id)
+            .order_by(contacts.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        connection.execute(
+            contacts.update()
+            .where(contacts.c.id == sa.bindparam('row_id'))
+            .values(
+                email_normalized=sa.bindparam('email_normalized'),
+                phone_normalized=sa.bindparam('phone_normalized'),
+                name_key=sa.bindparam('name_key'),
+            ),
+            [
+                {
+                    'row_id': row.id,
+                    'email_normalized': normalize.normalize_email(row.email),
+                    'phone_normalized': normalize.normalize_phone(row.phone_number),
+                    'name_key': normalize.normalize_name(row.surename),
+                }
+                for row in rows
+            ]
+        )
+        last_id = rows[-1].id
+
+    op.create_index('ix_contacts_user_email_normalized', 'contacts', ['user_id', 'email_normalized'])
+    op.create_index('ix_contacts_user_phone_normalized', 'contacts', ['user_id', 'phone_normalized'])
+    op.create_index('ix_contacts_user_name_key', 'contacts', ['user_id', 'name_key'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_contacts_user_name_key', table_name='contacts')
+    op.drop_index('ix_contacts_user_phone_normalized', table_name='contacts')
+    op.drop_index('ix_contacts_user_email_normalized', table_name='contacts')
+    with op.batch_alter_table('contacts') as batch_op:
+        batch_op.drop_column('name_key')
+        batch_op.drop_column('phone_normalized')
+        batch_op.drop_column('email_normalized')
@@ -0,0 +1,46 @@
+"""contacts.updated_at and contact archive
+
+Revision ID: a4c6e8f0b2d3
+Revises: f3a5c7e9b1d2
+Create Date: 2026-10-19 09:41:18.502716
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4c6e8f0b2d3'
+down_revision: Union[str, None] = 'f3a5c7e9b1d2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Recreated with AUTOINCREMENT so ids of archived contacts are never reused.
+    with op.batch_alter_table('contacts', recreate='always', table_kwargs={'sqlite_autoincrement': True}) as batch_op:
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+    op.execute("UPDATE contacts SET updated_at = CURRENT_TIMESTAMP")
+
+    op.create_table('contact_archive',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('min_id', sa.Integer(), nullable=False),
+    sa.Column('max_id', sa.Integer(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.Column('codec', sa.String(length=8), nullable=False),
+    sa.Column('data', sa.LargeBinary(), nullable=False),
+    sa.Column('archived_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_contact_archive_user_range', 'contact_archive', ['user_id', 'min_id', 'max_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_contact_archive_user_range', table_name='contact_archive')
+    op.drop_table('contact_archive')
+    with op.batch_alter_table('contacts', recreate='always', table_kwargs={'sqlite_autoincrement': False}) as batch_op:
+        batch_op.drop_column('updated_at')
@@ -0,0 +1,60 @@
+"""contacts.phone_key for phone number lookups
+
+Revision ID: b5d7f9a1c3e4
+Revises: a4c6e8f0b2d3
+Create Date: 2026-10-19 11:03:27.918254
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+import contacts.normalize as normalize
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5d7f9a1c3e4'
+down_revision: Union[str, None] = 'a4c6e8f0b2d3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 5000
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('contacts') as batch_op:
+        batch_op.add_column(sa.Column('phone_key', sa.String(length=15), nullable=True))
+
+    contacts = sa.table(
+        'contacts',
+        sa.column('id', sa.Integer()),
+        sa.column('phone_number', sa.String()),
+        sa.column('phone_key', sa.String()),
+    )
+    connection = op.get_bind()
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            sa.select(contacts.c.id, contacts.c.phone_number)
+            .where(contacts.c.id > last_id)
+            .order_by(contacts.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        connection.execute(
+            contacts.update()
+            .where(contacts.c.id == sa.bindparam('row_id'))
+            .values(phone_key=sa.bindparam('phone_key')),
+            [{'row_id': row.id, 'phone_key': normalize.phone_key(row.phone_number)} for row in rows]
+        )
+        last_id = rows[-1].id
+
+    op.create_index('ix_contacts_user_phone_key', 'contacts', ['user_id', 'phone_key'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_contacts_user_phone_key', table_name='contacts')
+    with op.batch_alter_table('contacts', table_kwargs={'sqlite_autoincrement': True}) as batch_op:
+        batch_op.drop_column('phone_key')
@@ -0,0 +1,54 @@
+"""birthday reminders, leases and contacts.birthday_key
+
+Revision ID: c5d7e9f1a3b2
+Revises: 8a2e4c6b1d93
+Create Date: 2026-10-18 12:21:07.335914
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5d7e9f1a3b2'
+down_revision: Union[str, None] = '8a2e4c6b1d93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('contacts') as batch_op:
+        batch_op.add_column(sa.Column('birthday_key', sa.String(length=5), nullable=True))
+    op.execute("UPDATE contacts SET birthday_key = strftime('%m-%d', date_of_birth)")
+    op.create_index('ix_contacts_birthday_key', 'contacts', ['birthday_key'])
+
+    op.create_table('birthday_reminders',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('contact_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('contact_name', sa.String(), nullable=False),
+    sa.Column('birthday', sa.Date(), nullable=False),
+    sa.Column('sent_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('contact_id', 'birthday')
+    )
+    op.create_index('ix_birthday_reminders_sent_at', 'birthday_reminders', ['sent_at'])
+
+    op.create_table('leases',
+    sa.Column('name', sa.String(length=64), nullable=False),
+    sa.Column('owner', sa.String(length=128), nullable=False),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('leases')
+    op.drop_index('ix_birthday_reminders_sent_at', table_name='birthday_reminders')
+    op.drop_table('birthday_reminders')
+    op.drop_index('ix_contacts_birthday_key', table_name='contacts')
+    with op.batch_alter_table('contacts') as batch_op:
+        batch_op.drop_column('birthday_key')
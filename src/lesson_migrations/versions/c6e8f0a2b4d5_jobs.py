@@ -0,0 +1,47 @@
+"""jobs table for background jobs
+
+Revision ID: c6e8f0a2b4d5
+Revises: b5d7f9a1c3e4
+Create Date: 2026-10-19 15:42:08.513207
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c6e8f0a2b4d5'
+down_revision: Union[str, None] = 'b5d7f9a1c3e4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'jobs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('kind', sa.String(length=16), nullable=False),
+        sa.Column('status', sa.String(length=8), nullable=False),
+        sa.Column('params', sa.Text(), nullable=True),
+        sa.Column('progress', sa.Integer(), nullable=False),
+        sa.Column('total', sa.Integer(), nullable=True),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('artifact', sa.String(length=255), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('heartbeat_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_jobs_status_user', 'jobs', ['status', 'user_id'])
+    op.create_index('ix_jobs_user_started', 'jobs', ['user_id', 'started_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_jobs_user_started', table_name='jobs')
+    op.drop_index('ix_jobs_status_user', table_name='jobs')
+    op.drop_table('jobs')
@@ -0,0 +1,30 @@
+"""birthday_batches, days whose reminders were enqueued
+
+Revision ID: d7f9b1c3e5a6
+Revises: c6e8f0a2b4d5
+Create Date: 2026-10-19 18:05:44.120937
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7f9b1c3e5a6'
+down_revision: Union[str, None] = 'c6e8f0a2b4d5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('birthday_batches',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('enqueued_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('day')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('birthday_batches')
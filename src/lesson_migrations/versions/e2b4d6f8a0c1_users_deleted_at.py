@@ -0,0 +1,28 @@
+"""users.deleted_at for background account purges
+
+Revision ID: e2b4d6f8a0c1
+Revises: c5d7e9f1a3b2
+Create Date: 2026-10-18 14:02:44.190338
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2b4d6f8a0c1'
+down_revision: Union[str, None] = 'c5d7e9f1a3b2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.add_column(sa.Column('deleted_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('deleted_at')
@@ -0,0 +1,28 @@
+"""jobs.checkpoint for resuming retried jobs
+
+Revision ID: e8a0c2d4f6b7
+Revises: d7f9b1c3e5a6
+Create Date: 2026-10-19 19:12:31.604218
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8a0c2d4f6b7'
+down_revision: Union[str, None] = 'd7f9b1c3e5a6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('jobs') as batch_op:
+        batch_op.add_column(sa.Column('checkpoint', sa.Text(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('jobs') as batch_op:
+        batch_op.drop_column('checkpoint')
@@ -0,0 +1,49 @@
+"""contact stats summary table
+
+Revision ID: f3a5c7e9b1d2
+Revises: e2b4d6f8a0c1
+Create Date: 2026-10-18 15:10:52.604117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3a5c7e9b1d2'
+down_revision: Union[str, None] = 'e2b4d6f8a0c1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('contact_stats',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(length=8), nullable=False),
+    sa.Column('key', sa.String(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'kind', 'key')
+    )
+    op.execute(
+        "INSERT INTO contact_stats (user_id, kind, key, count) "
+        "SELECT user_id, 'total', '', count(*) FROM contacts GROUP BY user_id"
+    )
+    op.execute(
+        "INSERT INTO contact_stats (user_id, kind, key, count) "
+        "SELECT user_id, 'month', strftime('%m', date_of_birth), count(*) FROM contacts "
+        "GROUP BY user_id, strftime('%m', date_of_birth)"
+    )
+    op.execute(
+        "INSERT INTO contact_stats (user_id, kind, key, count) "
+        "SELECT user_id, 'domain', domain, count(*) FROM ("
+        "SELECT user_id, CASE WHEN instr(email, '@') > 0 "
+        "THEN lower(substr(email, instr(email, '@') + 1)) ELSE '' END AS domain FROM contacts"
+        ") GROUP BY user_id, domain"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('contact_stats')
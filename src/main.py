@@ -1,14 +1,40 @@
+import asyncio
+import contextlib
 import fastapi
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
 import contacts.routes as contacts_routes
 import auth.routes
 import auth.exceptions
+import jobs.routes
+import jobs.service
+import sharding
+import compression
+import metrics
+import profiling
+import services.birthday_service as birthday_service
+import services.account_service as account_service
+import services.archive_service as archive_service
 from dotenv import load_dotenv
 import os
 load_dotenv()
 
-app = fastapi.FastAPI()
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    background = [asyncio.create_task(asyncio.to_thread(account_service.queue_interrupted_purges))]
+    if birthday_service.BIRTHDAY_REMINDERS_ENABLED:
+        background.append(asyncio.create_task(birthday_service.run_forever()))
+    if archive_service.CONTACT_ARCHIVE_ENABLED:
+        background.append(asyncio.create_task(archive_service.run_forever()))
+    if jobs.service.JOB_WORKERS > 0:
+        background.append(asyncio.create_task(jobs.service.Scheduler().run_forever()))
+    yield
+    for task in background:
+        task.cancel()
+
+
+app = fastapi.FastAPI(lifespan=lifespan)
 
 origins = ["http://localhost:8000"]
 app.add_middleware(
@@ -18,10 +44,24 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(compression.CompressionMiddleware)
+if profiling.PROFILING_ENABLED:
+    app.add_middleware(profiling.ProfilingMiddleware)
 
 
+app.add_exception_handler(auth.exceptions.AuthException, auth.exceptions.auth_error_handler)
+app.add_exception_handler(sharding.MigrationInProgress, sharding.migration_error_handler)
+
+if sharding.CONTACTS_SHARD_URLS:
+    sharding.connect()
+
 app.include_router(contacts_routes.router, prefix="/api")
 app.include_router(auth.routes.router)
+app.include_router(jobs.routes.router, prefix="/api")
+app.include_router(metrics.router)
+if profiling.PROFILING_ENABLED:
+    app.include_router(profiling.router)
+
 
 if __name__ == "__main__":
     uvicorn.run(
@@ -0,0 +1,28 @@
+"""
+Runtime metrics of a worker, for admins only.
+
+Admins are the usernames listed in ``PROFILING_ADMINS`` (see ``profiling``),
+authenticated with their usual access token.
+
+- ``GET /metrics/sql-cache`` reports the hits and misses of the compiled SQL
+  statement cache, see ``database.statement_cache_stats``.
+"""
+import fastapi
+import database
+import profiling
+
+router = fastapi.APIRouter(prefix="/metrics", tags=["metrics"])
+
+
+@router.get("/sql-cache")
+def sql_cache_metrics(user = fastapi.Depends(profiling.require_admin)) -> dict:
+    """
+    Hit and miss counts of the compiled SQL statement cache.
+
+    Args:
+        user: The admin asking (depends on authentication).
+
+    Returns:
+        dict: The counters of ``database.statement_cache_stats``.
+    """
+    return database.statement_cache_stats()
@@ -0,0 +1,207 @@
+"""
+Opt-in profiling of a live worker, for admins only.
+
+Enabled with ``PROFILING_ENABLED=1``; when it is off neither the routes nor
+the middleware are installed, so requests pay nothing. Admins are the
+usernames listed in ``PROFILING_ADMINS`` (comma separated), authenticated
+with their usual access token.
+
+- ``GET /debug/profile/sample?seconds=N`` samples the stacks of every thread
+  of the worker every ``PROFILING_SAMPLE_INTERVAL`` seconds (default 0.005)
+  for N seconds, at most ``PROFILING_MAX_SECONDS`` (default 60), and returns
+  them in the collapsed format read by ``flamegraph.pl`` and speedscope::
+
+      curl -H "Authorization: Bearer $TOKEN" \\
+          "http://localhost:8000/debug/profile/sample?seconds=10" > app.folded
+      flamegraph.pl app.folded > app.svg
+
+- Any request sent with an ``X-Profile`` header runs under cProfile, and the
+  response body is replaced by the stats, sorted by the header value
+  (``cumulative`` by default, or ``tottime``, ``calls``). The original
+  status is in ``X-Profiled-Status``. cProfile only sees the event loop
+  thread: code run in worker threads (password hashing, ``to_thread``) is
+  missing, and other requests served meanwhile are included.
+"""
+import asyncio
+import collections
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+import fastapi
+import fastapi.responses
+import database
+import auth.exceptions
+import auth.service
+
+PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', '') == '1'
+ADMIN_USERNAMES = frozenset(
+    name.strip() for name in os.environ.get('PROFILING_ADMINS', '').split(',') if name.strip()
+)
+SAMPLE_INTERVAL = float(os.environ.get('PROFILING_SAMPLE_INTERVAL', 0.005))
+MAX_SAMPLE_SECONDS = float(os.environ.get('PROFILING_MAX_SECONDS', 60))
+PROFILE_HEADER = b"x-profile"
+SORT_KEYS = ("cumulative", "tottime", "calls")
+STATS_LIMIT = 60
+
+auth_service = auth.service.Auth()
+router = fastapi.APIRouter(prefix="/debug/profile", tags=["profiling"])
+_sampling = threading.Lock()
+_profiling = asyncio.Lock()
+
+
+def is_admin(user) -> bool:
+    """
+    Tells whether a user is listed in ``PROFILING_ADMINS``.
+    """
+    return user.username in ADMIN_USERNAMES
+
+
+def require_admin(user = fastapi.Depends(auth_service.get_user)):
+    """
+    Lets only profiling admins through.
+
+    Raises:
+        HTTPException: If the user is not an admin (403 Forbidden).
+    """
+    if not is_admin(user):
+        raise fastapi.HTTPException(fastapi.status.HTTP_403_FORBIDDEN, detail="Profiling is for admins only")
+    return user
+
+
+def _frame_name(frame) -> str:
+    return f"{frame.f_globals.get('__name__', '?')}:{frame.f_code.co_qualname}"
+
+
+def sample(seconds: float, interval: float = SAMPLE_INTERVAL) -> collections.Counter:
+    """
+    Samples the stacks of all other threads of the process.
+
+    Args:
+        seconds (float): How long to sample.
+        interval (float): Seconds between samples.
+
+    Returns:
+        Counter: Number of samples per stack; a stack is the thread name
+        followed by its frames, outermost first, joined with ``;``.
+    """
+    own = threading.get_ident()
+    names = {thread.ident: thread.name for thread in threading.enumerate()}
+    stacks = collections.Counter()
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own:
+                continue
+            frames = []
+            while frame is not None:
+                frames.append(_frame_name(frame))
+                frame = frame.f_back
+            frames.append(names.get(thread_id, f"thread-{thread_id}"))
+            stacks[";".join(reversed(frames))] += 1
+        time.sleep(interval)
+    return stacks
+
+
+def collapse(stacks: collections.Counter) -> str:
+    """
+    Formats sampled stacks as collapsed-stack lines, ``<stack> <count>``.
+    """
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+@router.get("/sample", response_class=fastapi.responses.PlainTextResponse)
+async def sample_stacks(
+    seconds: float = fastapi.Query(10, gt=0, le=MAX_SAMPLE_SECONDS),
+    user = fastapi.Depends(require_admin)
+) -> str:
+    """
+    Samples the worker for a while and returns collapsed stacks.
+
+    Args:
+        seconds (float): Sampling duration.
+        user: The admin asking (depends on authentication).
+
+    Returns:
+        str: One ``<stack> <count>`` line per distinct stack.
+
+    Raises:
+        HTTPException: If a sampling run is already in progress (409 Conflict).
+    """
+    if not _sampling.acquire(blocking=False):
+        raise fastapi.HTTPException(fastapi.status.HTTP_409_CONFLICT, detail="Already sampling")
+    try:
+        stacks = await asyncio.to_thread(sample, seconds)
+    finally:
+        _sampling.release()
+    return collapse(stacks)
+
+
+def _admin_token(scope) -> bool:
+    header = next((value.decode("latin-1") for key, value in scope["headers"] if key == b"authorization"), "")
+    scheme, _, token = header.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return False
+
+    db = database.DBSession()
+    try:
+        return is_admin(auth_service.get_user(token=token, db=db))
+    except auth.exceptions.AuthException:
+        return False
+    finally:
+        db.close()
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware running requests that carry ``X-Profile`` under cProfile.
+
+    Requests without the header are passed straight through. Profiled
+    requests run one at a time.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        sort = next((value.decode("latin-1") for key, value in scope["headers"] if key == PROFILE_HEADER), None)
+        if sort is None:
+            await self.app(scope, receive, send)
+            return
+
+        # The token check queries the database, which must not block the loop.
+        if not await asyncio.to_thread(_admin_token, scope):
+            response = fastapi.responses.JSONResponse(
+                {"detail": "Profiling is for admins only"}, status_code=fastapi.status.HTTP_403_FORBIDDEN
+            )
+            await response(scope, receive, send)
+            return
+
+        status = None
+
+        async def discard(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+
+        async with _profiling:
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                await self.app(scope, receive, discard)
+            finally:
+                profiler.disable()
+
+        stats = io.StringIO()
+        sort = sort if sort in SORT_KEYS else SORT_KEYS[0]
+        pstats.Stats(profiler, stream=stats).sort_stats(sort).print_stats(STATS_LIMIT)
+        response = fastapi.responses.PlainTextResponse(
+            stats.getvalue(), headers={"X-Profiled-Status": str(status)}
+        )
+        await response(scope, receive, send)
@@ -0,0 +1,204 @@
+import datetime
+import logging
+import os
+import uuid
+import sqlalchemy
+import sqlalchemy.dialects.sqlite
+import database
+import auth.models
+import contacts.schema as schema
+import jobs.models
+import services.email_service as email_service
+
+VERIFICATION_EMAILS_ENABLED = os.environ.get('VERIFICATION_EMAILS_ENABLED', '') == '1'
+PURGE_THRESHOLD = int(os.environ.get('ACCOUNT_PURGE_THRESHOLD', 10_000))
+PURGE_CHUNK_SIZE = int(os.environ.get('ACCOUNT_PURGE_CHUNK_SIZE', 5_000))
+
+logger = logging.getLogger(__name__)
+
+_users = auth.models.User.__table__
+# Uniqueness is left to the username index: no lookup before the insert,
+# and a concurrent signup with the same name inserts nothing.
+CREATE_USER = (
+    sqlalchemy.dialects.sqlite.insert(_users)
+    .values(username=sqlalchemy.bindparam("username"), hash_password=sqlalchemy.bindparam("hash_password"))
+    .on_conflict_do_nothing(index_elements=[_users.c.username])
+    .returning(_users.c.id)
+)
+
+
+def create_user(db, username: str, hashed_password: str) -> int | None:
+    """
+    Inserts a new user and commits.
+
+    Args:
+        db (Session): The database session.
+        username (str): The requested username.
+        hashed_password (str): The password hash.
+
+    Returns:
+        int | None: The new user's id, or None if the username is taken.
+    """
+    user_id = db.execute(CREATE_USER, {"username": username, "hash_password": hashed_password}).scalar()
+    db.commit()
+    if user_id is not None:
+        database.mark_write(username)
+    return user_id
+
+
+def start_verification(user_id: int, username: str) -> str:
+    """
+    Gives a new user a verification token and emails them the link.
+
+    Runs after the signup response. The email is only sent when
+    ``VERIFICATION_EMAILS_ENABLED=1``; a failed send is logged and the
+    token stays valid.
+
+    Args:
+        user_id (int): The new user.
+        username (str): Their username, which is their email address.
+
+    Returns:
+        str: The verification token.
+    """
+    token = str(uuid.uuid4())
+    with database.engine.begin() as connection:
+        connection.execute(
+            sqlalchemy.update(_users).where(_users.c.id == user_id).values(verification_token=token)
+        )
+
+    if VERIFICATION_EMAILS_ENABLED:
+        try:
+            email_service.send_verification_email(username, token)
+        except Exception:
+            logger.exception("verification email to user %d failed", user_id)
+    return token
+
+
+def _contacts_engine(user_id: int) -> sqlalchemy.Engine:
+    if database.shard_map is not None:
+        return database.shard_map.engine_for(user_id)
+    return database.engine
+
+
+def _has_more_contacts_than(db, user_id: int, limit: int) -> bool:
+    bounded = (
+        sqlalchemy.select(schema.Contacts.id)
+        .where(schema.Contacts.user_id == user_id)
+        .limit(limit + 1)
+        .subquery()
+    )
+    return db.execute(sqlalchemy.select(sqlalchemy.func.count()).select_from(bounded)).scalar() > limit
+
+
+def delete_account(db, user: auth.models.User) -> bool:
+    """
+    Deletes a user and everything they own.
+
+    Small accounts are removed with a single ``DELETE FROM users``; the
+    database cascades to contacts and the other per-user tables. Accounts
+    with more than ``PURGE_THRESHOLD`` contacts, or with contacts on a shard,
+    are disabled at once and left for ``purge_account`` to remove in chunks,
+    so one huge delete does not hold the write lock.
+
+    Args:
+        db (Session): The database session.
+        user (auth.models.User): The user to delete.
+
+    Returns:
+        bool: True if the purge still has to run, False if everything is gone.
+    """
+    user_id = user.id
+
+    if database.shard_map is None and not _has_more_contacts_than(db, user_id, PURGE_THRESHOLD):
+        db.execute(sqlalchemy.delete(auth.models.User).where(auth.models.User.id == user_id))
+        db.commit()
+        return False
+
+    user.username = f"deleted:{uuid.uuid4().hex[:12]}"
+    user.refresh_token = None
+    user.verification_token = None
+    user.deleted_at = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+    db.commit()
+    return True
+
+
+def purge_account(user_id: int, chunk_size: int | None = None) -> int:
+    """
+    Removes a disabled account's contacts in small transactions, then the user.
+
+    Safe to run again after an interruption.
+
+    Args:
+        user_id (int): The deleted user.
+        chunk_size (int | None): Contacts deleted per transaction, defaults
+            to ``PURGE_CHUNK_SIZE``.
+
+    Returns:
+        int: Number of contacts deleted.
+    """
+    chunk_size = chunk_size or PURGE_CHUNK_SIZE
+    contacts = schema.Contacts.__table__
+    chunk = (
+        sqlalchemy.select(contacts.c.id)
+        .where(contacts.c.user_id == user_id)
+        .limit(chunk_size)
+        .scalar_subquery()
+    )
+
+    deleted = 0
+    engine = _contacts_engine(user_id)
+    while True:
+        with engine.begin() as connection:
+            removed = connection.execute(
+                sqlalchemy.delete(contacts).where(contacts.c.id.in_(chunk))
+            ).rowcount
+        deleted += removed
+        if removed < chunk_size:
+            break
+
+    with database.engine.begin() as connection:
+        connection.execute(
+            sqlalchemy.delete(auth.models.User).where(auth.models.User.id == user_id)
+        )
+    return deleted
+
+
+def queue_interrupted_purges() -> int:
+    """
+    Queues a purge job for every deleted account without an unfinished one.
+
+    Purges normally run as the job queued by the delete route, which the job
+    scheduler retries when its worker dies; this catches accounts whose job
+    failed or was lost, without racing a purge that is still running.
+
+    Returns:
+        int: Number of purge jobs queued.
+    """
+    if database.DBSession is None:
+        database.connect()
+
+    users = auth.models.User.__table__
+    job_table = jobs.models.Job.__table__
+    pending = (
+        sqlalchemy.select(job_table.c.id)
+        .where(
+            job_table.c.user_id == users.c.id,
+            job_table.c.kind == "purge",
+            job_table.c.status.in_([jobs.models.QUEUED, jobs.models.RUNNING]),
+        )
+    )
+    orphans = (
+        sqlalchemy.select(
+            users.c.id, sqlalchemy.literal("purge"), sqlalchemy.literal(jobs.models.QUEUED),
+            sqlalchemy.literal(0), sqlalchemy.literal(0),
+            sqlalchemy.literal(datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)),
+        )
+        .where(users.c.deleted_at.is_not(None), ~pending.exists())
+    )
+    with database.engine.begin() as connection:
+        return connection.execute(
+            sqlalchemy.insert(job_table).from_select(
+                ["user_id", "kind", "status", "progress", "attempts", "created_at"], orphans
+            )
+        ).rowcount
@@ -0,0 +1,290 @@
+"""
+Archival of stale contacts.
+
+Contacts not written for ``ARCHIVE_AFTER_MONTHS`` months are moved out of
+the ``contacts`` table into ``contact_archive`` on the primary database:
+one row per user and archiver pass holding up to ``ARCHIVE_BLOCK_SIZE``
+contacts as compressed JSON, with the block's id range for lookups. Blocks
+are compressed with zstd when the ``zstandard`` package is installed and
+with zlib otherwise; each block records its codec.
+
+Archived contacts keep their ids and still count in the contact stats:
+archiving and restoring use Core statements, which leave the stats alone,
+and ``contacts.stats.rebuild`` counts the archived blocks too.
+``restore`` moves a contact back when it is accessed by id, which makes
+``GET /api/contacts/find/{id}`` write to the primary although it is a read
+route; list and search routes only see contacts in the hot table.
+
+The archiver runs in the app when ``CONTACT_ARCHIVE_ENABLED=1``, or once
+from ``src``::
+
+    python -m services.archive_service
+"""
+import asyncio
+import datetime
+import json
+import logging
+import os
+import zlib
+import sqlalchemy
+import sqlalchemy.dialects.sqlite
+import sqlalchemy.orm as orm
+import database
+import sharding
+import contacts.normalize as normalize
+import contacts.records as records
+import contacts.schema as schema
+import services.lease_service as lease_service
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+CONTACT_ARCHIVE_ENABLED = os.environ.get('CONTACT_ARCHIVE_ENABLED', '') == '1'
+ARCHIVE_AFTER_MONTHS = int(os.environ.get('ARCHIVE_AFTER_MONTHS', 12))
+ARCHIVE_BLOCK_SIZE = int(os.environ.get('ARCHIVE_BLOCK_SIZE', 1000))
+ARCHIVE_ZSTD_LEVEL = int(os.environ.get('ARCHIVE_ZSTD_LEVEL', 10))
+ARCHIVE_INTERVAL_SECONDS = float(os.environ.get('ARCHIVE_INTERVAL_SECONDS', 86400))
+LEASE_NAME = "contact-archiver"
+LEASE_SECONDS = 600
+SCAN_CHUNK_SIZE = 5000
+ARCHIVED_COLUMNS = [
+    column.name for column in schema.Contacts.__table__.columns
+    if column.name not in ("user_id", "updated_at")
+]
+
+logger = logging.getLogger(__name__)
+
+
+class ContactArchive(database.Base):
+    __tablename__ = "contact_archive"
+
+    id: orm.Mapped[int] = orm.mapped_column(primary_key=True)
+    user_id: orm.Mapped[int] = orm.mapped_column(
+        sqlalchemy.ForeignKey("users.id", ondelete="CASCADE"), nullable=False
+    )
+    min_id: orm.Mapped[int] = orm.mapped_column(nullable=False)
+    max_id: orm.Mapped[int] = orm.mapped_column(nullable=False)
+    count: orm.Mapped[int] = orm.mapped_column(nullable=False)
+    codec: orm.Mapped[str] = orm.mapped_column(sqlalchemy.String(8), nullable=False)
+    data: orm.Mapped[bytes] = orm.mapped_column(sqlalchemy.LargeBinary, nullable=False)
+    archived_at: orm.Mapped[datetime.datetime] = orm.mapped_column(nullable=False)
+
+    __table_args__ = (
+        sqlalchemy.Index("ix_contact_archive_user_range", "user_id", "min_id", "max_id"),
+    )
+
+
+def compress(contacts: list[dict]) -> tuple[str, bytes]:
+    """
+    Serializes contacts to JSON and compresses them.
+
+    Args:
+        contacts (list[dict]): Contact rows with ``ARCHIVED_COLUMNS``.
+
+    Returns:
+        tuple[str, bytes]: The codec used and the compressed block.
+    """
+    payload = json.dumps(contacts, default=str, separators=(",", ":")).encode()
+    if zstandard is not None:
+        return "zstd", zstandard.ZstdCompressor(level=ARCHIVE_ZSTD_LEVEL).compress(payload)
+    return "zlib", zlib.compress(payload, 9)
+
+
+def decompress(codec: str, data: bytes) -> list[dict]:
+    """
+    Reads back a block written by ``compress``.
+
+    Raises:
+        RuntimeError: If the block is zstd and zstandard is not installed.
+    """
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("reading zstd archive blocks needs the zstandard package")
+        payload = zstandard.ZstdDecompressor().decompress(data)
+    else:
+        payload = zlib.decompress(data)
+
+    contacts = json.loads(payload)
+    for contact in contacts:
+        contact["date_of_birth"] = datetime.date.fromisoformat(contact["date_of_birth"])
+    return contacts
+
+
+def _block(user_id: int, contacts: list[dict], now: datetime.datetime) -> dict:
+    codec, data = compress(contacts)
+    ids = [contact["id"] for contact in contacts]
+    return {
+        "user_id": user_id, "min_id": min(ids), "max_id": max(ids), "count": len(contacts),
+        "codec": codec, "data": data, "archived_at": now,
+    }
+
+
+def _contact_engines() -> list[sqlalchemy.Engine]:
+    if database.shard_map is not None:
+        return list(dict.fromkeys(database.shard_map.engines))
+    return [database.engine]
+
+
+def _archive_chunk(engine: sqlalchemy.Engine, stale: list[sqlalchemy.Row], now: datetime.datetime) -> None:
+    by_user = {}
+    for row in stale:
+        by_user.setdefault(row.user_id, []).append({column: getattr(row, column) for column in ARCHIVED_COLUMNS})
+
+    blocks = [
+        _block(user_id, contacts[start:start + ARCHIVE_BLOCK_SIZE], now)
+        for user_id, contacts in by_user.items()
+        for start in range(0, len(contacts), ARCHIVE_BLOCK_SIZE)
+    ]
+    contacts = schema.Contacts.__table__
+    delete = sqlalchemy.delete(contacts).where(contacts.c.id.in_([row.id for row in stale]))
+
+    # The block is written before the hot rows go away; if the two are on
+    # different databases and the delete is lost, restore skips the copy.
+    with database.engine.begin() as connection:
+        connection.execute(sqlalchemy.insert(ContactArchive), blocks)
+        if engine is database.engine:
+            connection.execute(delete)
+    if engine is not database.engine:
+        with engine.begin() as connection:
+            connection.execute(delete)
+
+
+def archive_stale(now: datetime.datetime | None = None, months: int = ARCHIVE_AFTER_MONTHS) -> int:
+    """
+    Moves contacts not written for ``months`` months to the archive.
+
+    The contacts tables are walked in primary key order, so no index on
+    ``updated_at`` is needed. The archiver lease is renewed before every
+    chunk; a worker that lost it stops.
+
+    Args:
+        now (datetime | None): Defaults to the current UTC time.
+        months (int): Age in 30-day months after which a contact is archived.
+
+    Returns:
+        int: Number of contacts archived.
+    """
+    now = now or lease_service.utcnow()
+    cutoff = now - datetime.timedelta(days=30 * months)
+    contacts = schema.Contacts.__table__
+    columns = [contacts.c.user_id, *(contacts.c[column] for column in ARCHIVED_COLUMNS), contacts.c.updated_at]
+
+    archived = 0
+    for engine in _contact_engines():
+        last_id = 0
+        while True:
+            if not lease_service.acquire(database.engine, LEASE_NAME, LEASE_SECONDS):
+                return archived
+            with engine.connect() as connection:
+                chunk = connection.execute(
+                    sqlalchemy.select(*columns)
+                    .where(contacts.c.id > last_id)
+                    .order_by(contacts.c.id)
+                    .limit(SCAN_CHUNK_SIZE)
+                ).all()
+            if not chunk:
+                break
+            last_id = chunk[-1].id
+
+            stale = [row for row in chunk if row.updated_at is not None and row.updated_at < cutoff]
+            if stale:
+                _archive_chunk(engine, stale, now)
+                archived += len(stale)
+    return archived
+
+
+def restore(db, user_id: int, contact_id: int) -> records.ContactRecord | None:
+    """
+    Moves an archived contact back to the contacts table and commits.
+
+    Args:
+        db (Session): The database session of the request.
+        user_id (int): The owner of the contact.
+        contact_id (int): The contact looked up.
+
+    Returns:
+        ContactRecord | None: The restored contact, or None if it is not archived.
+    """
+    # A replica may still hold blocks that were already rewritten.
+    database.use_primary(db)
+    archive = ContactArchive.__table__
+    blocks = db.execute(
+        sqlalchemy.select(archive.c.id, archive.c.count, archive.c.codec, archive.c.data)
+        .where(
+            archive.c.user_id == user_id,
+            archive.c.min_id <= contact_id,
+            archive.c.max_id >= contact_id,
+        )
+    ).all()
+
+    for block in blocks:
+        contacts = decompress(block.codec, block.data)
+        found = [contact for contact in contacts if contact["id"] == contact_id]
+        if not found:
+            continue
+
+        remaining = [contact for contact in contacts if contact["id"] != contact_id]
+        if remaining:
+            changed = _block(user_id, remaining, lease_service.utcnow())
+            del changed["user_id"], changed["archived_at"]
+            update = sqlalchemy.update(archive).values(**changed)
+        else:
+            update = sqlalchemy.delete(archive)
+        # A concurrent restore from the same block changed its count first.
+        if db.execute(update.where(archive.c.id == block.id, archive.c.count == block.count)).rowcount != 1:
+            db.rollback()
+            return restore(db, user_id, contact_id)
+
+        contact = found[0]
+        # Blocks archived before phone keys existed.
+        contact.setdefault("phone_key", normalize.phone_key(contact["phone_number"]))
+        db.execute(
+            sqlalchemy.dialects.sqlite.insert(schema.Contacts.__table__)
+            .values(**contact, user_id=user_id, updated_at=lease_service.utcnow())
+            .on_conflict_do_nothing()
+        )
+        db.commit()
+        database.mark_write(db.info.get("sticky_key"))
+        return records.ContactRecord(**{field: contact[field] for field in records.ContactRecord._fields})
+    return None
+
+
+def run_once(now: datetime.datetime | None = None) -> int | None:
+    """
+    Archives stale contacts, if this worker holds the lease.
+
+    Returns:
+        int | None: Number of contacts archived, or None when another
+        worker holds the lease.
+    """
+    if database.DBSession is None:
+        database.connect()
+
+    if not lease_service.acquire(database.engine, LEASE_NAME, LEASE_SECONDS):
+        return None
+    try:
+        return archive_stale(now)
+    finally:
+        lease_service.release(database.engine, LEASE_NAME)
+
+
+async def run_forever(interval: float = ARCHIVE_INTERVAL_SECONDS) -> None:
+    """
+    Runs ``run_once`` in a worker thread every ``interval`` seconds.
+    """
+    while True:
+        try:
+            archived = await asyncio.to_thread(run_once)
+            if archived is not None:
+                logger.info("contact archiver: %d contacts archived", archived)
+        except Exception:
+            logger.exception("contact archiver run failed")
+        await asyncio.sleep(interval)
+
+
+if __name__ == "__main__":
+    if sharding.CONTACTS_SHARD_URLS:
+        sharding.connect()
+    print(f"archived {run_once()} contacts")
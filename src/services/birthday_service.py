@@ -0,0 +1,247 @@
+import asyncio
+import calendar
+import datetime
+import logging
+import os
+import sqlalchemy
+import sqlalchemy.dialects.sqlite
+import sqlalchemy.orm as orm
+import database
+import auth.models
+import contacts.schema as schema
+import services.email_service as email_service
+import services.lease_service as lease_service
+
+BIRTHDAY_REMINDERS_ENABLED = os.environ.get('BIRTHDAY_REMINDERS_ENABLED', '') == '1'
+REMINDER_DAYS_AHEAD = int(os.environ.get('REMINDER_DAYS_AHEAD', 1))
+RETRY_SECONDS = float(os.environ.get('BIRTHDAY_RETRY_SECONDS', 300))
+LEASE_NAME = "birthday-reminders"
+LEASE_SECONDS = 600
+INSERT_CHUNK_SIZE = 1000
+KEEP_SENT_DAYS = 30
+
+logger = logging.getLogger(__name__)
+
+
+class BirthdayReminder(database.Base):
+    __tablename__ = "birthday_reminders"
+
+    id: orm.Mapped[int] = orm.mapped_column(primary_key=True)
+    contact_id: orm.Mapped[int] = orm.mapped_column(nullable=False)
+    user_id: orm.Mapped[int] = orm.mapped_column(
+        sqlalchemy.ForeignKey("users.id", ondelete="CASCADE"), nullable=False
+    )
+    contact_name: orm.Mapped[str] = orm.mapped_column(nullable=False)
+    birthday: orm.Mapped[datetime.date] = orm.mapped_column(nullable=False)
+    sent_at: orm.Mapped[datetime.datetime | None] = orm.mapped_column(nullable=True, index=True)
+
+    __table_args__ = (
+        sqlalchemy.UniqueConstraint("contact_id", "birthday"),
+    )
+
+
+class BirthdayBatch(database.Base):
+    __tablename__ = "birthday_batches"
+
+    day: orm.Mapped[datetime.date] = orm.mapped_column(primary_key=True)
+    enqueued_at: orm.Mapped[datetime.datetime] = orm.mapped_column(nullable=False)
+
+
+def upcoming_keys(today: datetime.date, days: int = REMINDER_DAYS_AHEAD) -> dict[str, datetime.date]:
+    """
+    Maps ``birthday_key`` values to the dates they fall on in the next days.
+
+    People born on February 29 are reminded on February 28 in common years.
+
+    Args:
+        today (date): First day of the window.
+        days (int): Number of days after ``today`` to include.
+
+    Returns:
+        dict[str, date]: ``"MM-DD"`` keys and their occurrence dates.
+    """
+    keys = {}
+    for offset in range(days + 1):
+        day = today + datetime.timedelta(days=offset)
+        keys[day.strftime("%m-%d")] = day
+        if day.month == 2 and day.day == 28 and not calendar.isleap(day.year):
+            keys["02-29"] = day
+    return keys
+
+
+def _contact_engines() -> list[sqlalchemy.Engine]:
+    if database.shard_map is not None:
+        return list(dict.fromkeys(database.shard_map.engines))
+    return [database.engine]
+
+
+def enqueue(today: datetime.date) -> int:
+    """
+    Records a pending reminder for every contact with a birthday in the window.
+
+    Contacts of all users are found with one query on the indexed
+    ``birthday_key`` per contacts database. Reminders are unique per contact
+    and birthday, so running this again, after a restart or on another
+    worker, adds nothing twice. The day is recorded in ``birthday_batches``
+    together with its reminders.
+
+    Args:
+        today (date): The day the reminders are computed for.
+
+    Returns:
+        int: Number of new reminders.
+    """
+    keys = upcoming_keys(today)
+    contacts = schema.Contacts.__table__
+    query = (
+        sqlalchemy.select(contacts.c.id, contacts.c.user_id, contacts.c.name, contacts.c.surename, contacts.c.birthday_key)
+        .where(contacts.c.birthday_key.in_(list(keys)))
+    )
+
+    rows = []
+    for engine in _contact_engines():
+        with engine.connect() as connection:
+            rows += [
+                {
+                    "contact_id": row.id,
+                    "user_id": row.user_id,
+                    "contact_name": f"{row.name} {row.surename}",
+                    "birthday": keys[row.birthday_key],
+                }
+                for row in connection.execute(query)
+            ]
+
+    created = 0
+    with database.engine.begin() as connection:
+        for start in range(0, len(rows), INSERT_CHUNK_SIZE):
+            result = connection.execute(
+                sqlalchemy.dialects.sqlite.insert(BirthdayReminder).on_conflict_do_nothing(),
+                rows[start:start + INSERT_CHUNK_SIZE]
+            )
+            created += max(result.rowcount, 0)
+        connection.execute(
+            sqlalchemy.dialects.sqlite.insert(BirthdayBatch)
+            .values(day=today, enqueued_at=lease_service.utcnow())
+            .on_conflict_do_nothing()
+        )
+    return created
+
+
+def is_enqueued(today: datetime.date) -> bool:
+    """
+    Tells whether the reminders of a day were already enqueued.
+    """
+    with database.engine.connect() as connection:
+        return connection.execute(
+            sqlalchemy.select(BirthdayBatch.day).where(BirthdayBatch.day == today)
+        ).first() is not None
+
+
+def drain(sender: email_service.BatchSender, today: datetime.date) -> int:
+    """
+    Sends pending reminders batch by batch and marks them as sent.
+
+    Delivery is at least once: a batch interrupted by a crash is sent again
+    by the next run. The lease is renewed before every batch; a worker that
+    lost it stops.
+
+    Args:
+        sender (BatchSender): The rate-limited email sender.
+        today (date): Reminders for birthdays before this day are dropped.
+
+    Returns:
+        int: Number of emails sent.
+    """
+    sent = 0
+    while lease_service.acquire(database.engine, LEASE_NAME, LEASE_SECONDS):
+        with database.engine.connect() as connection:
+            batch = connection.execute(
+                sqlalchemy.select(
+                    BirthdayReminder.id, BirthdayReminder.contact_name,
+                    BirthdayReminder.birthday, auth.models.User.username
+                )
+                .join(auth.models.User, auth.models.User.id == BirthdayReminder.user_id)
+                .where(BirthdayReminder.sent_at.is_(None), BirthdayReminder.birthday >= today)
+                .order_by(BirthdayReminder.id)
+                .limit(sender.batch_size)
+            ).all()
+        if not batch:
+            break
+
+        sent += sender.send([
+            email_service.build_message(
+                row.username,
+                f"Upcoming birthday: {row.contact_name}",
+                f"{row.contact_name} has a birthday on {row.birthday:%B %d}."
+            )
+            for row in batch
+        ])
+
+        with database.engine.begin() as connection:
+            connection.execute(
+                sqlalchemy.update(BirthdayReminder)
+                .where(BirthdayReminder.id.in_([row.id for row in batch]))
+                .values(sent_at=lease_service.utcnow())
+            )
+    return sent
+
+
+def run_once(today: datetime.date | None = None, sender: email_service.BatchSender | None = None) -> tuple[int, int] | None:
+    """
+    Enqueues today's reminders and sends them, if this worker holds the lease.
+
+    The contacts are scanned once per day; later runs on the same day only
+    send what is still pending.
+
+    Args:
+        today (date | None): Defaults to the current date.
+        sender (BatchSender | None): Defaults to a ``BatchSender`` with the
+            configured rate.
+
+    Returns:
+        tuple[int, int] | None: New reminders and emails sent, or None when
+        another worker holds the lease.
+    """
+    if database.DBSession is None:
+        database.connect()
+
+    if not lease_service.acquire(database.engine, LEASE_NAME, LEASE_SECONDS):
+        return None
+
+    today = today or datetime.date.today()
+    try:
+        created = 0 if is_enqueued(today) else enqueue(today)
+        sent = drain(sender or email_service.BatchSender(), today)
+
+        with database.engine.begin() as connection:
+            connection.execute(
+                sqlalchemy.delete(BirthdayReminder).where(
+                    BirthdayReminder.birthday < today - datetime.timedelta(days=KEEP_SENT_DAYS)
+                )
+            )
+    finally:
+        lease_service.release(database.engine, LEASE_NAME)
+    return created, sent
+
+
+def _seconds_until_tomorrow(now: datetime.datetime) -> float:
+    tomorrow = datetime.datetime.combine(now.date() + datetime.timedelta(days=1), datetime.time())
+    return (tomorrow - now).total_seconds()
+
+
+async def run_forever(retry: float = RETRY_SECONDS) -> None:
+    """
+    Runs ``run_once`` in a worker thread now and then every day after midnight.
+
+    A failed run is retried after ``retry`` seconds.
+    """
+    while True:
+        try:
+            result = await asyncio.to_thread(run_once)
+            if result is not None:
+                logger.info("birthday reminders: %d enqueued, %d sent", *result)
+            delay = _seconds_until_tomorrow(datetime.datetime.now())
+        except Exception:
+            logger.exception("birthday reminder run failed")
+            delay = retry
+        await asyncio.sleep(delay)
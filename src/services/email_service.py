@@ -1,10 +1,45 @@
 import smtplib
+import time
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from dotenv import load_dotenv
 import os
 load_dotenv()
 
+SMTP_HOST = "smtp.meta.ua"
+SMTP_PORT = 465
+EMAIL_RATE_PER_SECOND = float(os.environ.get('EMAIL_RATE_PER_SECOND', 5))
+EMAIL_BATCH_SIZE = int(os.environ.get('EMAIL_BATCH_SIZE', 50))
+
+
+def _connect() -> smtplib.SMTP:
+    server = smtplib.SMTP(SMTP_HOST, SMTP_PORT)
+    server.starttls()
+    server.login(os.environ.get('EMAIL'), os.environ.get('EMAIL_PASSWORD'))
+    return server
+
+
+def build_message(email: str, subject: str, body: str) -> MIMEMultipart:
+    """
+    Builds a plain-text email from the configured sender.
+
+    Args:
+        email (str): The recipient's email address.
+        subject (str): The subject line.
+        body (str): The plain-text body.
+
+    Returns:
+        MIMEMultipart: The message ready to be sent.
+    """
+    message = MIMEMultipart()
+    message["From"] = os.environ.get('EMAIL')
+    message["To"] = email
+    message["Subject"] = subject
+
+    message.attach(MIMEText(body, "plain"))
+    return message
+
+
 def send_verification_email(email: str, token: str):
     """
     Sends a verification email to the specified user.
@@ -20,21 +55,58 @@ def send_verification_email(email: str, token: str):
     Raises:
         Exception: If there is an issue with the email sending process.
     """
-    sender_email = os.environ.get('EMAIL')
-    receiver_email = email
-    password = os.environ.get('EMAIL_PASSWORD')
-
     subject = "Verify your email address"
     body = f"Please verify your email by clicking the following link: http://localhost:8000/auth/verify/{token}"
 
-    message = MIMEMultipart()
-    message["From"] = sender_email
-    message["To"] = receiver_email
-    message["Subject"] = subject
+    with _connect() as server:
+        server.send_message(build_message(email, subject, body))
 
-    message.attach(MIMEText(body, "plain"))
 
-    with smtplib.SMTP("smtp.meta.ua", 465) as server:
-        server.starttls()
-        server.login(sender_email, password)
-        server.send_message(message)
+class BatchSender:
+    """
+    Sends many emails over a few SMTP connections without exceeding a rate.
+
+    One connection is opened per ``batch_size`` messages instead of one per
+    message, and sends are spaced to at most ``rate_per_second``.
+    """
+
+    def __init__(
+        self,
+        rate_per_second: float = EMAIL_RATE_PER_SECOND,
+        batch_size: int = EMAIL_BATCH_SIZE,
+        connect=_connect
+    ):
+        self.interval = 1 / rate_per_second
+        self.batch_size = batch_size
+        self._connect = connect
+        self._next_send = 0.0
+
+    def _wait(self) -> None:
+        now = time.monotonic()
+        if self._next_send > now:
+            time.sleep(self._next_send - now)
+            now = self._next_send
+        self._next_send = now + self.interval
+
+    def send(self, messages: list[MIMEMultipart]) -> int:
+        """
+        Sends the messages in batches.
+
+        Args:
+            messages (list[MIMEMultipart]): Messages built with ``build_message``.
+
+        Returns:
+            int: Number of messages sent.
+
+        Raises:
+            smtplib.SMTPException: If the server rejects a message; messages
+                before it have been sent.
+        """
+        sent = 0
+        for start in range(0, len(messages), self.batch_size):
+            with self._connect() as server:
+                for message in messages[start:start + self.batch_size]:
+                    self._wait()
+                    server.send_message(message)
+                    sent += 1
+        return sent
@@ -0,0 +1,165 @@
+import asyncio
+import collections
+import json
+import typing
+
+
+class Subscription:
+    """
+    A single client connection listening for a user's contact changes.
+
+    Pending events are keyed by contact id, so several changes to the same
+    contact are coalesced into the most recent one. When more than
+    ``max_pending`` distinct contacts are waiting, the queue is dropped and
+    the client receives a single ``resync`` event telling it to refetch.
+    """
+    __slots__ = ("user_id", "max_pending", "_pending", "_overflowed", "_ready", "_loop")
+
+    def __init__(self, user_id: int, max_pending: int = 64):
+        self.user_id = user_id
+        self.max_pending = max_pending
+        self._pending = collections.OrderedDict()
+        self._overflowed = False
+        self._ready = asyncio.Event()
+        self._loop = asyncio.get_running_loop()
+
+    def push(self, event: dict[str, typing.Any]) -> None:
+        """
+        Queues an event for this connection, applying the coalesce/drop policy.
+
+        Args:
+            event (dict[str, typing.Any]): The event; must contain ``contact_id``.
+        """
+        if not self._overflowed:
+            key = event.get("contact_id")
+            if key in self._pending:
+                self._pending.move_to_end(key)
+                self._pending[key] = event
+            elif len(self._pending) >= self.max_pending:
+                self._pending.clear()
+                self._overflowed = True
+            else:
+                self._pending[key] = event
+
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+
+        if running is self._loop:
+            self._ready.set()
+        else:
+            self._loop.call_soon_threadsafe(self._ready.set)
+
+    async def get(self, timeout: float | None = None) -> list[dict[str, typing.Any]]:
+        """
+        Waits for pending events and returns them all at once.
+
+        Args:
+            timeout (float | None): Seconds to wait before returning an empty list.
+
+        Returns:
+            list[dict[str, typing.Any]]: The pending events, oldest first.
+        """
+        if not self._pending and not self._overflowed:
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return []
+
+        self._ready.clear()
+
+        if self._overflowed:
+            self._overflowed = False
+            self._pending.clear()
+            return [{"type": "resync"}]
+
+        events = list(self._pending.values())
+        self._pending.clear()
+        return events
+
+
+class EventBus:
+    """
+    In-process pub/sub bus fanning contact changes out to every open
+    connection of the owning user.
+    """
+
+    def __init__(self, max_pending: int = 64):
+        self.max_pending = max_pending
+        self._subscribers: dict[int, set[Subscription]] = {}
+
+    def subscribe(self, user_id: int) -> Subscription:
+        """
+        Opens a new subscription for the given user.
+
+        Args:
+            user_id (int): The user whose changes should be delivered.
+
+        Returns:
+            Subscription: The subscription; release it with ``unsubscribe``.
+        """
+        subscription = Subscription(user_id, self.max_pending)
+        self._subscribers.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """
+        Closes a subscription.
+
+        Args:
+            subscription (Subscription): The subscription returned by ``subscribe``.
+        """
+        subscriptions = self._subscribers.get(subscription.user_id)
+        if subscriptions is None:
+            return
+        subscriptions.discard(subscription)
+        if not subscriptions:
+            del self._subscribers[subscription.user_id]
+
+    def publish(self, user_id: int, event_type: str, contact_id: int) -> None:
+        """
+        Sends a contact change to every connection of the user.
+
+        Args:
+            user_id (int): Owner of the changed contact.
+            event_type (str): One of ``created``, ``updated`` or ``deleted``.
+            contact_id (int): ID of the changed contact.
+        """
+        subscriptions = self._subscribers.get(user_id)
+        if not subscriptions:
+            return
+
+        event = {"type": event_type, "contact_id": contact_id}
+        for subscription in tuple(subscriptions):
+            subscription.push(event)
+
+    def connections(self, user_id: int | None = None) -> int:
+        """
+        Counts open subscriptions, for one user or in total.
+
+        Args:
+            user_id (int | None): Restrict the count to this user.
+
+        Returns:
+            int: Number of open subscriptions.
+        """
+        if user_id is not None:
+            return len(self._subscribers.get(user_id, ()))
+        return sum(len(subscriptions) for subscriptions in self._subscribers.values())
+
+
+def format_sse(event: dict[str, typing.Any]) -> str:
+    """
+    Serializes an event as a Server-Sent Events frame.
+
+    Args:
+        event (dict[str, typing.Any]): The event to send.
+
+    Returns:
+        str: The ``event:``/``data:`` frame terminated by a blank line.
+    """
+    return f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+
+bus = EventBus()
@@ -0,0 +1,78 @@
+import datetime
+import os
+import socket
+import uuid
+import sqlalchemy
+import sqlalchemy.orm as orm
+import database
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class Lease(database.Base):
+    __tablename__ = "leases"
+
+    name: orm.Mapped[str] = orm.mapped_column(sqlalchemy.String(64), primary_key=True)
+    owner: orm.Mapped[str] = orm.mapped_column(sqlalchemy.String(128), nullable=False)
+    expires_at: orm.Mapped[datetime.datetime] = orm.mapped_column(nullable=False)
+
+
+def utcnow() -> datetime.datetime:
+    return datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+
+
+def acquire(engine: sqlalchemy.Engine, name: str, seconds: float, owner: str = WORKER_ID) -> bool:
+    """
+    Takes or renews a named lease shared by all workers using the database.
+
+    The lease is granted when nobody holds it, when it expired or when
+    ``owner`` already holds it; a single conditional UPDATE (or INSERT for
+    a new lease) makes this safe across processes.
+
+    Args:
+        engine (Engine): The primary database engine.
+        name (str): Lease name, e.g. ``"birthday-reminders"``.
+        seconds (float): How long the lease is valid without renewal.
+        owner (str): Identity of the caller.
+
+    Returns:
+        bool: True if the caller now holds the lease.
+    """
+    now = utcnow()
+    expires_at = now + datetime.timedelta(seconds=seconds)
+
+    with engine.begin() as connection:
+        result = connection.execute(
+            sqlalchemy.update(Lease)
+            .where(
+                Lease.name == name,
+                sqlalchemy.or_(Lease.owner == owner, Lease.expires_at < now)
+            )
+            .values(owner=owner, expires_at=expires_at)
+        )
+        if result.rowcount:
+            return True
+
+    try:
+        with engine.begin() as connection:
+            connection.execute(
+                sqlalchemy.insert(Lease).values(name=name, owner=owner, expires_at=expires_at)
+            )
+    except sqlalchemy.exc.IntegrityError:
+        return False
+    return True
+
+
+def release(engine: sqlalchemy.Engine, name: str, owner: str = WORKER_ID) -> None:
+    """
+    Gives up a lease held by ``owner`` so another worker can take it at once.
+
+    Args:
+        engine (Engine): The primary database engine.
+        name (str): Lease name.
+        owner (str): Identity of the holder.
+    """
+    with engine.begin() as connection:
+        connection.execute(
+            sqlalchemy.delete(Lease).where(Lease.name == name, Lease.owner == owner)
+        )
@@ -0,0 +1,400 @@
+"""
+Sharding of the ``contacts`` table by ``user_id``.
+
+Users and every other table stay on the primary database; contacts of a
+user live on exactly one of N shard databases listed in
+``CONTACTS_SHARD_URLS`` (comma separated). A user's shard is the crc32 hash
+of the user id modulo N unless the ``shard_assignments`` table on the
+primary pins it elsewhere. Sessions route contact statements to the shard
+of ``session.info["user_id"]``, which ``Auth`` sets after authentication.
+
+Contact ids come from the ``contact_id_sequence`` table on the primary so
+they stay unique across shards and survive moves. Sessions take them in
+their own primary transaction before flushing new contacts; Core inserts
+into a shard must bring their ids and are refused without them.
+
+Resharding, run from ``src``::
+
+    python -m sharding pin          # pin every user to its current shard
+    # add the new URLs to CONTACTS_SHARD_URLS and restart the workers
+    python -m sharding rebalance    # move pinned users to their hash shard
+    python -m sharding move 42 3    # move one user to shard 3
+
+Moves are online: the user's contact writes are rejected with 503 while
+their rows are copied, reads keep being served from the old shard until
+the copy is complete.
+"""
+import argparse
+import os
+import time
+import zlib
+import fastapi
+import fastapi.responses
+import sqlalchemy
+import sqlalchemy.orm as orm
+import sqlalchemy.sql.util
+import database
+import auth.models
+import contacts.schema as schema
+
+CONTACTS_SHARD_URLS = os.environ.get("CONTACTS_SHARD_URLS")
+SHARD_MAP_TTL_SECONDS = float(os.environ.get("SHARD_MAP_TTL_SECONDS", 5))
+SHARDED_TABLES = {schema.Contacts.__tablename__}
+COPY_CHUNK_SIZE = 1000
+
+
+class ShardingError(Exception):
+    pass
+
+
+class MigrationInProgress(Exception):
+    pass
+
+
+def migration_error_handler(request, exc):
+    return fastapi.responses.JSONResponse(
+        status_code=fastapi.status.HTTP_503_SERVICE_UNAVAILABLE,
+        headers={
+            "Retry-After": str(max(1, int(SHARD_MAP_TTL_SECONDS)))
+        },
+        content={
+            "details": str(exc),
+        }
+    )
+
+
+class ShardAssignment(database.Base):
+    __tablename__ = "shard_assignments"
+
+    user_id: orm.Mapped[int] = orm.mapped_column(
+        sqlalchemy.ForeignKey("users.id", ondelete="CASCADE"), primary_key=True
+    )
+    shard: orm.Mapped[int] = orm.mapped_column(nullable=False)
+    moving: orm.Mapped[bool] = orm.mapped_column(sqlalchemy.Boolean, default=False)
+
+
+class ContactIdSequence(database.Base):
+    __tablename__ = "contact_id_sequence"
+
+    id: orm.Mapped[int] = orm.mapped_column(primary_key=True)
+
+
+class ShardMap:
+    """
+    Maps users to shard engines and routes session statements.
+    """
+
+    def __init__(self, engines: list[sqlalchemy.Engine]):
+        self.engines = engines
+        self._cache: dict[int, tuple[float, int, bool]] = {}
+
+    def hash_shard(self, user_id: int) -> int:
+        """
+        Returns the shard a user belongs to when it is not pinned.
+
+        Args:
+            user_id (int): The user's ID.
+
+        Returns:
+            int: Index into ``engines``.
+        """
+        return zlib.crc32(str(user_id).encode()) % len(self.engines)
+
+    def _assignment(self, user_id: int) -> tuple[int, bool]:
+        now = time.monotonic()
+        cached = self._cache.get(user_id)
+        if cached is not None and cached[0] > now:
+            return cached[1], cached[2]
+
+        with database.engine.connect() as connection:
+            row = connection.execute(
+                sqlalchemy.select(ShardAssignment.shard, ShardAssignment.moving)
+                .where(ShardAssignment.user_id == user_id)
+            ).first()
+
+        shard, moving = (row.shard, row.moving) if row else (self.hash_shard(user_id), False)
+
+        if len(self._cache) > 100_000:
+            self._cache.clear()
+        self._cache[user_id] = (now + SHARD_MAP_TTL_SECONDS, shard, moving)
+        return shard, moving
+
+    def shard_for(self, user_id: int) -> int:
+        """
+        Returns the shard currently holding a user's contacts.
+
+        Args:
+            user_id (int): The user's ID.
+
+        Returns:
+            int: Index into ``engines``.
+        """
+        return self._assignment(user_id)[0]
+
+    def engine_for(self, user_id: int) -> sqlalchemy.Engine:
+        return self.engines[self.shard_for(user_id)]
+
+    def forget(self, user_id: int | None = None) -> None:
+        """
+        Drops cached assignments, for one user or all of them.
+        """
+        if user_id is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(user_id, None)
+
+    def get_bind(self, session: orm.Session, mapper, clause, write: bool):
+        """
+        Picks the shard engine for statements on sharded tables.
+
+        Args:
+            session (Session): The session running the statement.
+            mapper: The ORM mapper of the statement, if any.
+            clause: The statement, if any.
+            write (bool): Whether the statement modifies data.
+
+        Returns:
+            Engine | None: The shard engine, or None for unsharded tables.
+
+        Raises:
+            ShardingError: If the session does not know its user.
+            MigrationInProgress: If the user's contacts are being moved.
+        """
+        if mapper is not None:
+            tables = {mapper.persist_selectable.name}
+        elif clause is not None:
+            tables = {
+                table.name for table in sqlalchemy.sql.util.find_tables(clause, include_crud=True)
+                if isinstance(table, sqlalchemy.Table)
+            }
+        else:
+            return None
+
+        if not tables & SHARDED_TABLES:
+            return None
+
+        user_id = session.info.get("user_id")
+        if user_id is None:
+            raise ShardingError("Contacts statements need session.info['user_id']")
+
+        shard, moving = self._assignment(user_id)
+        if write and moving:
+            raise MigrationInProgress("Contacts are being moved, try again shortly")
+        return self.engines[shard]
+
+
+@sqlalchemy.event.listens_for(database.RoutingSession, "before_flush")
+def _allocate_contact_ids(session, flush_context, instances):
+    if database.shard_map is None:
+        return
+    contacts = [
+        contact for contact in session.new
+        if isinstance(contact, schema.Contacts) and contact.id is None
+    ]
+    if not contacts:
+        return
+    # Runs on the session's own primary connection, so no second writer
+    # waits for the lock this transaction may already hold.
+    ids = session.execute(
+        sqlalchemy.insert(ContactIdSequence.__table__).returning(ContactIdSequence.id),
+        [{"id": None}] * len(contacts)
+    ).scalars().all()
+    for contact, contact_id in zip(contacts, ids):
+        contact.id = contact_id
+
+
+def _require_contact_id(connection, cursor, statement, parameters, context, executemany):
+    if context is None or not context.isinsert:
+        return
+    if context.compiled.statement.table.name not in SHARDED_TABLES:
+        return
+    if any(row.get("id") is None for row in context.compiled_parameters):
+        raise ShardingError("Contacts inserted into a shard need an id from contact_id_sequence")
+
+
+def connect(urls: list[str] | None = None):
+    """
+    Creates the shard engines and enables routing of contact statements.
+
+    Args:
+        urls (list[str] | None): Shard database URLs, defaults to
+            ``CONTACTS_SHARD_URLS``. A URL equal to the primary's reuses it.
+    """
+    if urls is None:
+        urls = CONTACTS_SHARD_URLS.split(",")
+
+    if database.DBSession is None:
+        database.connect()
+
+    engines = []
+    for url in urls:
+        url = url.strip()
+        if url == database.engine.url.render_as_string(hide_password=False):
+            engines.append(database.engine)
+        else:
+            engine = database.create_engine(url)
+            database.Base.metadata.create_all(engine, tables=[schema.Contacts.__table__])
+            engines.append(engine)
+        if not sqlalchemy.event.contains(engines[-1], "before_cursor_execute", _require_contact_id):
+            sqlalchemy.event.listen(engines[-1], "before_cursor_execute", _require_contact_id)
+
+    database.shard_map = ShardMap(engines)
+
+
+def _set_assignment(user_id: int, shard: int, moving: bool) -> None:
+    with database.engine.begin() as connection:
+        connection.execute(
+            sqlalchemy.delete(ShardAssignment).where(ShardAssignment.user_id == user_id)
+        )
+        connection.execute(
+            sqlalchemy.insert(ShardAssignment).values(user_id=user_id, shard=shard, moving=moving)
+        )
+
+
+def _delete_contacts(engine: sqlalchemy.Engine, user_id: int) -> None:
+    contacts = schema.Contacts.__table__
+    while True:
+        with engine.begin() as connection:
+            ids = connection.execute(
+                sqlalchemy.select(contacts.c.id)
+                .where(contacts.c.user_id == user_id)
+                .limit(COPY_CHUNK_SIZE)
+            ).scalars().all()
+            if not ids:
+                return
+            connection.execute(sqlalchemy.delete(contacts).where(contacts.c.id.in_(ids)))
+
+
+def move_user(user_id: int, target: int) -> int:
+    """
+    Moves a user's contacts to another shard while the service is running.
+
+    The user is marked as moving and writes are refused for the time it
+    takes every worker's cache to notice; rows are then copied in chunks,
+    the assignment is switched and the source rows are removed once no
+    worker reads them anymore.
+
+    Args:
+        user_id (int): The user to move.
+        target (int): Index of the destination shard.
+
+    Returns:
+        int: Number of contacts copied.
+    """
+    shard_map = database.shard_map
+    source = shard_map.shard_for(user_id)
+    if source == target:
+        return 0
+
+    _set_assignment(user_id, source, True)
+    shard_map.forget(user_id)
+    time.sleep(SHARD_MAP_TTL_SECONDS)
+
+    source_engine = shard_map.engines[source]
+    target_engine = shard_map.engines[target]
+    contacts = schema.Contacts.__table__
+
+    _delete_contacts(target_engine, user_id)
+
+    copied = 0
+    last_id = 0
+    while True:
+        with source_engine.connect() as connection:
+            rows = connection.execute(
+                sqlalchemy.select(contacts)
+                .where(contacts.c.user_id == user_id, contacts.c.id > last_id)
+                .order_by(contacts.c.id)
+                .limit(COPY_CHUNK_SIZE)
+            ).mappings().all()
+        if not rows:
+            break
+        with target_engine.begin() as connection:
+            connection.execute(sqlalchemy.insert(contacts), [dict(row) for row in rows])
+        copied += len(rows)
+        last_id = rows[-1]["id"]
+
+    if target == shard_map.hash_shard(user_id):
+        with database.engine.begin() as connection:
+            connection.execute(
+                sqlalchemy.delete(ShardAssignment).where(ShardAssignment.user_id == user_id)
+            )
+    else:
+        _set_assignment(user_id, target, False)
+    shard_map.forget(user_id)
+    time.sleep(SHARD_MAP_TTL_SECONDS)
+
+    _delete_contacts(source_engine, user_id)
+    return copied
+
+
+def pin_all() -> int:
+    """
+    Pins every user without an assignment to its current hash shard.
+
+    Run before changing the number of shards, so that users stay where
+    their contacts are until ``rebalance`` moves them.
+
+    Returns:
+        int: Number of users pinned.
+    """
+    shard_map = database.shard_map
+    with database.engine.begin() as connection:
+        pinned = set(connection.execute(sqlalchemy.select(ShardAssignment.user_id)).scalars())
+        user_ids = [
+            user_id for user_id in connection.execute(sqlalchemy.select(auth.models.User.id)).scalars()
+            if user_id not in pinned
+        ]
+        if user_ids:
+            connection.execute(
+                sqlalchemy.insert(ShardAssignment),
+                [{"user_id": user_id, "shard": shard_map.hash_shard(user_id), "moving": False} for user_id in user_ids]
+            )
+    shard_map.forget()
+    return len(user_ids)
+
+
+def rebalance() -> int:
+    """
+    Moves every pinned user whose hash shard differs from its assignment.
+
+    Returns:
+        int: Number of users moved.
+    """
+    shard_map = database.shard_map
+    with database.engine.connect() as connection:
+        assignments = connection.execute(
+            sqlalchemy.select(ShardAssignment.user_id, ShardAssignment.shard)
+        ).all()
+
+    moved = 0
+    for user_id, shard in assignments:
+        target = shard_map.hash_shard(user_id)
+        if shard != target:
+            move_user(user_id, target)
+            moved += 1
+        else:
+            with database.engine.begin() as connection:
+                connection.execute(
+                    sqlalchemy.delete(ShardAssignment).where(ShardAssignment.user_id == user_id)
+                )
+            shard_map.forget(user_id)
+    return moved
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Contacts shard maintenance")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("pin", help="pin every user to its current shard")
+    commands.add_parser("rebalance", help="move pinned users to their hash shard")
+    move = commands.add_parser("move", help="move one user to a shard")
+    move.add_argument("user_id", type=int)
+    move.add_argument("shard", type=int)
+    args = parser.parse_args()
+
+    connect()
+    if args.command == "pin":
+        print(f"pinned {pin_all()} users")
+    elif args.command == "rebalance":
+        print(f"moved {rebalance()} users")
+    else:
+        print(f"copied {move_user(args.user_id, args.shard)} contacts")
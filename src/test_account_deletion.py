@@ -0,0 +1,68 @@
+import sqlalchemy
+import database
+from auth.models import User
+from contacts.schema import Contacts
+from conftest import seed_contacts
+from services import account_service
+import jobs.service
+
+
+def count(engine, table):
+    with engine.connect() as connection:
+        return connection.execute(sqlalchemy.select(sqlalchemy.func.count()).select_from(table)).scalar()
+
+
+def test_small_account_is_deleted_with_one_cascading_delete(client, db_engine, make_user, auth_headers, assert_num_queries):
+    user = make_user("owner@example.com")
+    other = make_user("other@example.com")
+    seed_contacts(db_engine, user.id, 20)
+    seed_contacts(db_engine, other.id, 3)
+
+    # user lookup, size check, DELETE FROM users
+    with assert_num_queries(3):
+        response = client.delete("/auth/account", headers=auth_headers("owner@example.com"))
+
+    assert response.status_code == 200
+    assert response.json() == {"result": "Deleted"}
+    assert count(db_engine, User.__table__) == 1
+    assert count(db_engine, Contacts.__table__) == 3
+
+
+def test_large_account_is_disabled_then_purged_in_chunks(client, db_engine, make_user, auth_headers, monkeypatch):
+    monkeypatch.setattr(account_service, "PURGE_THRESHOLD", 10)
+    monkeypatch.setattr(account_service, "PURGE_CHUNK_SIZE", 7)
+    user = make_user("owner@example.com")
+    seed_contacts(db_engine, user.id, 30)
+
+    response = client.delete("/auth/account", headers=auth_headers("owner@example.com"))
+
+    assert response.status_code == 202
+    assert response.json() == {"result": "Scheduled"}
+    assert count(db_engine, Contacts.__table__) == 30
+    # A restart meanwhile leaves the queued purge alone.
+    assert account_service.queue_interrupted_purges() == 0
+
+    assert jobs.service.run_pending() == 1
+    assert count(db_engine, User.__table__) == 0
+    assert count(db_engine, Contacts.__table__) == 0
+
+
+def test_interrupted_purge_is_queued_again_on_startup(db_engine, make_user, monkeypatch):
+    monkeypatch.setattr(account_service, "PURGE_THRESHOLD", 1)
+    user = make_user("owner@example.com")
+    seed_contacts(db_engine, user.id, 5)
+
+    db = database.DBSession()
+    assert account_service.delete_account(db, db.get(User, user.id))
+    db.close()
+
+    db = database.DBSession()
+    deleted = db.get(User, user.id)
+    assert deleted.username.startswith("deleted:")
+    assert deleted.refresh_token is None
+    db.close()
+
+    assert account_service.queue_interrupted_purges() == 1
+    assert account_service.queue_interrupted_purges() == 0
+    assert jobs.service.run_pending() == 1
+    assert count(db_engine, Contacts.__table__) == 0
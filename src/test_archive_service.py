@@ -0,0 +1,99 @@
+import datetime
+import sqlalchemy
+import pytest
+from contacts.schema import Contacts
+from conftest import seed_contacts
+from services import archive_service
+
+LATER = datetime.datetime.now() + datetime.timedelta(days=400)
+
+
+def hot_count(engine):
+    with engine.connect() as connection:
+        return connection.execute(sqlalchemy.select(sqlalchemy.func.count()).select_from(Contacts)).scalar()
+
+
+@pytest.fixture
+def archived(db_engine, make_user, monkeypatch):
+    monkeypatch.setattr(archive_service, "ARCHIVE_BLOCK_SIZE", 4)
+    user = make_user("owner@example.com")
+    seed_contacts(db_engine, user.id, 10)
+    assert archive_service.archive_stale(LATER, months=12) == 10
+    return user
+
+
+@pytest.mark.parametrize("zstd", [True, False])
+def test_blocks_round_trip(zstd, monkeypatch):
+    if not zstd:
+        monkeypatch.setattr(archive_service, "zstandard", None)
+    elif archive_service.zstandard is None:
+        pytest.skip("zstandard is not installed")
+    contacts = [{"id": 1, "name": "Taras", "date_of_birth": datetime.date(1990, 3, 9)}]
+
+    codec, data = archive_service.compress(contacts)
+    assert codec == ("zstd" if zstd else "zlib")
+    assert archive_service.decompress(codec, data) == contacts
+
+
+def test_recent_contacts_stay_hot(db_engine, make_user):
+    user = make_user("owner@example.com")
+    seed_contacts(db_engine, user.id, 3)
+
+    assert archive_service.archive_stale(months=12) == 0
+    assert hot_count(db_engine) == 3
+
+
+def test_archiver_stops_when_it_loses_the_lease(db_engine, make_user, monkeypatch):
+    monkeypatch.setattr(archive_service, "SCAN_CHUNK_SIZE", 2)
+    user = make_user("owner@example.com")
+    seed_contacts(db_engine, user.id, 6)
+    renewals = []
+
+    def acquire(engine, name, seconds):
+        renewals.append(name)
+        return len(renewals) < 3
+
+    monkeypatch.setattr(archive_service.lease_service, "acquire", acquire)
+
+    assert archive_service.archive_stale(LATER, months=12) == 4
+    assert hot_count(db_engine) == 2
+
+
+def test_stale_contacts_move_to_blocks(db_engine, archived):
+    assert hot_count(db_engine) == 0
+    with db_engine.connect() as connection:
+        blocks = connection.execute(sqlalchemy.select(archive_service.ContactArchive)).all()
+    assert [(block.min_id, block.max_id, block.count) for block in blocks] == [(1, 4, 4), (5, 8, 4), (9, 10, 2)]
+
+
+def test_get_by_id_restores_archived_contact(client, db_engine, archived, auth_headers):
+    headers = auth_headers("owner@example.com")
+
+    response = client.get("/api/contacts/find/6", headers=headers)
+    assert response.status_code == 200, response.text
+    assert response.json()["email"] == "contact5@example.com"
+    assert hot_count(db_engine) == 1
+
+    # Now served from the hot table; the rest of the block is still archived.
+    assert client.get("/api/contacts/find/6", headers=headers).status_code == 200
+    assert client.get("/api/contacts/find/5", headers=headers).status_code == 200
+    assert hot_count(db_engine) == 2
+    assert client.get("/api/contacts/find/99", headers=headers).status_code == 404
+
+
+def test_archived_contacts_are_private(client, archived, make_user, auth_headers):
+    make_user("other@example.com")
+
+    assert client.get("/api/contacts/find/6", headers=auth_headers("other@example.com")).status_code == 404
+
+
+def test_delete_of_archived_contact_removes_it_everywhere(client, db_engine, archived, auth_headers):
+    headers = auth_headers("owner@example.com")
+
+    assert client.delete("/api/contacts/9", headers=headers).status_code == 200
+    assert client.get("/api/contacts/find/9", headers=headers).status_code == 404
+    assert client.get("/api/contacts/find/10", headers=headers).status_code == 200
+    with db_engine.connect() as connection:
+        assert connection.execute(sqlalchemy.select(archive_service.ContactArchive).where(
+            archive_service.ContactArchive.min_id == 9
+        )).all() == []
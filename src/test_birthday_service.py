@@ -0,0 +1,103 @@
+import datetime
+import pytest
+import database
+from auth.models import User
+from contacts.schema import Contacts
+from services import birthday_service, lease_service
+
+
+class FakeSender:
+    batch_size = 2
+
+    def __init__(self):
+        self.messages = []
+
+    def send(self, messages):
+        self.messages += messages
+        return len(messages)
+
+
+@pytest.fixture
+def primary(tmp_path, database_state, monkeypatch):
+    monkeypatch.setattr(birthday_service, "REMINDER_DAYS_AHEAD", 1)
+    database.connect(f"sqlite:///{tmp_path / 'primary.sqlite'}")
+
+    db = next(database.get_database())
+    db.add_all([User(id=1, username="one@example.com", hash_password="x"), User(id=2, username="two@example.com", hash_password="x")])
+    for user_id, name, born in [
+        (1, "Today", datetime.date(1990, 3, 1)),
+        (1, "Tomorrow", datetime.date(1985, 3, 2)),
+        (2, "Later", datetime.date(1970, 3, 9)),
+        (2, "Leap", datetime.date(2000, 2, 29)),
+    ]:
+        db.add(Contacts(
+            user_id=user_id, name=name, surename="X", email="e", phone_number="1",
+            date_of_birth=born, description=""
+        ))
+    db.commit()
+    db.close()
+    yield database.engine
+    database.engine.dispose()
+
+
+def test_upcoming_keys_handles_leap_day():
+    assert birthday_service.upcoming_keys(datetime.date(2027, 2, 27)) == {
+        "02-27": datetime.date(2027, 2, 27),
+        "02-28": datetime.date(2027, 2, 28),
+        "02-29": datetime.date(2027, 2, 28),
+    }
+    assert "02-29" not in birthday_service.upcoming_keys(datetime.date(2028, 2, 27))
+
+
+def test_run_once_sends_each_reminder_once(primary):
+    sender = FakeSender()
+
+    assert birthday_service.run_once(datetime.date(2027, 3, 1), sender) == (2, 2)
+    assert sorted(message["Subject"] for message in sender.messages) == [
+        "Upcoming birthday: Today X", "Upcoming birthday: Tomorrow X"
+    ]
+    assert {message["To"] for message in sender.messages} == {"one@example.com"}
+
+    assert birthday_service.run_once(datetime.date(2027, 3, 1), sender) == (0, 0)
+    assert len(sender.messages) == 2
+
+
+def test_contacts_are_scanned_once_a_day(primary):
+    sender = FakeSender()
+    assert birthday_service.run_once(datetime.date(2027, 3, 1), sender) == (2, 2)
+
+    db = next(database.get_database())
+    db.add(Contacts(
+        user_id=2, name="New", surename="X", email="e", phone_number="1",
+        date_of_birth=datetime.date(1999, 3, 2), description=""
+    ))
+    db.commit()
+    db.close()
+
+    assert birthday_service.run_once(datetime.date(2027, 3, 1), sender) == (0, 0)
+    assert birthday_service.run_once(datetime.date(2027, 3, 2), sender) == (1, 1)
+    assert sender.messages[-1]["Subject"] == "Upcoming birthday: New X"
+
+
+def test_scheduler_waits_until_midnight():
+    assert birthday_service._seconds_until_tomorrow(datetime.datetime(2027, 3, 1, 23, 59, 30)) == 30
+
+
+def test_leap_day_birthday_reminded_in_common_year(primary):
+    sender = FakeSender()
+
+    birthday_service.run_once(datetime.date(2027, 2, 28), sender)
+
+    assert "Upcoming birthday: Leap X" in [message["Subject"] for message in sender.messages]
+
+
+def test_run_once_skips_while_another_worker_holds_lease(primary):
+    assert lease_service.acquire(primary, birthday_service.LEASE_NAME, 60, owner="other")
+
+    assert birthday_service.run_once(datetime.date(2027, 3, 1), FakeSender()) is None
+
+
+def test_expired_lease_can_be_taken_over(primary):
+    assert lease_service.acquire(primary, "job", -1, owner="crashed")
+    assert lease_service.acquire(primary, "job", 60, owner="me")
+    assert not lease_service.acquire(primary, "job", 60, owner="crashed")
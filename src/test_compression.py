@@ -0,0 +1,73 @@
+import gzip
+import json
+import pytest
+import compression
+from conftest import SEEDED_CONTACTS, SEEDED_USERNAME
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("gzip, deflate, br, zstd", "zstd"),
+    ("gzip;q=1.0, br;q=0.5", "gzip"),
+    ("br, gzip", "br"),
+    ("*", "zstd"),
+    ("zstd;q=0, *;q=0.1", "br"),
+    ("identity", None),
+    ("", None),
+])
+def test_negotiate(header, expected):
+    assert compression.negotiate(header, ["zstd", "br", "gzip"]) == expected
+
+
+@pytest.mark.parametrize("encoding", sorted(compression.available_encoders()))
+def test_contact_list_is_compressed(seeded_client, auth_headers, encoding):
+    headers = {**auth_headers(SEEDED_USERNAME), "Accept-Encoding": encoding}
+
+    response = seeded_client.get("/api/contacts/", headers=headers)
+
+    assert response.headers["content-encoding"] == encoding
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert int(response.headers["content-length"]) < len(response.content) / 4
+    assert len(response.json()) == SEEDED_CONTACTS
+
+
+def test_small_and_unnegotiated_responses_are_not_compressed(client, make_user, auth_headers):
+    make_user("owner@example.com")
+    headers = auth_headers("owner@example.com")
+
+    small = client.get("/api/contacts/", headers={**headers, "Accept-Encoding": "gzip"})
+    assert "content-encoding" not in small.headers
+
+    plain = client.get("/api/contacts/", headers={**headers, "Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+
+
+def test_export_is_streamed_compressed(seeded_client, auth_headers):
+    headers = {**auth_headers(SEEDED_USERNAME), "Accept-Encoding": "gzip"}
+
+    with seeded_client.stream("GET", "/api/contacts/export", headers=headers) as response:
+        assert response.headers["content-type"] == "application/x-ndjson"
+        assert response.headers["content-encoding"] == "gzip"
+        assert "content-length" not in response.headers
+        raw = b"".join(response.iter_raw())
+
+    lines = gzip.decompress(raw).decode().splitlines()
+    assert len(lines) == SEEDED_CONTACTS
+    assert json.loads(lines[0])["email"] == "contact0@example.com"
+
+
+@pytest.mark.parametrize("encoding", sorted(compression.available_encoders()))
+def test_every_flushed_chunk_is_decodable(encoding):
+    encoder = compression.available_encoders()[encoding]()
+    events = [f"data: event {i}\n\n".encode() for i in range(3)]
+    chunks = [encoder.compress(event) + encoder.flush() for event in events]
+
+    if encoding == "gzip":
+        decoder = compression.zlib.decompressobj(31)
+        decoded = [decoder.decompress(chunk) for chunk in chunks]
+    elif encoding == "br":
+        decoder = compression.brotli.Decompressor()
+        decoded = [decoder.process(chunk) for chunk in chunks]
+    else:
+        decoder = compression.zstandard.ZstdDecompressor().decompressobj()
+        decoded = [decoder.decompress(chunk) for chunk in chunks]
+    assert decoded == events
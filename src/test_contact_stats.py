@@ -0,0 +1,99 @@
+import datetime
+import sqlalchemy
+import database
+from contacts import stats
+from contacts.schema import Contacts
+from conftest import seed_contacts
+from services import archive_service
+
+CONTACT = {
+    "name": "Taras",
+    "surename": "Shevchenko",
+    "email": "taras@Example.com",
+    "phone_number": "+380501234567",
+    "date_of_birth": "1990-03-09",
+    "description": "poet",
+}
+
+
+def months(**counts):
+    return {month: counts.get(f"m{month}", 0) for month in range(1, 13)}
+
+
+def test_stats_follow_every_write(client, make_user, auth_headers):
+    make_user("owner@example.com")
+    headers = auth_headers("owner@example.com")
+
+    client.post("/api/contacts/", json=CONTACT, headers=headers)
+    client.post("/api/contacts/bulk", json=[
+        dict(CONTACT, email="lesya@ukr.net", date_of_birth="1971-02-25"),
+        dict(CONTACT, email="ivan@example.com"),
+    ], headers=headers)
+    assert client.get("/api/contacts/stats", headers=headers).json() == {
+        "count": 3,
+        "birthdays_per_month": {str(month): count for month, count in months(m2=1, m3=2).items()},
+        "email_domains": {"example.com": 2, "ukr.net": 1},
+    }
+
+    first, second, _ = [contact["id"] for contact in client.get("/api/contacts/", headers=headers).json()]
+    client.patch(f"/api/contacts/{first}", json={"email": "taras@ukr.net", "date_of_birth": "1990-12-01"}, headers=headers)
+    client.delete(f"/api/contacts/{second}", headers=headers)
+    assert client.get("/api/contacts/stats", headers=headers).json() == {
+        "count": 2,
+        "birthdays_per_month": {str(month): count for month, count in months(m3=1, m12=1).items()},
+        "email_domains": {"example.com": 1, "ukr.net": 1},
+    }
+
+
+def test_rebuild_matches_incremental_counts(db_engine, make_user):
+    user = make_user("owner@example.com")
+    db = database.DBSession()
+    db.add_all([
+        Contacts(user_id=user.id, name="A", surename="B", email=f"a{i}@Mail.com",
+                 phone_number="1", date_of_birth=datetime.date(1990 + i, i + 1, 1), description="")
+        for i in range(3)
+    ])
+    db.commit()
+    incremental = stats.read_stats(db, user.id)
+    db.close()
+
+    # Core inserts bypass the session and are only counted by a rebuild.
+    seed_contacts(db_engine, user.id, 5)
+    assert stats.rebuild() > 0
+
+    db = database.DBSession()
+    rebuilt = stats.read_stats(db, user.id)
+    db.close()
+    assert rebuilt["count"] == incremental["count"] + 5
+    assert rebuilt["email_domains"] == {"example.com": 5, "mail.com": 3}
+    assert sum(rebuilt["birthdays_per_month"].values()) == 8
+
+
+def test_rebuild_counts_archived_contacts(client, make_user, auth_headers):
+    user = make_user("owner@example.com")
+    headers = auth_headers("owner@example.com")
+    client.post("/api/contacts/bulk", json=[
+        CONTACT,
+        dict(CONTACT, email="lesya@ukr.net", date_of_birth="1971-02-25"),
+        dict(CONTACT, email="ivan@example.com"),
+    ], headers=headers)
+    later = datetime.datetime.now() + datetime.timedelta(days=400)
+    assert archive_service.archive_stale(later, months=12) == 3
+
+    db = database.DBSession()
+    incremental = stats.read_stats(db, user.id)
+    stats.rebuild()
+    assert stats.read_stats(db, user.id) == incremental
+    assert incremental["count"] == 3
+    db.close()
+
+
+def test_stats_go_away_with_the_user(db_engine, make_user, client, auth_headers):
+    make_user("owner@example.com")
+    headers = auth_headers("owner@example.com")
+    client.post("/api/contacts/", json=CONTACT, headers=headers)
+
+    client.delete("/auth/account", headers=headers)
+
+    with db_engine.connect() as connection:
+        assert connection.execute(sqlalchemy.select(stats.ContactStat)).all() == []
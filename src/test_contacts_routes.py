@@ -0,0 +1,129 @@
+import contacts.routes as routes
+from conftest import SEEDED_CONTACTS, SEEDED_USERNAME, SEEDED_PASSWORD
+
+CONTACT = {
+    "name": "Taras",
+    "surename": "Shevchenko",
+    "email": "taras@example.com",
+    "phone_number": "+380501234567",
+    "date_of_birth": "1990-03-09",
+    "description": "poet",
+}
+
+
+def test_create_and_fetch_contact(client, make_user, auth_headers):
+    make_user("owner@example.com")
+    headers = auth_headers("owner@example.com")
+
+    response = client.post("/api/contacts/", json=CONTACT, headers=headers)
+    assert response.status_code == 200, response.text
+
+    response = client.get("/api/contacts/", headers=headers)
+    assert response.status_code == 200, response.text
+    [contact] = response.json()
+    assert contact["email"] == CONTACT["email"]
+
+    response = client.get(f"/api/contacts/find/{contact['id']}", headers=headers)
+    assert response.json()["name"] == "Taras"
+
+
+def test_contacts_are_private(client, make_user, auth_headers):
+    make_user("owner@example.com")
+    make_user("other@example.com")
+    client.post("/api/contacts/", json=CONTACT, headers=auth_headers("owner@example.com"))
+
+    response = client.get("/api/contacts/", headers=auth_headers("other@example.com"))
+    assert response.json() == []
+
+
+def test_search_matches_own_contacts(client, make_user, auth_headers):
+    make_user("owner@example.com")
+    make_user("other@example.com")
+    client.post("/api/contacts/", json=CONTACT, headers=auth_headers("owner@example.com"))
+    client.post("/api/contacts/", json=dict(CONTACT, name="Lesya"), headers=auth_headers("owner@example.com"))
+
+    response = client.get("/api/contacts/search?name=Taras", headers=auth_headers("owner@example.com"))
+    assert [contact["name"] for contact in response.json()] == ["Taras"]
+
+    response = client.get("/api/contacts/search", headers=auth_headers("other@example.com"))
+    assert response.json() == []
+
+
+def test_lookup_by_phone(client, make_user, auth_headers):
+    make_user("owner@example.com")
+    make_user("other@example.com")
+    headers = auth_headers("owner@example.com")
+    client.post("/api/contacts/bulk", json=[
+        CONTACT,
+        dict(CONTACT, name="Lesya", phone_number="+1 (415) 555-4567"),
+        dict(CONTACT, name="Ivan", phone_number="n/a"),
+    ], headers=headers)
+    client.post("/api/contacts/", json=CONTACT, headers=auth_headers("other@example.com"))
+
+    def names(query):
+        response = client.get(f"/api/contacts/by-phone?{query}", headers=headers)
+        assert response.status_code == 200, response.text
+        return sorted(contact["name"] for contact in response.json())
+
+    assert names("number=050 123 45 67") == ["Taras"]
+    assert names("last=4567") == ["Lesya", "Taras"]
+    assert names("last=554567") == ["Lesya"]
+    assert names("number=%2B380999999999") == []
+    assert client.get("/api/contacts/search?phone=0501234567", headers=headers).json()[0]["name"] == "Taras"
+    assert client.get("/api/contacts/by-phone?last=67", headers=headers).status_code == 422
+    assert client.get("/api/contacts/by-phone?number=n/a", headers=headers).status_code == 422
+
+
+def test_search_by_invalid_phone_is_rejected(client, make_user, auth_headers):
+    make_user("owner@example.com")
+    headers = auth_headers("owner@example.com")
+    # Contacts without a valid number have no phone key.
+    client.post("/api/contacts/", json=dict(CONTACT, phone_number="n/a"), headers=headers)
+
+    response = client.get("/api/contacts/search?phone=n/a", headers=headers)
+
+    assert response.status_code == 422
+    assert response.json()["detail"] == "Not a valid phone number"
+
+
+def test_bulk_create_is_capped(client, make_user, auth_headers):
+    make_user("owner@example.com")
+    headers = auth_headers("owner@example.com")
+
+    response = client.post("/api/contacts/bulk", json=[CONTACT] * (routes.BULK_MAX_CONTACTS + 1), headers=headers)
+
+    assert response.status_code == 422
+    assert client.get("/api/contacts/", headers=headers).json() == []
+
+
+def test_patch_and_delete_contact(client, make_user, auth_headers):
+    make_user("owner@example.com")
+    headers = auth_headers("owner@example.com")
+    client.post("/api/contacts/", json=CONTACT, headers=headers)
+    contact_id = client.get("/api/contacts/", headers=headers).json()[0]["id"]
+
+    response = client.patch(f"/api/contacts/{contact_id}", json={"description": "writer"}, headers=headers)
+    assert response.json()["description"] == "writer"
+
+    assert client.delete(f"/api/contacts/{contact_id}", headers=headers).status_code == 200
+    assert client.get(f"/api/contacts/find/{contact_id}", headers=headers).status_code == 404
+
+
+def test_seeded_user_lists_all_contacts(seeded_client, auth_headers):
+    response = seeded_client.get("/api/contacts/", headers=auth_headers(SEEDED_USERNAME))
+
+    assert response.status_code == 200
+    assert len(response.json()) == SEEDED_CONTACTS
+
+
+def test_login_and_lockout(seeded_client):
+    form = {"username": SEEDED_USERNAME, "password": SEEDED_PASSWORD}
+    assert seeded_client.post("/auth/login", data=form).status_code == 200
+
+    for _ in range(5):
+        response = seeded_client.post("/auth/login", data={**form, "password": "wrong"})
+        assert response.status_code == 401
+
+    response = seeded_client.post("/auth/login", data=form)
+    assert response.status_code == 429
+    assert "Retry-After" in response.headers
@@ -0,0 +1,88 @@
+import pytest
+import database
+from auth.models import User
+
+
+@pytest.fixture
+def routed(tmp_path, database_state):
+    database.connect(
+        f"sqlite:///{tmp_path / 'primary.sqlite'}",
+        f"sqlite:///{tmp_path / 'replica.sqlite'}",
+    )
+    database.refresh_replica()
+    yield
+    database.engine.dispose()
+    database.read_engine.dispose()
+
+
+def write_user(username):
+    db = next(database.get_database())
+    db.info["sticky_key"] = username
+    db.add(User(username=username, hash_password="x"))
+    db.commit()
+    db.close()
+
+
+def read_usernames():
+    db = next(database.get_read_database())
+    names = [user.username for user in db.query(User).all()]
+    db.close()
+    return names
+
+
+def test_reads_go_to_replica(routed):
+    db = next(database.get_database())
+    db.add(User(username="alice", hash_password="x"))
+    db.commit()
+    db.close()
+
+    assert read_usernames() == []
+
+    database.refresh_replica()
+    assert read_usernames() == ["alice"]
+
+
+def test_read_your_writes_stickiness(routed):
+    write_user("bob")
+
+    db = next(database.get_read_database())
+    db.info["sticky_key"] = "bob"
+    assert database.routes_to_replica(db) is False
+    assert [user.username for user in db.query(User).all()] == ["bob"]
+    db.close()
+
+    db = next(database.get_read_database())
+    db.info["sticky_key"] = "carol"
+    assert database.routes_to_replica(db) is True
+    assert db.query(User).all() == []
+    db.close()
+
+
+def test_stickiness_expires(routed, monkeypatch):
+    write_user("dave")
+    monkeypatch.setattr(database, "READ_YOUR_WRITES_SECONDS", 0)
+
+    assert database.is_sticky("dave") is False
+
+
+def test_recent_writes_are_capped(database_state, monkeypatch):
+    monkeypatch.setattr(database, "_RECENT_WRITES_LIMIT", 2)
+    for username in ("frank", "grace", "frank", "heidi"):
+        database.mark_write(username)
+
+    assert list(database._recent_writes) == ["frank", "heidi"]
+
+
+def test_use_primary(routed):
+    write_user("erin")
+
+    db = next(database.get_read_database())
+    database.use_primary(db)
+    assert [user.username for user in db.query(User).all()] == ["erin"]
+    db.close()
+
+
+def test_write_session_never_uses_replica(routed):
+    db = next(database.get_database())
+    assert database.routes_to_replica(db) is False
+    db.close()
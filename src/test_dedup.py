@@ -0,0 +1,105 @@
+import datetime
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from database import Base
+from auth.models import User
+from contacts.schema import Contacts
+from contacts.normalize import normalize_email, normalize_phone, normalize_name, to_e164, phone_key
+from contacts import dedup
+
+
+@pytest.fixture
+def session():
+    engine = create_engine('sqlite:///:memory:')
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    session.add_all([User(id=1, username="owner", hash_password="x"), User(id=2, username="other", hash_password="x")])
+    session.commit()
+    yield session
+    session.close()
+
+
+def contact(session, name, surename, email, phone, user_id=1, description=""):
+    new_contact = Contacts(
+        user_id=user_id, name=name, surename=surename, email=email, phone_number=phone,
+        date_of_birth=datetime.date(1990, 5, 17), description=description
+    )
+    session.add(new_contact)
+    session.commit()
+    return new_contact.id
+
+
+def test_normalization():
+    assert normalize_email(" John.Doe+work@GoogleMail.com ") == "johndoe@gmail.com"
+    assert normalize_email("Jane@Example.org") == "jane@example.org"
+    assert normalize_phone("+38 (050) 123-45-67") == "380501234567"
+    assert normalize_phone("n/a") is None
+    assert normalize_name("Ševčenko-Smith") == "sevcenkosmith"
+
+
+@pytest.mark.parametrize("phone", ["+380501234567", "050 123 45 67", "0038 050 123-45-67", "501234567", "380501234567"])
+def test_e164_with_default_country(phone):
+    assert to_e164(phone) == "+380501234567"
+    assert phone_key(phone) == "765432105083"
+
+
+@pytest.mark.parametrize("phone", ["n/a", "111", "+050-222", "+1234567890123456"])
+def test_invalid_phones_have_no_key(phone):
+    assert phone_key(phone) is None
+
+
+def test_normalized_columns_follow_updates(session):
+    contact_id = contact(session, "Ann", "Lee", "Ann@Mail.com", "050 111")
+    stored = session.get(Contacts, contact_id)
+    stored.phone_number = "+050-222"
+    session.commit()
+
+    assert stored.email_normalized == "ann@mail.com"
+    assert stored.phone_normalized == "050222"
+
+
+def test_find_duplicates_by_email_phone_and_name(session):
+    a = contact(session, "John", "Doe", "john.doe@gmail.com", "111")
+    b = contact(session, "Johnny", "Smith", "JohnDoe@gmail.com", "222")
+    c = contact(session, "Mary", "Major", "mary@x.org", "+1 (333)")
+    d = contact(session, "Maria", "Minor", "maria@y.org", "1333")
+    e = contact(session, "Alexander", "Brown", "a@b.c", "444")
+    f = contact(session, "Alexandre", "Brown", "alex@b.c", "555")
+    contact(session, "Bob", "Brown", "bob@b.c", "666")
+    contact(session, "John", "Doe", "john.doe@gmail.com", "111", user_id=2)
+
+    groups = dedup.find_duplicates(session, 1)
+
+    assert [group["contact_ids"] for group in groups] == [[a, b], [c, d], [e, f]]
+    assert groups[0]["reasons"] == ["email"]
+    assert groups[1]["reasons"] == ["phone"]
+    assert groups[2]["reasons"] == ["name"]
+    assert 0 < groups[2]["score"] < groups[1]["score"] < groups[0]["score"]
+
+
+def test_groups_are_transitive(session):
+    a = contact(session, "A", "One", "shared@x.org", "1")
+    b = contact(session, "B", "Two", "shared@x.org", "2")
+    c = contact(session, "C", "Three", "c@x.org", "2")
+
+    assert dedup.find_duplicates(session, 1)[0]["contact_ids"] == [a, b, c]
+
+
+def test_merge_contacts(session):
+    keep = contact(session, "John", "Doe", "", "111", description="friend")
+    other = contact(session, "John", "Doe", "john@doe.com", "111", description="colleague")
+
+    merged = dedup.merge_contacts(session, 1, keep, [other])
+    session.commit()
+
+    assert merged.email == "john@doe.com"
+    assert merged.description == "friend\ncolleague"
+    assert session.get(Contacts, other) is None
+
+
+def test_merge_contacts_of_other_user_is_refused(session):
+    keep = contact(session, "John", "Doe", "j@d.com", "1")
+    foreign = contact(session, "John", "Doe", "j@d.com", "1", user_id=2)
+
+    assert dedup.merge_contacts(session, 1, keep, [foreign]) is None
@@ -0,0 +1,73 @@
+import asyncio
+from services.event_bus import EventBus, format_sse
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_publish_fans_out_to_every_connection_of_user():
+    async def scenario():
+        bus = EventBus()
+        first = bus.subscribe(1)
+        second = bus.subscribe(1)
+        other = bus.subscribe(2)
+
+        bus.publish(1, "created", 10)
+
+        assert await first.get(timeout=1) == [{"type": "created", "contact_id": 10}]
+        assert await second.get(timeout=1) == [{"type": "created", "contact_id": 10}]
+        assert await other.get(timeout=0.01) == []
+
+    run(scenario())
+
+
+def test_events_for_same_contact_are_coalesced():
+    async def scenario():
+        bus = EventBus()
+        subscription = bus.subscribe(1)
+
+        bus.publish(1, "created", 10)
+        bus.publish(1, "created", 11)
+        bus.publish(1, "updated", 10)
+
+        assert await subscription.get(timeout=1) == [
+            {"type": "created", "contact_id": 11},
+            {"type": "updated", "contact_id": 10},
+        ]
+
+    run(scenario())
+
+
+def test_overflow_is_replaced_by_resync():
+    async def scenario():
+        bus = EventBus(max_pending=2)
+        subscription = bus.subscribe(1)
+
+        for contact_id in range(5):
+            bus.publish(1, "created", contact_id)
+
+        assert await subscription.get(timeout=1) == [{"type": "resync"}]
+
+        bus.publish(1, "deleted", 3)
+        assert await subscription.get(timeout=1) == [{"type": "deleted", "contact_id": 3}]
+
+    run(scenario())
+
+
+def test_unsubscribe_releases_user_entry():
+    async def scenario():
+        bus = EventBus()
+        subscription = bus.subscribe(1)
+        assert bus.connections(1) == 1
+
+        bus.unsubscribe(subscription)
+        assert bus.connections() == 0
+
+    run(scenario())
+
+
+def test_format_sse():
+    assert format_sse({"type": "deleted", "contact_id": 3}) == (
+        'event: deleted\ndata: {"type": "deleted", "contact_id": 3}\n\n'
+    )
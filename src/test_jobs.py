@@ -0,0 +1,325 @@
+import asyncio
+import concurrent.futures.process
+import datetime
+import json
+import os
+import fastapi
+import pytest
+import sqlalchemy
+import database
+import auth.models
+import jobs.handlers as handlers
+import jobs.models as models
+import jobs.routes as routes
+import jobs.service as service
+from conftest import SEEDED_CONTACTS, SEEDED_USERNAME, seed_contacts
+
+
+@pytest.fixture(autouse=True)
+def artifacts(tmp_path, monkeypatch):
+    monkeypatch.setattr(service, "JOB_ARTIFACT_DIR", str(tmp_path / "artifacts"))
+    return tmp_path / "artifacts"
+
+
+def contact(name, email, phone="050 111 22 33"):
+    return {
+        "name": name, "surename": "Lee", "email": email, "phone_number": phone,
+        "date_of_birth": "1990-05-01", "description": "",
+    }
+
+
+def queue(user_id, count, kind="export"):
+    with database.DBSession() as session:
+        return [service.enqueue(session, user_id, kind).id for _ in range(count)]
+
+
+def test_export_job_reports_progress_and_result(seeded_client, auth_headers):
+    headers = auth_headers(SEEDED_USERNAME)
+
+    response = seeded_client.post("/api/jobs/export", headers=headers)
+    assert response.status_code == 202, response.text
+    job = response.json()
+    assert job["status"] == "queued"
+
+    response = seeded_client.get(f"/api/jobs/{job['id']}/result", headers=headers)
+    assert response.status_code == 409
+
+    assert service.run_pending() == 1
+
+    job = seeded_client.get(f"/api/jobs/{job['id']}", headers=headers).json()
+    assert job["status"] == "done"
+    assert job["progress"] == job["total"] == SEEDED_CONTACTS
+
+    response = seeded_client.get(f"/api/jobs/{job['id']}/result", headers=headers)
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = response.text.splitlines()
+    assert len(lines) == SEEDED_CONTACTS
+    assert json.loads(lines[0])["email"] == "contact0@example.com"
+
+
+def test_jobs_are_private(client, make_user, auth_headers):
+    make_user("owner@example.com")
+    make_user("other@example.com")
+    job = client.post("/api/jobs/export", headers=auth_headers("owner@example.com")).json()
+
+    assert client.get(f"/api/jobs/{job['id']}", headers=auth_headers("other@example.com")).status_code == 404
+    assert client.get("/api/jobs/", headers=auth_headers("other@example.com")).json() == []
+    assert [j["id"] for j in client.get("/api/jobs/", headers=auth_headers("owner@example.com")).json()] == [job["id"]]
+
+
+def test_import_job_skips_invalid_lines(client, make_user, auth_headers, artifacts):
+    make_user("owner@example.com")
+    headers = auth_headers("owner@example.com")
+    lines = [
+        json.dumps(contact("Ann", "ann@example.com")),
+        json.dumps({"name": "Broken"}),
+        json.dumps(contact("Bob", "bob@example.com")),
+        "",
+        json.dumps(contact("Cid", "cid@example.com")),
+    ]
+
+    response = client.post(
+        "/api/jobs/import", headers=headers,
+        files={"file": ("contacts.ndjson", "\n".join(lines) + "\n", "application/x-ndjson")}
+    )
+    assert response.status_code == 202, response.text
+    assert service.run_pending() == 1
+
+    job_id = response.json()["id"]
+    result = client.get(f"/api/jobs/{job_id}/result", headers=headers).json()
+    assert result["created"] == 3
+    assert [error["line"] for error in result["errors"]] == [2]
+    assert len(client.get("/api/contacts/", headers=headers).json()) == 3
+    assert client.get("/api/contacts/stats", headers=headers).json()["count"] == 3
+
+
+def test_import_size_is_capped(client, make_user, auth_headers, artifacts, monkeypatch):
+    monkeypatch.setattr(routes, "UPLOAD_CHUNK_SIZE", 16)
+    monkeypatch.setattr(routes, "IMPORT_MAX_BYTES", 64)
+    make_user("owner@example.com")
+    body = json.dumps(contact("Ann", "ann@example.com")) + "\n"
+
+    response = client.post(
+        "/api/jobs/import", headers=auth_headers("owner@example.com"),
+        files={"file": ("contacts.ndjson", body, "application/x-ndjson")}
+    )
+
+    assert response.status_code == 413
+    assert os.listdir(artifacts) == []
+    assert service.claim_next() is None
+
+
+def test_oversized_import_is_refused_before_reading(client, make_user, auth_headers, artifacts, monkeypatch):
+    monkeypatch.setattr(routes, "IMPORT_MAX_BYTES", 64)
+    monkeypatch.setattr(routes, "MULTIPART_OVERHEAD_BYTES", 0)
+    monkeypatch.setattr(fastapi.Request, "form", lambda *args, **kwargs: pytest.fail("body was read"))
+    make_user("owner@example.com")
+    body = json.dumps(contact("Ann", "ann@example.com")) + "\n"
+
+    response = client.post(
+        "/api/jobs/import", headers=auth_headers("owner@example.com"),
+        files={"file": ("contacts.ndjson", body * 10, "application/x-ndjson")}
+    )
+
+    assert response.status_code == 413
+    assert service.claim_next() is None
+
+
+def test_import_requires_a_file(client, make_user, auth_headers, artifacts):
+    make_user("owner@example.com")
+
+    response = client.post(
+        "/api/jobs/import", headers=auth_headers("owner@example.com"), data={"other": "value"}
+    )
+
+    assert response.status_code == 422
+    assert service.claim_next() is None
+
+
+def test_retried_import_resumes_after_last_commit(client, make_user, auth_headers, monkeypatch):
+    monkeypatch.setattr(handlers, "IMPORT_CHUNK_SIZE", 2)
+    make_user("owner@example.com")
+    headers = auth_headers("owner@example.com")
+    names = ["Ann", "Bob", "Cid", "Dan", "Eve"]
+    lines = [json.dumps(contact(name, f"{name.lower()}@example.com")) for name in names]
+    client.post(
+        "/api/jobs/import", headers=headers,
+        files={"file": ("contacts.ndjson", "\n".join(lines) + "\n", "application/x-ndjson")}
+    )
+    job = service.claim_next()
+
+    parse = handlers.model.ContactModel
+
+    def crash_on_eve(**fields):
+        if fields["name"] == "Eve":
+            raise RuntimeError("worker lost")
+        return parse(**fields)
+
+    monkeypatch.setattr(handlers.model, "ContactModel", crash_on_eve)
+    assert service.execute(job.id, job.kind, job.user_id, job.params, job.checkpoint) == "failed"
+    monkeypatch.setattr(handlers.model, "ContactModel", parse)
+
+    with database.DBSession() as session:
+        checkpoint = session.get(models.Job, job.id).checkpoint
+    assert json.loads(checkpoint) == {"line": 4, "created": 4, "errors": []}
+
+    assert service.execute(job.id, job.kind, job.user_id, job.params, checkpoint) == "done"
+    assert client.get(f"/api/jobs/{job.id}/result", headers=headers).json()["created"] == 5
+    assert sorted(c["name"] for c in client.get("/api/contacts/", headers=headers).json()) == names
+
+
+def test_dedup_job(client, make_user, auth_headers):
+    make_user("owner@example.com")
+    headers = auth_headers("owner@example.com")
+    client.post("/api/contacts/", json=contact("Ann", "ann@example.com"), headers=headers)
+    client.post("/api/contacts/", json=contact("Anne", "Ann@Example.com", "070 000 00 00"), headers=headers)
+
+    job = client.post("/api/jobs/dedup", headers=headers).json()
+    service.run_pending()
+
+    groups = client.get(f"/api/jobs/{job['id']}/result", headers=headers).json()
+    assert len(groups) == 1
+    assert len(groups[0]["contact_ids"]) == 2
+
+
+def test_failed_job_records_the_error(make_user):
+    user = make_user("owner@example.com")
+    with database.DBSession() as session:
+        job_id = service.enqueue(session, user.id, "import", {"input": "missing.ndjson"}).id
+
+    service.run_pending()
+
+    with database.DBSession() as session:
+        job = session.get(models.Job, job_id)
+        assert job.status == "failed"
+        assert job.error.startswith("FileNotFoundError")
+
+
+def test_queue_limit(client, make_user, auth_headers, monkeypatch):
+    monkeypatch.setattr(service, "JOB_QUEUE_LIMIT", 2)
+    make_user("owner@example.com")
+    headers = auth_headers("owner@example.com")
+
+    assert client.post("/api/jobs/export", headers=headers).status_code == 202
+    assert client.post("/api/jobs/dedup", headers=headers).status_code == 202
+    assert client.post("/api/jobs/export", headers=headers).status_code == 429
+
+
+def test_claims_are_capped_per_user_and_fair(db_engine, monkeypatch):
+    monkeypatch.setattr(service, "JOBS_PER_USER", 2)
+    first = queue(1, 3)
+    second = queue(2, 1)
+    third = queue(3, 2)
+
+    claimed = [service.claim_next().id for _ in range(5)]
+
+    # One job per user first, then a second one for everybody with more.
+    assert claimed[:3] == [first[0], second[0], third[0]]
+    assert sorted(claimed[3:]) == [first[1], third[1]]
+    # The third job of user 1 waits for one of its two running jobs.
+    assert service.claim_next() is None
+
+
+def test_least_recently_served_user_goes_first(db_engine):
+    first = queue(1, 2)
+    second = queue(2, 2)
+    for _ in range(2):
+        job = service.claim_next()
+        service.execute(job.id, "purge", job.user_id, job.params)
+
+    # Both users had one job run; user 1 was served first, so waits now.
+    assert service.claim_next().id == first[1]
+    assert service.claim_next().id == second[1]
+
+
+def test_stale_jobs_are_retried_then_failed(db_engine):
+    job_id = queue(1, 1)[0]
+    later = service.lease_service.utcnow() + datetime.timedelta(seconds=service.JOB_STALE_SECONDS + 1)
+
+    for _ in range(service.JOB_MAX_ATTEMPTS):
+        assert service.claim_next().id == job_id
+        assert service.recover_stale(later) == 1
+        later += datetime.timedelta(seconds=service.JOB_STALE_SECONDS + 1)
+
+    with database.DBSession() as session:
+        job = session.get(models.Job, job_id)
+        assert (job.status, job.attempts, job.error) == ("failed", service.JOB_MAX_ATTEMPTS, "worker lost")
+
+
+def test_prune_removes_old_jobs_and_files(client, make_user, auth_headers, artifacts):
+    make_user("owner@example.com")
+    client.post("/api/jobs/export", headers=auth_headers("owner@example.com"))
+    service.run_pending()
+    assert os.listdir(artifacts) == ["job-1.ndjson"]
+
+    assert service.prune() == 0
+    later = service.lease_service.utcnow() + datetime.timedelta(days=service.JOB_KEEP_DAYS + 1)
+    assert service.prune(later) == 1
+    assert os.listdir(artifacts) == []
+
+
+def test_scheduler_runs_cpu_bound_jobs_in_processes(database_state, tmp_path, artifacts):
+    # Worker processes need a database they can open themselves.
+    database.connect(f"sqlite:///{tmp_path / 'jobs.sqlite'}")
+    with database.engine.begin() as connection:
+        connection.execute(sqlalchemy.insert(auth.models.User).values(
+            id=1, username="owner@example.com", hash_password="x"
+        ))
+    seed_contacts(database.engine, 1, 5)
+    job_id = queue(1, 1, "dedup")[0]
+
+    async def run():
+        scheduler = service.Scheduler(workers=1, processes=1)
+        task = asyncio.create_task(scheduler.run_forever(interval=0.05))
+        for _ in range(400):
+            await asyncio.sleep(0.05)
+            with database.DBSession() as session:
+                if session.get(models.Job, job_id).status in (models.DONE, models.FAILED):
+                    break
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        return scheduler
+
+    scheduler = asyncio.run(run())
+
+    assert scheduler.processes is not None
+    with database.DBSession() as session:
+        job = session.get(models.Job, job_id)
+        assert job.status == "done", job.error
+        assert job.artifact == f"job-{job_id}.json"
+    assert json.loads((artifacts / job.artifact).read_text()) == []
+    database.engine.dispose()
+
+
+def test_scheduler_replaces_a_broken_process_pool(database_state, tmp_path, artifacts):
+    database.connect(f"sqlite:///{tmp_path / 'jobs.sqlite'}")
+    with database.engine.begin() as connection:
+        connection.execute(sqlalchemy.insert(auth.models.User).values(
+            id=1, username="owner@example.com", hash_password="x"
+        ))
+    seed_contacts(database.engine, 1, 5)
+
+    scheduler = service.Scheduler(workers=1, processes=1)
+    # A worker killed (say by the OOM killer) leaves its pool broken.
+    broken = scheduler._executor("dedup")
+    with pytest.raises(concurrent.futures.process.BrokenProcessPool):
+        broken.submit(os._exit, 1).result()
+    job_id = queue(1, 1, "dedup")[0]
+
+    async def run():
+        task = asyncio.create_task(scheduler.run_forever(interval=0.05))
+        for _ in range(400):
+            await asyncio.sleep(0.05)
+            with database.DBSession() as session:
+                if session.get(models.Job, job_id).status in (models.DONE, models.FAILED):
+                    break
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(run())
+
+    assert scheduler.processes is not broken
+    with database.DBSession() as session:
+        job = session.get(models.Job, job_id)
+        assert (job.status, job.attempts) == ("done", 2), job.error
+    database.engine.dispose()
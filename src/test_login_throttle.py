@@ -0,0 +1,75 @@
+from auth.throttle import LoginThrottle
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_throttle(clock, **kwargs):
+    options = {"max_failures_per_user": 3, "max_failures_per_ip": 5, "window": 60, "max_keys": 100}
+    options.update(kwargs)
+    return LoginThrottle(clock=clock, **options)
+
+
+def test_username_locked_after_max_failures():
+    clock = Clock()
+    throttle = make_throttle(clock)
+
+    for _ in range(3):
+        assert throttle.retry_after("alice", "10.0.0.1") == 0
+        throttle.record_failure("alice", "10.0.0.1")
+
+    assert throttle.retry_after("alice", "10.0.0.2") == 60
+    assert throttle.retry_after("bob", "10.0.0.2") == 0
+
+
+def test_sliding_window_expires_old_failures():
+    clock = Clock()
+    throttle = make_throttle(clock)
+
+    throttle.record_failure("alice", "10.0.0.1")
+    clock.now += 40
+    throttle.record_failure("alice", "10.0.0.1")
+    throttle.record_failure("alice", "10.0.0.1")
+    assert throttle.retry_after("alice", "10.0.0.1") == 20
+
+    clock.now += 20
+    assert throttle.retry_after("alice", "10.0.0.1") == 0
+
+
+def test_ip_locked_across_usernames():
+    clock = Clock()
+    throttle = make_throttle(clock)
+
+    for i in range(5):
+        throttle.record_failure(f"user{i}", "10.0.0.1")
+
+    assert throttle.retry_after("someone-else", "10.0.0.1") == 60
+    assert throttle.retry_after("someone-else", "10.0.0.9") == 0
+
+
+def test_success_resets_username_only():
+    clock = Clock()
+    throttle = make_throttle(clock, max_failures_per_ip=3)
+
+    for _ in range(3):
+        throttle.record_failure("alice", "10.0.0.1")
+    throttle.reset("alice")
+
+    assert throttle.retry_after("alice", "10.0.0.2") == 0
+    assert throttle.retry_after("alice", "10.0.0.1") == 60
+
+
+def test_memory_is_bounded():
+    clock = Clock()
+    throttle = make_throttle(clock, max_keys=10)
+
+    for i in range(100):
+        throttle.record_failure(f"user{i}", "10.0.0.1")
+
+    assert len(throttle._failures) == 10
+    assert throttle.retry_after("someone", "10.0.0.1") == 60
@@ -0,0 +1,14 @@
+import pytest
+import profiling
+
+
+@pytest.fixture(autouse=True)
+def admins(monkeypatch):
+    monkeypatch.setattr(profiling, "ADMIN_USERNAMES", frozenset({"admin@example.com"}))
+
+
+def test_sql_cache_metrics_are_for_admins_only(client, make_user, auth_headers):
+    make_user("user@example.com")
+
+    assert client.get("/metrics/sql-cache").status_code == 401
+    assert client.get("/metrics/sql-cache", headers=auth_headers("user@example.com")).status_code == 403
@@ -0,0 +1,73 @@
+import fastapi
+import pytest
+from fastapi.testclient import TestClient
+import auth.exceptions
+import contacts.routes
+import profiling
+
+
+@pytest.fixture
+def profiled_client(db_engine, monkeypatch):
+    monkeypatch.setattr(profiling, "ADMIN_USERNAMES", frozenset({"admin@example.com"}))
+    app = fastapi.FastAPI()
+    app.add_middleware(profiling.ProfilingMiddleware)
+    app.add_exception_handler(auth.exceptions.AuthException, auth.exceptions.auth_error_handler)
+    app.include_router(contacts.routes.router, prefix="/api")
+    app.include_router(profiling.router)
+    return TestClient(app)
+
+
+def test_sample_returns_collapsed_stacks(profiled_client, make_user, auth_headers):
+    make_user("admin@example.com")
+
+    response = profiled_client.get("/debug/profile/sample?seconds=0.2", headers=auth_headers("admin@example.com"))
+
+    assert response.status_code == 200, response.text
+    lines = response.text.splitlines()
+    assert lines
+    stack, count = lines[0].rsplit(" ", 1)
+    assert int(count) > 0
+    assert any("asyncio" in line or "anyio" in line for line in lines)
+
+
+def test_sample_is_for_admins_only(profiled_client, make_user, auth_headers):
+    make_user("user@example.com")
+
+    response = profiled_client.get("/debug/profile/sample?seconds=0.1", headers=auth_headers("user@example.com"))
+    assert response.status_code == 403
+
+    response = profiled_client.get("/debug/profile/sample?seconds=0.1")
+    assert response.status_code == 401
+
+
+def test_sample_duration_is_capped(profiled_client, make_user, auth_headers):
+    make_user("admin@example.com")
+
+    response = profiled_client.get(
+        f"/debug/profile/sample?seconds={profiling.MAX_SAMPLE_SECONDS + 1}", headers=auth_headers("admin@example.com")
+    )
+    assert response.status_code == 422
+
+
+def test_profile_header_returns_request_stats(profiled_client, make_user, auth_headers):
+    make_user("admin@example.com")
+    headers = {**auth_headers("admin@example.com"), "X-Profile": "tottime"}
+
+    response = profiled_client.get("/api/contacts/", headers=headers)
+
+    assert response.status_code == 200
+    assert response.headers["x-profiled-status"] == "200"
+    assert "Ordered by: internal time" in response.text
+    assert "function calls" in response.text
+
+
+def test_profile_header_needs_an_admin(profiled_client, make_user, auth_headers):
+    make_user("user@example.com")
+    headers = {**auth_headers("user@example.com"), "X-Profile": ""}
+
+    response = profiled_client.get("/api/contacts/", headers=headers)
+    assert response.status_code == 403
+
+    response = profiled_client.get("/api/contacts/", headers=auth_headers("user@example.com"))
+    assert response.status_code == 200
+    assert response.json() == []
@@ -0,0 +1,225 @@
+"""
+Baseline SQL statement counts per route.
+
+A failing test here means a change added (or removed) queries on a request
+path. If the new count is intended, update the baseline in the same change.
+"""
+import pytest
+import database
+import profiling
+import jobs.service
+from auth.models import User
+
+CONTACT = {
+    "name": "Taras",
+    "surename": "Shevchenko",
+    "email": "taras@example.com",
+    "phone_number": "+380501234567",
+    "date_of_birth": "1990-03-09",
+    "description": "poet",
+}
+
+
+@pytest.fixture
+def owner(client, make_user, auth_headers):
+    make_user("owner@example.com", password="password")
+    headers = auth_headers("owner@example.com")
+    for _ in range(3):
+        client.post("/api/contacts/", json=CONTACT, headers=headers)
+    return headers
+
+
+def test_list_contacts(client, owner, assert_num_queries):
+    with assert_num_queries(2):
+        response = client.get("/api/contacts/", headers=owner)
+    assert response.status_code == 200, response.text
+
+
+def test_get_contact(client, owner, assert_num_queries):
+    with assert_num_queries(2):
+        response = client.get("/api/contacts/find/1", headers=owner)
+    assert response.status_code == 200, response.text
+
+
+def test_create_contact(client, owner, assert_num_queries):
+    # user, INSERT, stats upsert, refresh
+    with assert_num_queries(4):
+        response = client.post("/api/contacts/", json=CONTACT, headers=owner)
+    assert response.status_code == 200, response.text
+
+
+def test_patch_contact(client, owner, assert_num_queries):
+    # user, contact, UPDATE, refresh; stats unchanged without email/birthday
+    with assert_num_queries(4):
+        response = client.patch("/api/contacts/1", json={"description": "writer"}, headers=owner)
+    assert response.status_code == 200, response.text
+
+
+def test_delete_contact(client, owner, assert_num_queries):
+    # user, contact, DELETE, stats upsert
+    with assert_num_queries(4):
+        response = client.delete("/api/contacts/1", headers=owner)
+    assert response.status_code == 200, response.text
+
+
+def test_stats(client, owner, assert_num_queries):
+    # user, totals and months, top domains
+    with assert_num_queries(3):
+        response = client.get("/api/contacts/stats", headers=owner)
+    assert response.status_code == 200, response.text
+
+
+def test_by_phone(client, owner, assert_num_queries):
+    with assert_num_queries(2):
+        response = client.get("/api/contacts/by-phone?last=4567", headers=owner)
+    assert response.status_code == 200, response.text
+
+
+def test_search_contacts(client, owner, assert_num_queries):
+    with assert_num_queries(2):
+        response = client.get("/api/contacts/search?name=Taras", headers=owner)
+    assert response.status_code == 200, response.text
+
+
+def test_upcoming_birthdays(client, owner, assert_num_queries):
+    with assert_num_queries(2):
+        response = client.get("/api/contacts/upcoming-birthdays", headers=owner)
+    assert response.status_code == 200, response.text
+
+
+def test_bulk_create(client, owner, assert_num_queries):
+    # user, then one INSERT per contact (SQLite needs each lastrowid), stats upsert
+    with assert_num_queries(4):
+        response = client.post("/api/contacts/bulk", json=[CONTACT, CONTACT], headers=owner)
+    assert response.status_code == 201, response.text
+
+
+def test_duplicates(client, owner, assert_num_queries):
+    # user, one blocking query per key (email, phone, surname)
+    with assert_num_queries(4):
+        response = client.get("/api/contacts/duplicates", headers=owner)
+    assert response.status_code == 200, response.text
+
+
+def test_merge(client, owner, assert_num_queries):
+    # user, contacts, DELETE, stats upsert, refresh
+    with assert_num_queries(5):
+        response = client.post("/api/contacts/merge", json={"keep_id": 1, "merge_ids": [2]}, headers=owner)
+    assert response.status_code == 200, response.text
+
+
+def test_export_contacts(client, owner, assert_num_queries):
+    # user, then every contact streamed from one query
+    with assert_num_queries(2):
+        response = client.get("/api/contacts/export", headers=owner)
+    assert response.status_code == 200, response.text
+
+
+def test_contact_events_websocket(client, owner, assert_num_queries):
+    token = owner["Authorization"].split()[1]
+    with assert_num_queries(1):
+        with client.websocket_connect(f"/api/contacts/ws?token={token}"):
+            pass
+
+
+def test_signup(client, assert_num_queries):
+    # INSERT ... ON CONFLICT RETURNING, then the verification token in the background
+    with assert_num_queries(2):
+        response = client.post("/auth/signup", json={"username": "new@example.com", "password": "password"})
+    assert response.status_code == 201, response.text
+
+
+def test_login(client, owner, assert_num_queries):
+    with assert_num_queries(2):
+        response = client.post("/auth/login", data={"username": "owner@example.com", "password": "password"})
+    assert response.status_code == 200, response.text
+
+
+def test_login_locked_out_runs_no_queries(client, owner, assert_num_queries):
+    for _ in range(5):
+        client.post("/auth/login", data={"username": "owner@example.com", "password": "wrong"})
+
+    with assert_num_queries(0):
+        response = client.post("/auth/login", data={"username": "owner@example.com", "password": "password"})
+    assert response.status_code == 429
+
+
+def test_logout(client, owner, assert_num_queries):
+    with assert_num_queries(2):
+        response = client.post("/auth/logout", headers=owner)
+    assert response.status_code == 200, response.text
+
+
+def test_verify_email(client, make_user, assert_num_queries):
+    make_user("unverified@example.com", verified=False)
+    session = database.DBSession()
+    session.query(User).filter(User.username == "unverified@example.com").update({"verification_token": "token"})
+    session.commit()
+    session.close()
+
+    with assert_num_queries(2):
+        response = client.get("/auth/verify/token")
+    assert response.status_code == 200, response.text
+
+
+def test_avatar_with_invalid_type_runs_no_queries(client, assert_num_queries):
+    with assert_num_queries(0):
+        response = client.post("/auth/users/1/avatar", files={"file": ("a.txt", b"x", "text/plain")})
+    assert response.status_code == 400, response.text
+
+
+def test_delete_account(client, owner, assert_num_queries):
+    # user, size check, DELETE FROM users
+    with assert_num_queries(3):
+        response = client.delete("/auth/account", headers=owner)
+    assert response.status_code == 200, response.text
+
+
+def test_sql_cache_metrics(client, owner, assert_num_queries, monkeypatch):
+    monkeypatch.setattr(profiling, "ADMIN_USERNAMES", frozenset({"owner@example.com"}))
+    # the admin lookup only
+    with assert_num_queries(1):
+        response = client.get("/metrics/sql-cache", headers=owner)
+    assert response.status_code == 200, response.text
+
+
+@pytest.mark.parametrize("kind", ["export", "dedup"])
+def test_queue_job(client, owner, assert_num_queries, kind):
+    # user, queue limit, INSERT, refresh of the committed job
+    with assert_num_queries(4):
+        response = client.post(f"/api/jobs/{kind}", headers=owner)
+    assert response.status_code == 202, response.text
+
+
+def test_queue_import_job(client, owner, assert_num_queries, tmp_path, monkeypatch):
+    monkeypatch.setattr(jobs.service, "JOB_ARTIFACT_DIR", str(tmp_path))
+    # user, queue limit, INSERT, refresh of the committed job
+    with assert_num_queries(4):
+        response = client.post(
+            "/api/jobs/import", headers=owner,
+            files={"file": ("contacts.ndjson", b"{}\n", "application/x-ndjson")}
+        )
+    assert response.status_code == 202, response.text
+
+
+def test_list_jobs(client, owner, assert_num_queries):
+    client.post("/api/jobs/export", headers=owner)
+    with assert_num_queries(2):
+        response = client.get("/api/jobs/", headers=owner)
+    assert response.status_code == 200, response.text
+
+
+def test_get_job(client, owner, assert_num_queries):
+    job_id = client.post("/api/jobs/export", headers=owner).json()["id"]
+    with assert_num_queries(2):
+        response = client.get(f"/api/jobs/{job_id}", headers=owner)
+    assert response.status_code == 200, response.text
+
+
+def test_get_job_result(client, owner, assert_num_queries, tmp_path, monkeypatch):
+    monkeypatch.setattr(jobs.service, "JOB_ARTIFACT_DIR", str(tmp_path))
+    job_id = client.post("/api/jobs/export", headers=owner).json()["id"]
+    jobs.service.run_pending()
+    with assert_num_queries(2):
+        response = client.get(f"/api/jobs/{job_id}/result", headers=owner)
+    assert response.status_code == 200, response.text
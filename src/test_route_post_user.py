@@ -1,31 +1,9 @@
+import asyncio
+import httpx
 import pytest
-from fastapi.testclient import TestClient
+import database
+import auth.models
 from main import app
-from database import get_database, Base
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-
-@pytest.fixture(scope='module')
-def test_db():
-    engine = create_engine('sqlite:///:memory:', connect_args={"check_same_thread": False})
-    Base.metadata.create_all(engine)
-    yield engine
-    Base.metadata.drop_all(engine)
-
-@pytest.fixture
-def session(test_db):
-    connection = test_db.connect()
-    transaction = connection.begin()
-    session = sessionmaker(bind=connection)()
-    yield session
-    session.close()
-    transaction.rollback()
-    connection.close()
-
-@pytest.fixture
-def client(session):
-    app.dependency_overrides[get_database] = lambda: session
-    return TestClient(app)
 
 @pytest.fixture
 def user():
@@ -65,3 +43,33 @@ def test_signup_invalid_password(client):
         json={"username": "newuser", "password": ""},
     )
     assert response.status_code == 409
+
+
+def test_signup_sets_verification_token(client, user):
+    response = client.post("/auth/signup", json=user)
+    assert response.status_code == 201, response.text
+
+    session = database.DBSession()
+    token = session.get(auth.models.User, response.json()["id"]).verification_token
+    session.close()
+    assert token
+
+    response = client.get(f"/auth/verify/{token}")
+    assert response.status_code == 200, response.text
+
+
+def test_concurrent_duplicate_signups_conflict(database_state, tmp_path, user):
+    # A file database: the in-memory test connection is shared by every
+    # session, so concurrent transactions would interleave on it.
+    database.connect(f"sqlite:///{tmp_path / 'signup.sqlite'}")
+
+    async def burst():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            return await asyncio.gather(*(http.post("/auth/signup", json=user) for _ in range(20)))
+
+    try:
+        statuses = sorted(response.status_code for response in asyncio.run(burst()))
+        assert statuses == [201] + [409] * 19
+    finally:
+        database.engine.dispose()
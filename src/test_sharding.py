@@ -0,0 +1,165 @@
+import datetime
+import pytest
+import sqlalchemy
+import database
+import sharding
+from auth.models import User
+from contacts.schema import Contacts
+
+
+@pytest.fixture
+def shards(tmp_path, database_state, monkeypatch):
+    monkeypatch.setattr(sharding, "SHARD_MAP_TTL_SECONDS", 0)
+
+    database.connect(f"sqlite:///{tmp_path / 'primary.sqlite'}")
+    sharding.connect([f"sqlite:///{tmp_path / f'shard{i}.sqlite'}" for i in range(3)])
+
+    db = next(database.get_database())
+    db.add_all([User(id=user_id, username=f"user{user_id}", hash_password="x") for user_id in range(1, 9)])
+    db.commit()
+    db.close()
+
+    yield database.shard_map
+
+    for engine in database.shard_map.engines:
+        engine.dispose()
+    database.engine.dispose()
+
+
+def add_contacts(user_id, count):
+    db = next(database.get_database())
+    db.info["user_id"] = user_id
+    db.add_all([
+        Contacts(
+            user_id=user_id, name=f"n{i}", surename="s", email="e", phone_number="1",
+            date_of_birth=datetime.date(2000, 1, 1), description=""
+        )
+        for i in range(count)
+    ])
+    db.commit()
+    db.close()
+
+
+def count_rows(engine, user_id):
+    with engine.connect() as connection:
+        return connection.execute(
+            sqlalchemy.select(sqlalchemy.func.count()).where(Contacts.user_id == user_id)
+        ).scalar()
+
+
+def test_contacts_land_on_hash_shard(shards):
+    for user_id in range(1, 9):
+        add_contacts(user_id, 2)
+
+    for user_id in range(1, 9):
+        for index, engine in enumerate(shards.engines):
+            expected = 2 if index == shards.hash_shard(user_id) else 0
+            assert count_rows(engine, user_id) == expected
+
+    assert count_rows(database.engine, 1) == 0
+
+
+def test_contact_ids_are_unique_across_shards(shards):
+    add_contacts(1, 3)
+    add_contacts(2, 3)
+
+    ids = []
+    for engine in shards.engines:
+        with engine.connect() as connection:
+            ids += connection.execute(sqlalchemy.select(Contacts.id)).scalars().all()
+    assert sorted(ids) == list(range(1, 7))
+
+
+def test_ids_are_taken_in_the_flushing_transaction(tmp_path, database_state):
+    url = f"sqlite:///{tmp_path / 'primary.sqlite'}"
+    database.connect(url)
+    sharding.connect([url])
+    db = next(database.get_database())
+    db.add(User(id=1, username="user1", hash_password="x"))
+    db.commit()
+
+    # The first flush leaves this transaction holding the write lock.
+    db.info["user_id"] = 1
+    for name in ("first", "second"):
+        db.add(Contacts(
+            user_id=1, name=name, surename="s", email="e", phone_number="1",
+            date_of_birth=datetime.date(2000, 1, 1), description=""
+        ))
+        db.flush()
+    db.commit()
+    db.close()
+
+    assert count_rows(database.engine, 1) == 2
+    database.engine.dispose()
+
+
+def test_core_inserts_without_ids_are_rejected(shards):
+    engine = shards.engine_for(1)
+    row = {
+        "user_id": 1, "name": "n", "surename": "s", "email": "e", "phone_number": "1",
+        "date_of_birth": datetime.date(2000, 1, 1), "description": ""
+    }
+    with pytest.raises(sharding.ShardingError):
+        with engine.begin() as connection:
+            connection.execute(sqlalchemy.insert(Contacts), [row])
+
+    with engine.begin() as connection:
+        connection.execute(sqlalchemy.insert(Contacts), [dict(row, id=100)])
+    assert count_rows(engine, 1) == 1
+
+
+def test_session_reads_from_users_shard(shards):
+    add_contacts(3, 4)
+
+    db = next(database.get_database())
+    db.info["user_id"] = 3
+    assert db.query(Contacts).filter(Contacts.user_id == 3).count() == 4
+    db.close()
+
+
+def test_contacts_query_without_user_is_rejected(shards):
+    db = next(database.get_database())
+    with pytest.raises(sharding.ShardingError):
+        db.query(Contacts).all()
+    db.close()
+
+
+def test_move_user(shards):
+    add_contacts(4, 5)
+    source = shards.shard_for(4)
+    target = (source + 1) % 3
+
+    assert sharding.move_user(4, target) == 5
+
+    assert shards.shard_for(4) == target
+    assert count_rows(shards.engines[target], 4) == 5
+    assert count_rows(shards.engines[source], 4) == 0
+
+    add_contacts(4, 1)
+    assert count_rows(shards.engines[target], 4) == 6
+
+
+def test_writes_rejected_while_moving(shards):
+    sharding._set_assignment(5, shards.hash_shard(5), True)
+    shards.forget(5)
+
+    with pytest.raises(sharding.MigrationInProgress):
+        add_contacts(5, 1)
+
+
+def test_rebalance_after_adding_shard(shards, tmp_path):
+    for user_id in range(1, 9):
+        add_contacts(user_id, 1)
+
+    assert sharding.pin_all() == 8
+    engines = shards.engines + [sqlalchemy.create_engine(f"sqlite:///{tmp_path / 'shard3.sqlite'}")]
+    database.Base.metadata.create_all(engines[-1], tables=[Contacts.__table__])
+    shards.engines = engines
+    shards.forget()
+
+    sharding.rebalance()
+
+    for user_id in range(1, 9):
+        assert shards.shard_for(user_id) == shards.hash_shard(user_id)
+        assert count_rows(shards.engines[shards.hash_shard(user_id)], user_id) == 1
+    engines[-1].dispose()
@@ -0,0 +1,44 @@
+import concurrent.futures
+import pytest
+import sqlalchemy
+import database
+import profiling
+
+
+@pytest.fixture
+def admin_headers(make_user, auth_headers, monkeypatch):
+    monkeypatch.setattr(profiling, "ADMIN_USERNAMES", frozenset({"admin@example.com"}))
+    make_user("admin@example.com")
+    return auth_headers("admin@example.com")
+
+
+def test_prebuilt_statements_hit_the_compiled_cache(client, admin_headers):
+    client.get("/api/contacts/", headers=admin_headers)
+
+    before = client.get("/metrics/sql-cache", headers=admin_headers).json()
+    client.get("/api/contacts/", headers=admin_headers)
+    after = client.get("/metrics/sql-cache", headers=admin_headers).json()
+
+    # user lookup and contact list, both compiled by the first request,
+    # then the admin lookup of the second metrics request
+    assert after["hits"] - before["hits"] == 3
+    assert after["misses"] == before["misses"]
+
+
+def test_counts_from_many_threads_add_up():
+    engine = sqlalchemy.create_engine("sqlite://")
+    query = sqlalchemy.select(sqlalchemy.literal(1))
+
+    def run(_):
+        with engine.connect() as connection:
+            for _ in range(500):
+                connection.execute(query)
+
+    before = database.statement_cache_stats()
+    with concurrent.futures.ThreadPoolExecutor(8) as pool:
+        list(pool.map(run, range(8)))
+    after = database.statement_cache_stats()
+
+    counted = sum(after[key] - before[key] for key in ("hits", "misses", "uncached"))
+    assert counted == 8 * 500
+    engine.dispose()
@@ -3,20 +3,19 @@ import asyncio
 from unittest.mock import MagicMock, patch
 from jose import jwt, JWTError
 import datetime
-from passlib.context import CryptContext
 from fastapi.security import OAuth2PasswordBearer
 from auth.service import Auth
 from auth.models import User
 from contacts.schema import Contacts
 from auth.exceptions import AuthException
+from auth.hashing import build_context
 
 class TestAuth(unittest.IsolatedAsyncioTestCase):
     
+    # Hash context, secret and algorithm come from the session-wide
+    # ``fast_auth`` fixture; these tests mock the database and need no other.
     def setUp(self):
         self.auth = Auth()
-        self.auth.HASH_CONTEXT = CryptContext(schemes=["bcrypt"])
-        self.auth.ALGORITHM = "HS256"
-        self.auth.SECRET = "testsecret"
         self.user = User(username="testuser", refresh_token="some_token")
     
     def test_verify_password(self):
@@ -30,6 +29,33 @@ class TestAuth(unittest.IsolatedAsyncioTestCase):
         hashed_password = self.auth.hash_password(plain_password)
         self.assertTrue(self.auth.HASH_CONTEXT.verify(plain_password, hashed_password))
 
+    def test_verify_and_update_current_hash(self):
+        self.auth.HASH_CONTEXT = build_context(["bcrypt"], bcrypt_rounds=5)
+        hashed_password = self.auth.hash_password("password123")
+
+        self.assertEqual(self.auth.verify_and_update("password123", hashed_password), (True, None))
+        self.assertEqual(self.auth.verify_and_update("wrong", hashed_password), (False, None))
+
+    def test_verify_and_update_rehashes_weak_hash(self):
+        weak_hash = build_context(["bcrypt"], bcrypt_rounds=4).hash("password123")
+        self.auth.HASH_CONTEXT = build_context(["bcrypt"], bcrypt_rounds=5)
+
+        verified, new_hash = self.auth.verify_and_update("password123", weak_hash)
+
+        self.assertTrue(verified)
+        self.assertTrue(new_hash.startswith("$2b$05$"))
+        self.assertTrue(self.auth.verify_password("password123", new_hash))
+
+    def test_build_context_accepts_argon2id(self):
+        context = build_context(["argon2id", "bcrypt"], argon2_memory_cost=1024, argon2_time_cost=1, argon2_parallelism=1)
+
+        self.assertEqual(context.schemes(), ("argon2", "bcrypt"))
+        self.assertTrue(context.hash("password123").startswith("$argon2id$"))
+
+    def test_build_context_rejects_unknown_scheme(self):
+        with self.assertRaisesRegex(ValueError, "argon2i"):
+            build_context(["argon2i"])
+
     @patch('auth.service.datetime')
     @patch('jose.jwt.encode')
     async def test_create_access_token(self, mock_jwt_encode, mock_datetime):
@@ -60,7 +86,7 @@ class TestAuth(unittest.IsolatedAsyncioTestCase):
         mock_jwt_decode.return_value = {"sub": "testuser", "scope": "access_token"}
         mock_db = MagicMock()
         mock_get_database.return_value = mock_db
-        mock_db.query().filter().first.return_value = self.user
+        mock_db.scalars().first.return_value = self.user
         
         user = self.auth.get_user(token="valid_token", db=mock_db)
         
@@ -78,7 +104,7 @@ class TestAuth(unittest.IsolatedAsyncioTestCase):
         mock_db = MagicMock()
         mock_get_database.return_value = mock_db
         self.user.refresh_token = None
-        mock_db.query().filter().first.return_value = self.user
+        mock_db.scalars().first.return_value = self.user
         
         with self.assertRaises(AuthException):
             self.auth.get_user(token="valid_token", db=mock_db)